@@ -74,12 +74,41 @@ if ($LASTEXITCODE -ne 0) {
     Exit 1
 }
 
+# Herramienta de línea de comandos (consola, sin Qt) para tareas programadas
+$cliName = "empresa-cli"
+$cliArgs = @(
+    "--noconfirm",
+    "--onefile",
+    "--console",
+    "--exclude-module", "PyQt6",
+    "--name", $cliName,
+    "empresa_cli.py"
+)
+Write-Host "pyinstaller $($cliArgs -join ' ')"
+& pyinstaller @cliArgs
+if ($LASTEXITCODE -ne 0) {
+    Write-Error "PyInstaller falló al generar $cliName. Revisa la salida de error arriba."
+    Pop-Location
+    Exit 1
+}
+
 # Copiar resultado a release\
 $distExe = Join-Path $projectRoot "dist\$exeName.exe"
 $releaseDir = Join-Path $projectRoot "release"
 if (-not (Test-Path $releaseDir)) { New-Item -ItemType Directory -Path $releaseDir | Out-Null }
 Copy-Item -Path $distExe -Destination (Join-Path $releaseDir "$exeName.exe") -Force
-Write-Host "Build completado. Ejecutable en: $releaseDir\$exeName.exe"
+Copy-Item -Path (Join-Path $projectRoot "dist\$cliName.exe") -Destination (Join-Path $releaseDir "$cliName.exe") -Force
+
+# empresa.ini se lee junto al ejecutable (no dentro del .exe), para poder editarlo
+$config = Join-Path $projectRoot "empresa.ini"
+if (Test-Path $config) {
+    foreach ($dir in @((Join-Path $projectRoot "dist"), $releaseDir)) {
+        Copy-Item -Path $config -Destination (Join-Path $dir "empresa.ini") -Force
+    }
+} else {
+    Write-Host "Advertencia: no se encontró 'empresa.ini'; los ejecutables usarán la configuración por omisión."
+}
+Write-Host "Build completado. Ejecutables y empresa.ini en: $releaseDir"
 Write-Host "Si deseas una distribución portable, copia también 'empresa.db' (si la tienes) al mismo directorio que el exe."
 
 Write-Host "Nota: No se generó ni copió 'estilo.css' durante el build. Si deseas que el exe use estilos externos, coloca 'estilo.css' junto al exe." 
@@ -1,127 +1,35 @@
 import sys
 import os
 import sqlite3
+import configparser
+import html
+import itertools
+import threading
 from PyQt6.QtWidgets import (
     QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout,
     QPushButton, QLineEdit, QLabel, QStackedWidget, QTableWidget, 
     QTableWidgetItem, QDialog, QMessageBox, QComboBox, QMenu, QGridLayout,
-    QHeaderView
+    QHeaderView, QTableView, QCompleter, QFileDialog, QProgressBar, QStyledItemDelegate,
+    QTreeWidget, QTreeWidgetItem
 )
-from PyQt6.QtGui import QPixmap, QIntValidator
-from PyQt6.QtCore import Qt
-from datetime import date 
-
-# --- Configuración de la base de datos ---
-# Base path for resources and database.
-# When packaged with PyInstaller (--onefile), sys.frozen is True and
-# the executable lives outside the source tree. Use the directory of
-# the executable as the base path so the bundled exe is portable.
-if getattr(sys, 'frozen', False):
-    # Cuando está congelado por PyInstaller, sys.argv[0] apunta al ejecutable original
-    # (la ubicación del .exe). Usamos eso para que la .db se cree junto al .exe.
-    base_path = os.path.dirname(os.path.abspath(sys.argv[0]))
-else:
-    base_path = os.path.dirname(os.path.abspath(__file__))
-
-DATABASE_NAME = os.path.join(base_path, "empresa.db")
-
-def setup_database():
-    """Configura las tablas iniciales de la base de datos y añade datos iniciales."""
-    conn = sqlite3.connect(DATABASE_NAME)
-    cursor = conn.cursor()
-
-    # TABLA USERS con ROLE
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS users (
-            id INTEGER PRIMARY KEY,
-            username TEXT NOT NULL UNIQUE,
-            password TEXT NOT NULL,
-            full_name TEXT,
-            role TEXT DEFAULT 'user' 
-        )
-    """)
-    
-    try:
-        cursor.execute("ALTER TABLE users ADD COLUMN role TEXT DEFAULT 'user'")
-    except sqlite3.OperationalError:
-         pass
-
-    # Tablas restantes
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS advisors (id INTEGER PRIMARY KEY, name TEXT NOT NULL UNIQUE)
-    """)
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS ots (
-            id INTEGER PRIMARY KEY, ot_number TEXT NOT NULL UNIQUE, sales_advisor TEXT,
-            vin TEXT, status TEXT, request_date TEXT
-        )
-    """)
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS parts (id INTEGER PRIMARY KEY, part_number TEXT NOT NULL UNIQUE, part_name TEXT)
-    """)
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS ot_parts (
-            ot_id INTEGER, part_id INTEGER, quantity INTEGER, status TEXT,
-            FOREIGN KEY(ot_id) REFERENCES ots(id), FOREIGN KEY(part_id) REFERENCES parts(id),
-            PRIMARY KEY (ot_id, part_id)
-        )
-    """)
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS vins (
-            vin TEXT PRIMARY KEY, model TEXT, year INTEGER, insurance TEXT, owner_name TEXT,
-            owner_email TEXT, owner_phone TEXT, sales_advisor TEXT
-        )
-    """)
-    try:
-        cursor.execute("ALTER TABLE vins ADD COLUMN sales_advisor TEXT")
-    except sqlite3.OperationalError:
-         pass 
-            
-    # --- Datos de prueba ---
-    cursor.execute("INSERT OR IGNORE INTO users (username, password, full_name, role) VALUES (?, ?, ?, ?)", 
-                    ('admin', 'password', 'Administrador', 'admin'))
-    cursor.execute("INSERT OR IGNORE INTO users (username, password, full_name, role) VALUES (?, ?, ?, ?)", 
-                    ('user1', 'pass', 'Usuario Estándar', 'user'))
-
-    cursor.execute("INSERT OR IGNORE INTO advisors (name) VALUES (?)", ('Laura Gómez',))
-    cursor.execute("INSERT OR IGNORE INTO advisors (name) VALUES (?)", ('Juan Pérez',))
-
-    cursor.execute("""
-        INSERT OR IGNORE INTO vins (vin, model, year, insurance, owner_name, owner_email, owner_phone, sales_advisor) 
-        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-    """, ('VIN1234567890', 'Tesla Model 3', 2023, 'Seguros Nacionales', 'Carlos Ruíz', 'carlos@email.com', '5512345678', 'Laura Gómez'))
-    cursor.execute("""
-        INSERT OR IGNORE INTO vins (vin, model, year, insurance, owner_name, owner_email, owner_phone, sales_advisor) 
-        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-    """, ('VIN0987654321', 'Honda Civic', 2022, 'GNP', 'Ana Torres', 'ana@email.com', '5598765432', 'Juan Pérez'))
-    
-    cursor.execute("INSERT OR IGNORE INTO ots (ot_number, sales_advisor, vin, status, request_date) VALUES (?, ?, ?, ?, ?)",
-                    ('OT-001', 'Laura Gómez', 'VIN1234567890', 'Pendiente', '2025-09-10'))
-    cursor.execute("INSERT OR IGNORE INTO ots (ot_number, sales_advisor, vin, status, request_date) VALUES (?, ?, ?, ?, ?)",
-                    ('OT-002', 'Juan Pérez', 'VIN0987654321', 'Pendiente', '2025-09-10'))
-    
-    cursor.execute("INSERT OR IGNORE INTO parts (part_number, part_name) VALUES (?, ?)",
-                    ('NP-010-F', 'Filtro de aire'))
-    cursor.execute("INSERT OR IGNORE INTO parts (part_number, part_name) VALUES (?, ?)",
-                    ('NP-011-B', 'Balatas delanteras'))
-    
-    ot_id_result = cursor.execute("SELECT id FROM ots WHERE ot_number = 'OT-001'").fetchone()
-    if ot_id_result:
-        ot_id = ot_id_result[0]
-        part_id_1_result = cursor.execute("SELECT id FROM parts WHERE part_number = 'NP-010-F'").fetchone()
-        part_id_2_result = cursor.execute("SELECT id FROM parts WHERE part_number = 'NP-011-B'").fetchone()
-
-        if part_id_1_result:
-            part_id_1 = part_id_1_result[0]
-            cursor.execute("INSERT OR IGNORE INTO ot_parts (ot_id, part_id, quantity, status) VALUES (?, ?, ?, ?)",
-                            (ot_id, part_id_1, 2, 'Pedida'))
-        if part_id_2_result:
-            part_id_2 = part_id_2_result[0]
-            cursor.execute("INSERT OR IGNORE INTO ot_parts (ot_id, part_id, quantity, status) VALUES (?, ?, ?, ?)",
-                            (ot_id, part_id_2, 1, 'Pendiente'))
-
-    conn.commit()
-    conn.close()
+from PyQt6.QtGui import QAction, QFont, QPixmap, QIntValidator, QTextDocument
+from PyQt6.QtPrintSupport import QPrintDialog, QPrinter
+from PyQt6.QtCore import (
+    Qt, QAbstractTableModel, QModelIndex, QObject, QRunnable, QStringListModel, QThreadPool,
+    QTimer, pyqtSignal
+)
+from array import array
+from collections import OrderedDict
+from datetime import date
+
+# Esquema, consultas y operaciones viven en el núcleo sin Qt
+import empresa_core as core
+
+# Milisegundos que se espera después de la última tecla antes de buscar, si
+# empresa.ini no indica otro valor en [busqueda] espera_ms
+SEARCH_DEBOUNCE_MS = 300
+# Cada cuánto se revisa si otro equipo (o empresa-cli) cambió la base de datos
+CHANGE_POLL_MS = 2000
 
 # ----------------------------------------------------------------------
 # --- FUNCIONES AUXILIARES ---
@@ -133,7 +41,7 @@ def load_stylesheet(filename="estilo.css"):
     Si se ejecuta como exe, busca en `base_path`. Devuelve una cadena vacía si no existe.
     """
     # si el filename es absoluto, úsalo tal cual, si no, búscalo en base_path
-    path = filename if os.path.isabs(filename) else os.path.join(base_path, filename)
+    path = filename if os.path.isabs(filename) else os.path.join(core.base_path, filename)
     try:
         with open(path, "r", encoding='utf-8') as f:
             return f.read()
@@ -274,17 +182,17 @@ QMenu::separator {
 }
 
 /* =================================================================
-   TABLAS (QTableWidget)
+   TABLAS (QTableWidget / QTableView)
    ================================================================= */
 
-QTableWidget {
+QTableView {
     background-color: white; 
     border: 1px solid #BDC3C7;
     color: #333333; /* Texto negro en las tablas */
 }
 
 /* Items de las tablas */
-QTableWidget::item {
+QTableView::item {
     color: #333333; /* Texto negro en las celdas */
     padding: 5px;
 }
@@ -299,7 +207,7 @@ QHeaderView::section {
 }
 
 /* ComboBox dentro de las celdas de la tabla (Estatus) */
-QTableWidget QComboBox {
+QTableView QComboBox {
     border: 1px solid #BDC3C7;
     padding: 4px;
     color: #333333; /* Texto negro en los combobox de la tabla */
@@ -327,25 +235,316 @@ QDialog QLabel {
 QLineEdit::placeholder {
     color: #7F8C8D; /* Gris para el texto de placeholder */
 }
+
+/* Indicador de carga de las vistas (consultas en segundo plano) */
+#loading_label {
+    color: #7F8C8D;
+    font-style: italic;
+    padding: 0 10px;
+}
+
+/* Aviso en línea de búsqueda sin resultados */
+#empty_label {
+    color: #7F8C8D;
+    padding: 8px;
+}
 """
 
-def update_ot_part_status(ot_id, part_id, new_status):
-    """Actualiza el estatus de una parte específica en una OT."""
-    conn = sqlite3.connect(DATABASE_NAME)
-    cursor = conn.cursor()
-    try:
-        cursor.execute("""
-            UPDATE ot_parts
-            SET status = ?
-            WHERE ot_id = ? AND part_id = ?
-        """, (new_status, ot_id, part_id))
-        conn.commit()
-        return True
-    except Exception as e:
-        print(f"Error al actualizar estatus de parte: {e}")
-        return False
-    finally:
-        conn.close()
+# ----------------------------------------------------------------------
+# --- CONSULTAS EN SEGUNDO PLANO ---
+# ----------------------------------------------------------------------
+
+class _QuerySignals(QObject):
+    finished = pyqtSignal(int, object)
+    failed = pyqtSignal(int, str)
+
+
+class _QueryTask(QRunnable):
+    """Ejecuta una función de lectura con la conexión del hilo del pool."""
+
+    def __init__(self, executor, key, ticket, query_fn):
+        super().__init__()
+        self.executor = executor
+        self.key = key
+        self.ticket = ticket
+        self.query_fn = query_fn
+
+    def run(self):
+        conn = core.get_connection()
+        try:
+            if not self.executor._register(self.key, self.ticket, conn):
+                # Ya hay una consulta más reciente para esta vista; el ejecutor
+                # descarta los avisos de tickets viejos
+                self.executor._signals.failed.emit(self.ticket, "")
+                return
+            result = self.query_fn(conn)
+        except Exception as e:
+            self.executor._signals.failed.emit(self.ticket, str(e))
+        else:
+            self.executor._signals.finished.emit(self.ticket, result)
+        finally:
+            self.executor._unregister(self.key, self.ticket)
+            if conn.in_transaction:
+                conn.rollback()
+
+
+class QueryExecutor(QObject):
+    """Ejecuta lecturas de SQLite fuera del hilo de la interfaz.
+
+    Cada petición se identifica con una clave (normalmente el nombre de la
+    vista). Si llega una petición nueva con la misma clave, la anterior se
+    interrumpe con `sqlite3.Connection.interrupt()` y su resultado se descarta,
+    de modo que la vista solo recibe la respuesta a la última consulta.
+    """
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._pool = QThreadPool(self)
+        # Los hilos no caducan, así conservan su conexión entre consultas
+        self._pool.setExpiryTimeout(-1)
+        self._lock = threading.Lock()
+        self._tickets = itertools.count(1)
+        self._latest = {}     # clave -> último ticket pedido
+        self._running = {}    # clave -> (ticket, conexión en uso)
+        self._callbacks = {}  # ticket -> (clave, on_result, on_error)
+        self._signals = _QuerySignals()
+        self._signals.finished.connect(self._deliver)
+        self._signals.failed.connect(self._fail)
+
+    def submit(self, key, query_fn, on_result, on_error=None):
+        """Programa `query_fn(conn)` y llama a `on_result(resultado)` en el hilo de la GUI."""
+        ticket = next(self._tickets)
+        with self._lock:
+            self._latest[key] = ticket
+            running = self._running.get(key)
+            if running:
+                running[1].interrupt()
+        self._callbacks[ticket] = (key, on_result, on_error)
+        self._pool.start(_QueryTask(self, key, ticket, query_fn))
+        return ticket
+
+    def cancel(self, key):
+        """Descarta e interrumpe la consulta pendiente con esa clave."""
+        with self._lock:
+            self._latest.pop(key, None)
+            running = self._running.get(key)
+            if running:
+                running[1].interrupt()
+
+    def is_pending(self, key):
+        with self._lock:
+            return key in self._latest
+
+    def shutdown(self):
+        """Interrumpe las consultas en curso y espera a que terminen los hilos."""
+        with self._lock:
+            self._latest.clear()
+            for _, conn in self._running.values():
+                conn.interrupt()
+        self._pool.waitForDone()
+
+    def _register(self, key, ticket, conn):
+        with self._lock:
+            if self._latest.get(key) != ticket:
+                return False
+            self._running[key] = (ticket, conn)
+            return True
+
+    def _unregister(self, key, ticket):
+        with self._lock:
+            running = self._running.get(key)
+            if running and running[0] == ticket:
+                del self._running[key]
+
+    def _take_callbacks(self, ticket):
+        """Devuelve los callbacks del ticket, o None si ya fue reemplazado."""
+        key, on_result, on_error = self._callbacks.pop(ticket, (None, None, None))
+        with self._lock:
+            if key is None or self._latest.get(key) != ticket:
+                return None
+            del self._latest[key]
+        return on_result, on_error
+
+    def _deliver(self, ticket, result):
+        callbacks = self._take_callbacks(ticket)
+        if callbacks:
+            callbacks[0](result)
+
+    def _fail(self, ticket, message):
+        callbacks = self._take_callbacks(ticket)
+        if not callbacks:
+            return
+        if callbacks[1]:
+            callbacks[1](message)
+        else:
+            print(f"Error en consulta en segundo plano: {message}")
+
+
+_query_executor = None
+
+def query_executor():
+    """Devuelve el ejecutor de consultas compartido por todas las vistas."""
+    global _query_executor
+    if _query_executor is None:
+        app = QApplication.instance()
+        _query_executor = QueryExecutor(app)
+        app.aboutToQuit.connect(_query_executor.shutdown)
+    return _query_executor
+
+class _WriteSignals(QObject):
+    done = pyqtSignal(object, object, object)
+
+
+_write_signals = None
+
+def when_written(future, on_done, on_error=None):
+    """Llama a `on_done(resultado)` u `on_error(excepción)` en el hilo de la GUI.
+
+    `future` es el que devuelven las escrituras del núcleo, que terminan en el
+    hilo escritor; la señal lleva el aviso de vuelta al hilo de la interfaz.
+    """
+    global _write_signals
+    if _write_signals is None:
+        _write_signals = _WriteSignals(QApplication.instance())
+        _write_signals.done.connect(_deliver_write)
+    signals = _write_signals
+    future.add_done_callback(lambda f: signals.done.emit(f, on_done, on_error))
+
+def _deliver_write(future, on_done, on_error):
+    error = future.exception()
+    if error is None:
+        on_done(future.result())
+    elif on_error:
+        on_error(error)
+    else:
+        print(f"Error en escritura: {error}")
+
+class _JobSignals(QObject):
+    progress = pyqtSignal(int)
+    finished = pyqtSignal(object)
+    failed = pyqtSignal(str)
+
+
+class BackgroundJob(QRunnable):
+    """Trabajo largo (importar, exportar) en un hilo del pool global.
+
+    `job(progress, is_cancelled)` recibe la función para informar el avance y
+    la que indica si se pidió cancelar; su resultado llega por `finished`.
+    """
+
+    def __init__(self, job):
+        super().__init__()
+        self.job = job
+        self.signals = _JobSignals()
+        self._cancelled = threading.Event()
+
+    def cancel(self):
+        self._cancelled.set()
+
+    def start(self):
+        QThreadPool.globalInstance().start(self)
+
+    def run(self):
+        try:
+            result = self.job(self.signals.progress.emit, self._cancelled.is_set)
+        except Exception as e:
+            self.signals.failed.emit(str(e))
+        else:
+            self.signals.finished.emit(result)
+        finally:
+            # Los hilos del pool global terminan tras un rato sin trabajo
+            core.close_thread_connection()
+
+def create_loading_label():
+    """Indicador no bloqueante que las vistas muestran mientras esperan una consulta."""
+    label = QLabel("⏳ Cargando...")
+    label.setObjectName("loading_label")
+    label.setVisible(False)
+    return label
+
+def show_query_error(parent, message):
+    QMessageBox.critical(parent, "Error de DB", f"Ocurrió un error al consultar la base de datos: {message}")
+
+def show_write_error(parent, error, action):
+    """Informa un error de escritura; la base ocupada se explica sin el detalle técnico."""
+    if core.is_busy_error(error):
+        QMessageBox.warning(parent, "Base de Datos Ocupada",
+                            f"No se pudo {action}: otro equipo está escribiendo en la base de datos. "
+                            "Intente de nuevo en unos segundos.")
+    else:
+        QMessageBox.critical(parent, "Error de DB", f"Ocurrió un error al {action}: {error}")
+
+# ----------------------------------------------------------------------
+# --- BÚSQUEDA INCREMENTAL ---
+# ----------------------------------------------------------------------
+
+_search_delay_ms = None
+
+def load_search_delay(path=None):
+    """Lee `espera_ms` de la sección [busqueda] de `empresa.ini`.
+
+    Sin la clave, o con un valor que no sea un entero no negativo, se usa
+    SEARCH_DEBOUNCE_MS.
+    """
+    path = path or core.CONFIG_FILE
+    parser = configparser.ConfigParser()
+    parser.read(path, encoding="utf-8")
+    value = parser.get("busqueda", "espera_ms", fallback="").strip()
+    if not value:
+        return SEARCH_DEBOUNCE_MS
+    if not value.isdigit():
+        print(f"Valor inválido para espera_ms en {path}: '{value}'")
+        return SEARCH_DEBOUNCE_MS
+    return int(value)
+
+def search_delay():
+    """Espera de las búsquedas incrementales (se lee de la configuración una sola vez)."""
+    global _search_delay_ms
+    if _search_delay_ms is None:
+        _search_delay_ms = load_search_delay()
+    return _search_delay_ms
+
+class DebouncedSearch(QObject):
+    """Agrupa las pulsaciones de un QLineEdit y emite el término una sola vez.
+
+    `triggered` se emite cuando pasan `delay_ms` sin cambios en el texto, o de
+    inmediato con `flush()` (botón Buscar o Enter). Sin `delay_ms` se usa la
+    espera configurada en `empresa.ini` (ver `search_delay`).
+    """
+    triggered = pyqtSignal(str)
+
+    def __init__(self, line_edit, delay_ms=None, parent=None, user_edits_only=False):
+        super().__init__(parent or line_edit)
+        self.line_edit = line_edit
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self.set_delay(search_delay() if delay_ms is None else delay_ms)
+        self._timer.timeout.connect(self.flush)
+        # Con `user_edits_only`, los cambios hechos por código (p. ej. al elegir
+        # una sugerencia) no disparan otra búsqueda
+        if user_edits_only:
+            line_edit.textEdited.connect(self._timer.start)
+        else:
+            line_edit.textChanged.connect(self._timer.start)
+        line_edit.returnPressed.connect(self.flush)
+
+    def set_delay(self, delay_ms):
+        self._timer.setInterval(delay_ms)
+
+    def cancel(self):
+        self._timer.stop()
+
+    def flush(self):
+        self._timer.stop()
+        self.triggered.emit(self.line_edit.text().strip())
+
+
+def create_empty_results_label():
+    """Aviso en línea para búsquedas sin resultados (no roba el foco al usuario)."""
+    label = QLabel()
+    label.setObjectName("empty_label")
+    label.setVisible(False)
+    return label
 
 # ----------------------------------------------------------------------
 # --- CLASES DE DIÁLOGO (Se mantienen sin cambios) ---
@@ -394,15 +593,10 @@ class LoginWindow(QDialog):
         username = self.username_input.text()
         password = self.password_input.text()
         
-        conn = sqlite3.connect(DATABASE_NAME)
-        cursor = conn.cursor()
-        cursor.execute("SELECT * FROM users WHERE username = ? AND password = ?", (username, password))
-        user = cursor.fetchone()
-        conn.close()
+        user = core.authenticate(username, password)
         
         if user:
-            LoginWindow.username_logged = user[3]
-            LoginWindow.user_role = user[4]
+            LoginWindow.username_logged, LoginWindow.user_role = user
             QMessageBox.information(self, "Acceso exitoso", f"¡Bienvenido, {LoginWindow.username_logged} (Rol: {LoginWindow.user_role})!")
             self.accept()
         else:
@@ -452,25 +646,175 @@ class AddUserDialog(QDialog):
             QMessageBox.warning(self, "Advertencia", "Todos los campos son obligatorios.")
             return
 
-        conn = sqlite3.connect(DATABASE_NAME)
-        cursor = conn.cursor()
-        
-        try:
-            cursor.execute("""
-                INSERT INTO users (username, password, full_name, role)
-                VALUES (?, ?, ?, ?)
-            """, (username, password, full_name, role))
-            
-            conn.commit()
+        def saved(_):
             QMessageBox.information(self, "Éxito", f"Usuario '{username}' (Rol: {role}) creado exitosamente.")
             self.accept()
-        
-        except sqlite3.IntegrityError:
-            QMessageBox.warning(self, "Error", f"El nombre de usuario '{username}' ya existe.")
-        except Exception as e:
-            QMessageBox.critical(self, "Error de DB", f"Ocurrió un error al crear el usuario: {e}")
-        finally:
-            conn.close()
+
+        def failed(error):
+            self.setEnabled(True)
+            if isinstance(error, sqlite3.IntegrityError):
+                QMessageBox.warning(self, "Error", f"El nombre de usuario '{username}' ya existe.")
+            else:
+                show_write_error(self, error, "crear el usuario")
+
+        # El diálogo queda inactivo hasta que el hilo escritor confirme
+        self.setEnabled(False)
+        when_written(core.create_user(username, password, full_name, role), saved, failed)
+
+class OTPartsModel(QAbstractTableModel):
+    """Partes asignadas a una OT, con el estatus editable en la última columna.
+
+    Editar el estatus no escribe en la base de datos: el cambio queda
+    pendiente (en negritas) hasta que se guardan todos juntos con
+    `pending_changes` y `mark_saved`. `pending_count_changed` avisa cuántos
+    hay. Las filas se identifican por id de parte, así que ordenar no las
+    confunde.
+    """
+    pending_count_changed = pyqtSignal(int)
+
+    HEADERS = ["No. de Parte", "Nombre", "Cantidad", "Estado Actual", "Cambiar Estado"]
+    STATUS_COLUMN = 3
+    EDIT_COLUMN = 4
+    PART_ID = 4  # posición del id en las filas de core.list_ot_parts
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._rows = []  # [número, nombre, cantidad, estatus, id de parte]
+        self._requested = {}  # id de parte -> estatus elegido aún sin confirmar
+        self._sort = None  # (columna, orden) elegido en el encabezado
+
+    def set_rows(self, rows):
+        """Carga las partes; los cambios pendientes de partes que siguen en la OT se conservan."""
+        self.beginResetModel()
+        self._rows = [list(row) for row in rows]
+        saved = {row[self.PART_ID]: row[self.STATUS_COLUMN] for row in self._rows}
+        self._requested = {part_id: status for part_id, status in self._requested.items()
+                           if part_id in saved and saved[part_id] != status}
+        if self._sort:
+            self._rows.sort(key=self._sort_key(self._sort[0]),
+                            reverse=self._sort[1] == Qt.SortOrder.DescendingOrder)
+        self.endResetModel()
+        self.pending_count_changed.emit(len(self._requested))
+
+    def pending_changes(self):
+        """Cambios sin guardar: lista de (id de parte, estatus nuevo)."""
+        return list(self._requested.items())
+
+    def request_status(self, rows, status):
+        """Deja pendiente `status` en las filas `rows` (p. ej. marcar varias como entregadas)."""
+        for row_idx in rows:
+            row = self._rows[row_idx]
+            if status == row[self.STATUS_COLUMN]:
+                self._requested.pop(row[self.PART_ID], None)
+            else:
+                self._requested[row[self.PART_ID]] = status
+        if rows:
+            self.dataChanged.emit(self.index(min(rows), self.EDIT_COLUMN),
+                                  self.index(max(rows), self.EDIT_COLUMN))
+        self.pending_count_changed.emit(len(self._requested))
+
+    def mark_saved(self, changes):
+        """Toma como guardados los cambios (id de parte, estatus) ya escritos."""
+        changes = dict(changes)
+        for part_id, status in changes.items():
+            if self._requested.get(part_id) == status:
+                del self._requested[part_id]
+        for row in self._rows:
+            if row[self.PART_ID] in changes:
+                row[self.STATUS_COLUMN] = changes[row[self.PART_ID]]
+        if self._rows:
+            self.dataChanged.emit(self.index(0, self.STATUS_COLUMN),
+                                  self.index(len(self._rows) - 1, self.EDIT_COLUMN))
+        self.pending_count_changed.emit(len(self._requested))
+
+    def _shown_status(self, row):
+        return self._requested.get(row[self.PART_ID], row[self.STATUS_COLUMN])
+
+    # --- API de QAbstractTableModel ---
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.HEADERS)
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if role == Qt.ItemDataRole.DisplayRole and orientation == Qt.Orientation.Horizontal:
+            return self.HEADERS[section]
+        return super().headerData(section, orientation, role)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        row = self._rows[index.row()]
+        if index.column() == self.EDIT_COLUMN and row[self.PART_ID] in self._requested:
+            # Cambio sin guardar
+            if role == Qt.ItemDataRole.FontRole:
+                font = QFont()
+                font.setBold(True)
+                return font
+            if role == Qt.ItemDataRole.ToolTipRole:
+                return f"Sin guardar (guardado: {row[self.STATUS_COLUMN]})"
+        if role not in (Qt.ItemDataRole.DisplayRole, Qt.ItemDataRole.EditRole):
+            return None
+        if index.column() == self.EDIT_COLUMN:
+            return self._shown_status(row)
+        return row[index.column()]
+
+    def flags(self, index):
+        flags = super().flags(index)
+        if index.isValid() and index.column() == self.EDIT_COLUMN:
+            flags |= Qt.ItemFlag.ItemIsEditable
+        return flags
+
+    def setData(self, index, value, role=Qt.ItemDataRole.EditRole):
+        if role != Qt.ItemDataRole.EditRole or index.column() != self.EDIT_COLUMN:
+            return False
+        if value == self._shown_status(self._rows[index.row()]):
+            return False
+        self.request_status([index.row()], value)
+        return True
+
+    def sort(self, column, order=Qt.SortOrder.AscendingOrder):
+        self._sort = (column, order)
+        self.layoutAboutToBeChanged.emit()
+        # Los índices persistentes (p. ej. el editor abierto) siguen a su parte
+        persistent = self.persistentIndexList()
+        part_ids = [self._rows[index.row()][self.PART_ID] for index in persistent]
+        self._rows.sort(key=self._sort_key(column), reverse=order == Qt.SortOrder.DescendingOrder)
+        positions = {row[self.PART_ID]: row_idx for row_idx, row in enumerate(self._rows)}
+        self.changePersistentIndexList(
+            persistent, [self.index(positions[part_id], index.column())
+                         for part_id, index in zip(part_ids, persistent)])
+        self.layoutChanged.emit()
+
+    def _sort_key(self, column):
+        value = self._shown_status if column == self.EDIT_COLUMN else (lambda row: row[column])
+
+        def key(row):
+            # Las celdas sin valor (NULL) van al final y nunca se comparan con texto o números
+            shown = value(row)
+            return (shown is None, shown if shown is not None else "")
+        return key
+
+
+class StatusDelegate(QStyledItemDelegate):
+    """Editor de estatus: crea un QComboBox solo para la celda que se está editando."""
+
+    def createEditor(self, parent, option, index):
+        combo = QComboBox(parent)
+        combo.addItems(core.STATUSES)
+        # Se guarda en cuanto se elige, sin esperar a que la celda pierda el foco
+        combo.activated.connect(lambda _: (self.commitData.emit(combo), self.closeEditor.emit(combo)))
+        QTimer.singleShot(0, combo.showPopup)
+        return combo
+
+    def setEditorData(self, editor, index):
+        editor.setCurrentText(index.data(Qt.ItemDataRole.EditRole))
+
+    def setModelData(self, editor, model, index):
+        model.setData(index, editor.currentText(), Qt.ItemDataRole.EditRole)
+
 
 class OTPartsDialog(QDialog):
     def __init__(self, ot_number, estilo_css=""):
@@ -478,7 +822,6 @@ class OTPartsDialog(QDialog):
         self.ot_number = ot_number
         self.estilo_css = estilo_css
         self.ot_id = self._get_ot_id(ot_number) 
-        self.row_to_part_id = {} 
 
         self.setWindowTitle(f"Partes para OT: {ot_number}")
         self.setGeometry(200, 200, 750, 500) 
@@ -499,12 +842,22 @@ class OTPartsDialog(QDialog):
         header_layout.addWidget(self.assign_button)
         layout.addLayout(header_layout)
         
-        self.parts_table = QTableWidget()
-        self.parts_table.setColumnCount(5)
-        self.parts_table.setHorizontalHeaderLabels(["No. de Parte", "Nombre", "Cantidad", "Estado Actual", "Cambiar Estado"])
-        self.parts_table.setEditTriggers(QTableWidget.EditTrigger.NoEditTriggers)
+        # Un modelo y un delegado en lugar de un QComboBox por fila: el
+        # editor existe solo mientras se edita una celda
+        self.parts_model = OTPartsModel(self)
+        self.parts_table = QTableView()
+        self.parts_table.setModel(self.parts_model)
+        self.parts_table.setItemDelegateForColumn(OTPartsModel.EDIT_COLUMN, StatusDelegate(self.parts_table))
+        self.parts_table.setEditTriggers(QTableView.EditTrigger.SelectedClicked
+                                         | QTableView.EditTrigger.DoubleClicked
+                                         | QTableView.EditTrigger.EditKeyPressed)
+        self.parts_table.setSelectionBehavior(QTableView.SelectionBehavior.SelectRows)
+        self.parts_table.setSelectionMode(QTableView.SelectionMode.ExtendedSelection)
+        self.parts_table.verticalHeader().setVisible(False)
         
         self.load_ot_parts()
+        self.parts_table.horizontalHeader().setSortIndicator(0, Qt.SortOrder.AscendingOrder)
+        self.parts_table.setSortingEnabled(True)
         
         self.parts_table.horizontalHeader().setSectionResizeMode(0, QHeaderView.ResizeMode.ResizeToContents)
         self.parts_table.horizontalHeader().setSectionResizeMode(1, QHeaderView.ResizeMode.Stretch)
@@ -512,17 +865,29 @@ class OTPartsDialog(QDialog):
         
         layout.addWidget(self.parts_table)
         
-        
+        # Los cambios de estatus se acumulan y se guardan juntos
+        actions_layout = QHBoxLayout()
+        mark_selected_button = QPushButton(f"Marcar seleccionadas como {core.STATUS_DELIVERED}")
+        mark_selected_button.clicked.connect(self.mark_selected_delivered)
+        mark_all_button = QPushButton(f"Marcar todas como {core.STATUS_DELIVERED}")
+        mark_all_button.clicked.connect(self.mark_all_delivered)
+        self.pending_label = QLabel()
+        self.save_button = QPushButton("Guardar")
+        self.save_button.clicked.connect(self.save_status_changes)
         close_button = QPushButton("Cerrar")
         close_button.clicked.connect(self.close)
-        layout.addWidget(close_button)
+        actions_layout.addWidget(mark_selected_button)
+        actions_layout.addWidget(mark_all_button)
+        actions_layout.addStretch()
+        actions_layout.addWidget(self.pending_label)
+        actions_layout.addWidget(self.save_button)
+        actions_layout.addWidget(close_button)
+        layout.addLayout(actions_layout)
+        self.parts_model.pending_count_changed.connect(self._update_pending_state)
+        self._update_pending_state(0)
 
     def _get_ot_id(self, ot_number):
-        conn = sqlite3.connect(DATABASE_NAME)
-        cursor = conn.cursor()
-        result = cursor.execute("SELECT id FROM ots WHERE ot_number = ?", (ot_number,)).fetchone()
-        conn.close()
-        return result[0] if result else None
+        return core.get_ot_id(ot_number)
 
     def open_assign_dialog(self):
         if self.ot_id is None:
@@ -534,66 +899,54 @@ class OTPartsDialog(QDialog):
             self.load_ot_parts()
 
     def load_ot_parts(self):
-        conn = sqlite3.connect(DATABASE_NAME)
-        cursor = conn.cursor()
-
-        query = """
-        SELECT p.part_number, p.part_name, op.quantity, op.status, p.id
-        FROM ot_parts AS op
-        JOIN ots AS o ON o.id = op.ot_id
-        JOIN parts AS p ON p.id = op.part_id
-        WHERE o.ot_number = ?
-        """
-        cursor.execute(query, (self.ot_number,))
-        parts_data = cursor.fetchall()
-        conn.close()
-        
-        self.parts_table.setRowCount(len(parts_data))
-        self.row_to_part_id.clear()
-        
-        part_statuses = ["Pendiente", "Pedida", "Entregada"]
+        self.parts_model.set_rows(core.list_ot_parts(self.ot_number))
 
-        for row_idx, row_data in enumerate(parts_data):
-            part_number, part_name, quantity, current_status, part_id = row_data
-            
-            self.row_to_part_id[row_idx] = part_id
+    def mark_selected_delivered(self):
+        rows = sorted({index.row() for index in self.parts_table.selectionModel().selectedRows()})
+        if not rows:
+            QMessageBox.information(self, "Sin Selección", "Selecciona una o más partes de la tabla.")
+            return
+        self.parts_model.request_status(rows, core.STATUS_DELIVERED)
 
-            self.parts_table.setItem(row_idx, 0, QTableWidgetItem(part_number))
-            self.parts_table.setItem(row_idx, 1, QTableWidgetItem(part_name))
-            self.parts_table.setItem(row_idx, 2, QTableWidgetItem(str(quantity)))
-            self.parts_table.setItem(row_idx, 3, QTableWidgetItem(current_status))
+    def mark_all_delivered(self):
+        self.parts_model.request_status(range(self.parts_model.rowCount()), core.STATUS_DELIVERED)
 
-            status_combo = QComboBox(self)
-            status_combo.addItems(part_statuses)
-            status_combo.setCurrentText(current_status)
-            
-            status_combo.currentIndexChanged.connect(
-                lambda index, r=row_idx, c=status_combo: self.handle_status_change(r, c.currentText())
-            )
-            
-            self.parts_table.setCellWidget(row_idx, 4, status_combo)
-            
-        self.parts_table.resizeColumnsToContents()
-        self.parts_table.setSortingEnabled(True)
+    def _update_pending_state(self, count):
+        """Indicador de cambios sin guardar junto al botón Guardar."""
+        self.pending_label.setText(f"● {count} cambio(s) sin guardar" if count else "Sin cambios pendientes")
+        self.save_button.setEnabled(count > 0)
+        self.setWindowTitle(f"Partes para OT: {self.ot_number}" + (" *" if count else ""))
 
-    def handle_status_change(self, row_index, new_status):
-        part_id = self.row_to_part_id.get(row_index)
-        
-        if not part_id or self.ot_id is None:
-            QMessageBox.critical(self, "Error", "No se pudo identificar la Parte o la OT para actualizar.")
-            self.load_ot_parts()
+    def save_status_changes(self):
+        """Guarda todos los cambios de estatus pendientes en una sola transacción."""
+        changes = self.parts_model.pending_changes()
+        if not changes:
+            return
+        if self.ot_id is None:
+            QMessageBox.critical(self, "Error", "No se pudo identificar la OT para actualizar.")
             return
 
-        part_number_item = self.parts_table.item(row_index, 0)
-        part_number = part_number_item.text() if part_number_item else "Desconocida"
-        
-        if update_ot_part_status(self.ot_id, part_id, new_status):
-            self.parts_table.setItem(row_index, 3, QTableWidgetItem(new_status))
-            QMessageBox.information(self, "Actualización Exitosa", 
-                                    f"Estatus de la parte {part_number} actualizado a '{new_status}' para OT {self.ot_number}.")
-        else:
-            QMessageBox.critical(self, "Error de DB", "Fallo al actualizar el estatus en la base de datos.")
-            self.load_ot_parts()
+        def saved(_):
+            self.setEnabled(True)
+            self.parts_model.mark_saved(changes)
+
+        def failed(error):
+            # Los cambios siguen pendientes para volver a intentarlo
+            self.setEnabled(True)
+            show_write_error(self, error, "guardar los estatus")
+
+        self.setEnabled(False)
+        when_written(core.update_ot_part_statuses(self.ot_id, changes), saved, failed)
+
+    def reject(self):
+        # Cerrar (botón, Esc o la ventana) con cambios sin guardar pide confirmación
+        count = len(self.parts_model.pending_changes())
+        if count and QMessageBox.question(
+                self, "Cambios sin Guardar",
+                f"Hay {count} cambio(s) de estatus sin guardar. ¿Descartarlos y cerrar?"
+        ) != QMessageBox.StandardButton.Yes:
+            return
+        super().reject()
 
 class AddOTWindow(QDialog):
     def __init__(self, estilo_css):
@@ -628,7 +981,7 @@ class AddOTWindow(QDialog):
         
         layout.addWidget(QLabel("Estado:"))
         self.ot_status_input = QComboBox()
-        self.ot_status_input.addItems(["Pendiente", "Pedida", "Entregada"])
+        self.ot_status_input.addItems(core.STATUSES)
         layout.addWidget(self.ot_status_input)
         
         save_button = QPushButton("Guardar OT")
@@ -640,12 +993,7 @@ class AddOTWindow(QDialog):
         self.setLayout(layout)
 
     def load_advisors(self):
-        conn = sqlite3.connect(DATABASE_NAME)
-        cursor = conn.cursor()
-        cursor.execute("SELECT name FROM advisors ORDER BY name")
-        advisors = [row[0] for row in cursor.fetchall()]
-        conn.close()
-        self.ot_advisor_input.addItems(advisors)
+        self.ot_advisor_input.addItems(core.cached_advisors())
         
     def save_ot(self):
         ot_number = self.ot_number_input.text().strip()
@@ -658,31 +1006,21 @@ class AddOTWindow(QDialog):
             QMessageBox.warning(self, "Advertencia", "Todos los campos (OT, Asesor, VIN y Fecha) son obligatorios.")
             return
 
-        conn = sqlite3.connect(DATABASE_NAME)
-        cursor = conn.cursor()
-        
-        try:
-            cursor.execute("SELECT vin FROM vins WHERE vin = ?", (vin,))
-            if not cursor.fetchone():
-                QMessageBox.warning(self, "Error de Validación", "El VIN ingresado no existe en la base de datos de vehículos. Por favor, regístrelo primero.")
-                conn.close()
-                return
-
-            cursor.execute("""
-                INSERT INTO ots (ot_number, sales_advisor, vin, status, request_date)
-                VALUES (?, ?, ?, ?, ?)
-            """, (ot_number, sales_advisor, vin, status, request_date))
-            
-            conn.commit()
+        def saved(_):
             QMessageBox.information(self, "Éxito", f"Orden de Trabajo {ot_number} guardada exitosamente.")
             self.accept()
-        
-        except sqlite3.IntegrityError:
-            QMessageBox.warning(self, "Error", f"El número de OT '{ot_number}' ya existe o faltan datos obligatorios.")
-        except Exception as e:
-            QMessageBox.critical(self, "Error de DB", f"Ocurrió un error al guardar la OT: {e}")
-        finally:
-            conn.close()
+
+        def failed(error):
+            self.setEnabled(True)
+            if isinstance(error, core.ValidationError):
+                QMessageBox.warning(self, "Error de Validación", str(error))
+            elif isinstance(error, sqlite3.IntegrityError):
+                QMessageBox.warning(self, "Error", f"El número de OT '{ot_number}' ya existe o faltan datos obligatorios.")
+            else:
+                show_write_error(self, error, "guardar la OT")
+
+        self.setEnabled(False)
+        when_written(core.create_ot(ot_number, sales_advisor, vin, status, request_date), saved, failed)
 
 class AddVINWindow(QDialog):
     def __init__(self, estilo_css):
@@ -722,12 +1060,7 @@ class AddVINWindow(QDialog):
         return input_field
         
     def _load_advisors_combo(self):
-        conn = sqlite3.connect(DATABASE_NAME)
-        cursor = conn.cursor()
-        cursor.execute("SELECT name FROM advisors ORDER BY name")
-        advisors = [row[0] for row in cursor.fetchall()]
-        conn.close()
-        self.advisor_combo.addItems(advisors)
+        self.advisor_combo.addItems(core.cached_advisors())
 
     def save_vin(self):
         vin = self.vin_input.text().strip().upper()
@@ -743,25 +1076,20 @@ class AddVINWindow(QDialog):
             QMessageBox.warning(self, "Advertencia", "Los campos VIN, Modelo, Año, Propietario y Asesor son obligatorios.")
             return
 
-        conn = sqlite3.connect(DATABASE_NAME)
-        cursor = conn.cursor()
-        
-        try:
-            cursor.execute("""
-                INSERT INTO vins (vin, model, year, insurance, owner_name, owner_email, owner_phone, sales_advisor)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-            """, (vin, model, year, insurance, owner_name, owner_email, owner_phone, sales_advisor))
-            
-            conn.commit()
+        def saved(_):
             QMessageBox.information(self, "Éxito", f"Vehículo {vin} registrado exitosamente.")
             self.accept()
-        
-        except sqlite3.IntegrityError:
-            QMessageBox.warning(self, "Error", f"El VIN '{vin}' ya existe.")
-        except Exception as e:
-            QMessageBox.critical(self, "Error de DB", f"Ocurrió un error al guardar el VIN: {e}")
-        finally:
-            conn.close()
+
+        def failed(error):
+            self.setEnabled(True)
+            if isinstance(error, sqlite3.IntegrityError):
+                QMessageBox.warning(self, "Error", f"El VIN '{vin}' ya existe.")
+            else:
+                show_write_error(self, error, "guardar el VIN")
+
+        self.setEnabled(False)
+        when_written(core.create_vehicle(vin, model, year, insurance, owner_name, owner_email,
+                                         owner_phone, sales_advisor), saved, failed)
 
 class AddPartWindow(QDialog):
     def __init__(self, estilo_css):
@@ -796,25 +1124,70 @@ class AddPartWindow(QDialog):
             QMessageBox.warning(self, "Advertencia", "Ambos campos son obligatorios.")
             return
             
-        conn = sqlite3.connect(DATABASE_NAME)
-        cursor = conn.cursor()
-        
-        try:
-            cursor.execute("""
-                INSERT INTO parts (part_number, part_name)
-                VALUES (?, ?)
-            """, (part_number, part_name))
-            
-            conn.commit()
+        def saved(_):
             QMessageBox.information(self, "Éxito", f"Parte '{part_number}' registrada exitosamente en el inventario.")
             self.accept()
-        
-        except sqlite3.IntegrityError:
-            QMessageBox.warning(self, "Error", f"El número de parte '{part_number}' ya existe.")
-        except Exception as e:
-            QMessageBox.critical(self, "Error de DB", f"Ocurrió un error al guardar la parte: {e}")
-        finally:
-            conn.close()
+
+        def failed(error):
+            self.setEnabled(True)
+            if isinstance(error, sqlite3.IntegrityError):
+                QMessageBox.warning(self, "Error", f"El número de parte '{part_number}' ya existe.")
+            else:
+                show_write_error(self, error, "guardar la parte")
+
+        self.setEnabled(False)
+        when_written(core.create_part(part_number, part_name), saved, failed)
+
+class PartPicker(QLineEdit):
+    """Campo con autocompletado sobre el catálogo de partes.
+
+    Cada pausa al escribir consulta el índice de trigramas en segundo plano y
+    ofrece solo las `MAX_SUGGESTIONS` mejores coincidencias, sin cargar el
+    catálogo en memoria.
+    """
+    MAX_SUGGESTIONS = 20
+    DEBOUNCE_MS = 150
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setPlaceholderText("Escriba número o nombre de parte...")
+        self.part_map = {}  # texto de la sugerencia -> id de parte
+        self._query_key = f"part_picker:{id(self)}"
+
+        self._suggestions = QStringListModel(self)
+        self._completer = QCompleter(self._suggestions, self)
+        self._completer.setCompletionMode(QCompleter.CompletionMode.UnfilteredPopupCompletion)
+        self._completer.setCaseSensitivity(Qt.CaseSensitivity.CaseInsensitive)
+        self.setCompleter(self._completer)
+
+        self._search = DebouncedSearch(self, self.DEBOUNCE_MS, user_edits_only=True)
+        self._search.triggered.connect(self._suggest)
+
+    def _suggest(self, search_term):
+        if not search_term:
+            query_executor().cancel(self._query_key)
+            self._suggestions.setStringList([])
+            return
+        query_executor().submit(
+            self._query_key,
+            lambda conn: core.list_parts(search_term, self.MAX_SUGGESTIONS, order_by="rank", conn=conn),
+            self._show_suggestions,
+        )
+
+    def _show_suggestions(self, rows):
+        self.part_map = {f"{number} - {name}": part_id for part_id, number, name in rows}
+        self._suggestions.setStringList(list(self.part_map))
+        if rows and self.hasFocus():
+            self._completer.complete()
+
+    def selected_part_id(self):
+        """Id de la parte elegida; también acepta un número de parte escrito completo."""
+        text = self.text().strip()
+        if text in self.part_map:
+            return self.part_map[text]
+        if not text:
+            return None
+        return core.cached_part_id(text)
 
 class AssignPartsToOTDialog(QDialog):
     def __init__(self, ot_id, ot_number, estilo_css):
@@ -831,9 +1204,8 @@ class AssignPartsToOTDialog(QDialog):
         layout.addWidget(title_label, 0, 0, 1, 2)
 
         layout.addWidget(QLabel("Seleccionar Parte:"), 1, 0)
-        self.part_combo = QComboBox()
-        self._load_available_parts()
-        layout.addWidget(self.part_combo, 1, 1)
+        self.part_picker = PartPicker()
+        layout.addWidget(self.part_picker, 1, 1)
 
         layout.addWidget(QLabel("Cantidad Requerida:"), 2, 0)
         self.quantity_input = QLineEdit("1")
@@ -842,64 +1214,43 @@ class AssignPartsToOTDialog(QDialog):
         
         layout.addWidget(QLabel("Estado Inicial:"), 3, 0)
         self.status_combo = QComboBox()
-        self.status_combo.addItems(["Pendiente", "Pedida", "Entregada"])
-        self.status_combo.setCurrentText("Pendiente")
+        self.status_combo.addItems(core.STATUSES)
+        self.status_combo.setCurrentText(core.STATUS_PENDING)
         layout.addWidget(self.status_combo, 3, 1)
 
         save_button = QPushButton(f"Asignar a {ot_number}")
         save_button.clicked.connect(self.assign_part)
         layout.addWidget(save_button, 4, 0, 1, 2)
         
-    def _load_available_parts(self):
-        conn = sqlite3.connect(DATABASE_NAME)
-        cursor = conn.cursor()
-        cursor.execute("SELECT part_number, part_name, id FROM parts ORDER BY part_number")
-        parts = cursor.fetchall()
-        conn.close()
-        
-        self.part_map = {} 
-        if not parts:
-            self.part_combo.addItem("No hay partes en inventario")
-            return
-            
-        for number, name, part_id in parts:
-            display_text = f"{number} - {name}"
-            self.part_combo.addItem(display_text)
-            self.part_map[display_text] = part_id
-
     def assign_part(self):
-        selected_text = self.part_combo.currentText()
         quantity_text = self.quantity_input.text()
         status = self.status_combo.currentText()
         
-        if selected_text == "No hay partes en inventario" or not quantity_text:
+        if not self.part_picker.text().strip() or not quantity_text:
             QMessageBox.warning(self, "Error", "Selecciona una parte y una cantidad válida.")
             return
 
+        part_id = self.part_picker.selected_part_id()
+        if part_id is None:
+            QMessageBox.warning(self, "Error", "La parte indicada no existe en el inventario. Elige una de las sugerencias.")
+            return
+
         try:
-            part_id = self.part_map[selected_text]
             quantity = int(quantity_text)
-        except (KeyError, ValueError):
+        except ValueError:
             QMessageBox.critical(self, "Error", "Error al obtener ID de parte o cantidad inválida.")
             return
 
-        conn = sqlite3.connect(DATABASE_NAME)
-        cursor = conn.cursor()
-        
-        try:
-            cursor.execute("""
-                INSERT OR REPLACE INTO ot_parts (ot_id, part_id, quantity, status)
-                VALUES (?, ?, ?, ?)
-            """, (self.ot_id, part_id, quantity, status))
-            
-            conn.commit()
+        def saved(_):
             QMessageBox.information(self, "Éxito", f"Parte asignada a OT {self.ot_number} con éxito.")
             self.accept()
-        
-        except Exception as e:
-            QMessageBox.critical(self, "Error de DB", f"Ocurrió un error al asignar la parte: {e}")
-        finally:
-            conn.close()
+
+        def failed(error):
+            self.setEnabled(True)
+            show_write_error(self, error, "asignar la parte")
+
+        self.setEnabled(False)
+        when_written(core.assign_part(self.ot_id, part_id, quantity, status), saved, failed)
 
 class AddAdvisorWindow(QDialog):
     def __init__(self, estilo_css):
@@ -929,25 +1280,521 @@ class AddAdvisorWindow(QDialog):
             QMessageBox.warning(self, "Advertencia", "El nombre del asesor es obligatorio.")
             return
             
-        conn = sqlite3.connect(DATABASE_NAME)
-        cursor = conn.cursor()
-        
-        try:
-            cursor.execute("""
-                INSERT INTO advisors (name)
-                VALUES (?)
-            """, (advisor_name,))
-            
-            conn.commit()
+        def saved(_):
             QMessageBox.information(self, "Éxito", f"Asesor '{advisor_name}' registrado exitosamente.")
             self.accept()
-        
-        except sqlite3.IntegrityError:
-            QMessageBox.warning(self, "Error", f"El asesor '{advisor_name}' ya existe.")
-        except Exception as e:
-            QMessageBox.critical(self, "Error de DB", f"Ocurrió un error al guardar el asesor: {e}")
-        finally:
-            conn.close()
+
+        def failed(error):
+            self.setEnabled(True)
+            if isinstance(error, sqlite3.IntegrityError):
+                QMessageBox.warning(self, "Error", f"El asesor '{advisor_name}' ya existe.")
+            else:
+                show_write_error(self, error, "guardar el asesor")
+
+        self.setEnabled(False)
+        when_written(core.create_advisor(advisor_name), saved, failed)
+
+
+class ImportDialog(QDialog):
+    def __init__(self, estilo_css):
+        super().__init__()
+        self.setWindowTitle("Importar Datos")
+        self.setStyleSheet(estilo_css)
+        self.setGeometry(150, 150, 560, 300)
+        self._task = None
+        self._close_when_done = False
+
+        layout = QVBoxLayout(self)
+        title_label = QLabel("Importación Masiva (CSV / XLSX)")
+        title_label.setObjectName("title_label")
+        layout.addWidget(title_label)
+
+        form_layout = QGridLayout()
+        form_layout.addWidget(QLabel("Tipo de datos:"), 0, 0)
+        self.target_combo = QComboBox()
+        for target, spec in core.IMPORT_TARGETS.items():
+            self.target_combo.addItem(spec["label"], target)
+        self.target_combo.currentIndexChanged.connect(self._update_columns_hint)
+        form_layout.addWidget(self.target_combo, 0, 1, 1, 2)
+
+        form_layout.addWidget(QLabel("Archivo:"), 1, 0)
+        self.path_input = QLineEdit()
+        form_layout.addWidget(self.path_input, 1, 1)
+        browse_button = QPushButton("Examinar...")
+        browse_button.clicked.connect(self.browse_file)
+        form_layout.addWidget(browse_button, 1, 2)
+
+        form_layout.addWidget(QLabel("Duplicados:"), 2, 0)
+        self.mode_combo = QComboBox()
+        for mode, label in core.IMPORT_MODES.items():
+            self.mode_combo.addItem(label, mode)
+        form_layout.addWidget(self.mode_combo, 2, 1, 1, 2)
+        layout.addLayout(form_layout)
+
+        self.columns_label = QLabel()
+        self.columns_label.setWordWrap(True)
+        self.columns_label.setObjectName("empty_label")
+        layout.addWidget(self.columns_label)
+        self._update_columns_hint()
+
+        self.progress_bar = QProgressBar()
+        self.progress_bar.setRange(0, 0)  # el total de filas no se conoce de antemano
+        self.progress_bar.setVisible(False)
+        layout.addWidget(self.progress_bar)
+        self.status_label = QLabel("")
+        layout.addWidget(self.status_label)
+
+        buttons_layout = QHBoxLayout()
+        self.import_button = QPushButton("Importar")
+        self.import_button.clicked.connect(self.start_import)
+        self.cancel_button = QPushButton("Cerrar")
+        self.cancel_button.clicked.connect(self.reject)
+        buttons_layout.addWidget(self.import_button)
+        buttons_layout.addWidget(self.cancel_button)
+        layout.addLayout(buttons_layout)
+
+    def _update_columns_hint(self):
+        spec = core.IMPORT_TARGETS[self.target_combo.currentData()]
+        self.columns_label.setText(
+            f"Columnas: {', '.join(spec['columns'])}\nObligatorias: {', '.join(spec['required'])}"
+        )
+
+    def browse_file(self):
+        path, _ = QFileDialog.getOpenFileName(
+            self, "Seleccionar archivo", "", "Datos (*.csv *.xlsx);;CSV (*.csv);;Excel (*.xlsx)"
+        )
+        if path:
+            self.path_input.setText(path)
+
+    def start_import(self):
+        path = self.path_input.text().strip()
+        if not path or not os.path.isfile(path):
+            QMessageBox.warning(self, "Advertencia", "Selecciona un archivo existente.")
+            return
+
+        target = self.target_combo.currentData()
+        mode = self.mode_combo.currentData()
+        self._task = BackgroundJob(
+            lambda progress, is_cancelled: core.import_file(path, target, mode, progress, is_cancelled)
+        )
+        self._task.signals.progress.connect(self._on_progress)
+        self._task.signals.finished.connect(self._on_finished)
+        self._task.signals.failed.connect(self._on_failed)
+        self._set_running(True)
+        self.status_label.setText("Leyendo archivo...")
+        self._task.start()
+
+    def _set_running(self, running):
+        for widget in (self.target_combo, self.path_input, self.mode_combo, self.import_button):
+            widget.setEnabled(not running)
+        self.progress_bar.setVisible(running)
+        self.cancel_button.setText("Cancelar" if running else "Cerrar")
+
+    def _on_progress(self, rows_read):
+        self.status_label.setText(f"Filas procesadas: {rows_read}")
+
+    def _on_finished(self, summary):
+        self._task = None
+        self._set_running(False)
+        self.status_label.setText("")
+        QMessageBox.information(self, "Importación Terminada", core.format_import_summary(summary))
+        if self._close_when_done:
+            super().reject()
+
+    def _on_failed(self, message):
+        self._task = None
+        self._set_running(False)
+        self.status_label.setText("")
+        QMessageBox.critical(self, "Error de Importación", f"No se pudo importar el archivo: {message}")
+        if self._close_when_done:
+            super().reject()
+
+    def reject(self):
+        if self._task is not None:
+            # Se detiene al terminar el bloque en curso; el diálogo se cierra
+            # cuando llega el resumen
+            self._task.cancel()
+            self._close_when_done = True
+            self.cancel_button.setEnabled(False)
+            self.status_label.setText("Cancelando...")
+            return
+        super().reject()
+
+
+class ExportDialog(QDialog):
+    """Exporta el resultado de una consulta en segundo plano, con avance y cancelación."""
+
+    def __init__(self, estilo_css, description, query, params, columns, path, fmt, prepare=None):
+        super().__init__()
+        self.setWindowTitle("Exportar")
+        self.setStyleSheet(estilo_css)
+        self.setGeometry(150, 150, 420, 160)
+
+        layout = QVBoxLayout(self)
+        layout.addWidget(QLabel(f"Exportando {description} a {os.path.basename(path)}..."))
+        progress_bar = QProgressBar()
+        progress_bar.setRange(0, 0)  # el total se conoce solo al terminar
+        layout.addWidget(progress_bar)
+        self.status_label = QLabel("")
+        layout.addWidget(self.status_label)
+        self.cancel_button = QPushButton("Cancelar")
+        self.cancel_button.clicked.connect(self.reject)
+        layout.addWidget(self.cancel_button)
+
+        self._task = BackgroundJob(
+            lambda progress, is_cancelled: core.export_query(query, params, columns, path, fmt,
+                                                        progress, is_cancelled, prepare)
+        )
+        self._task.signals.progress.connect(self._on_progress)
+        self._task.signals.finished.connect(self._on_finished)
+        self._task.signals.failed.connect(self._on_failed)
+        self._task.start()
+
+    def _on_progress(self, rows):
+        self.status_label.setText(f"Filas exportadas: {rows}")
+
+    def _on_finished(self, summary):
+        self._task = None
+        if summary["cancelled"]:
+            QMessageBox.information(self, "Exportación Cancelada", "No se generó el archivo.")
+            super().reject()
+            return
+        QMessageBox.information(self, "Exportación Terminada",
+                                f"Se exportaron {summary['rows']} filas a:\n{summary['path']}")
+        self.accept()
+
+    def _on_failed(self, message):
+        self._task = None
+        QMessageBox.critical(self, "Error de Exportación", f"No se pudo exportar: {message}")
+        super().reject()
+
+    def reject(self):
+        if self._task is not None:
+            # Se detiene después del lote en curso
+            self._task.cancel()
+            self.cancel_button.setEnabled(False)
+            self.status_label.setText("Cancelando...")
+            return
+        super().reject()
+
+def export_view(parent, description, query, params, columns, default_name, prepare=None):
+    """Pide el archivo de destino y exporta la consulta actual de una vista."""
+    path, selected_filter = QFileDialog.getSaveFileName(
+        parent, f"Exportar {description}", default_name, ";;".join(core.EXPORT_FORMATS.values())
+    )
+    if not path:
+        return
+    fmt = "jsonl" if path.lower().endswith(".jsonl") or selected_filter == core.EXPORT_FORMATS["jsonl"] else "csv"
+    if not path.lower().endswith(f".{fmt}"):
+        path += f".{fmt}"
+    export_dialog = ExportDialog(QApplication.instance().styleSheet(), description,
+                                 query, params, columns, path, fmt, prepare)
+    export_dialog.exec()
+
+def work_orders_html(orders):
+    """HTML imprimible de `core.list_work_orders`, con una orden de trabajo por hoja."""
+    def text(value):
+        return html.escape("" if value is None else str(value))
+
+    pages = []
+    for order in orders:
+        parts_rows = "".join(
+            f"<tr><td>{text(number)}</td><td>{text(name)}</td>"
+            f"<td align='right'>{text(quantity)}</td><td>{text(status)}</td></tr>"
+            for number, name, quantity, status in order["parts"]
+        ) or "<tr><td colspan='4'>Sin partes asignadas</td></tr>"
+        vehicle = " ".join(str(value) for value in (order["model"], order["year"]) if value)
+        # Cada OT empieza en una hoja nueva
+        page_break = " style='page-break-before: always'" if pages else ""
+        pages.append(f"""
+            <div{page_break}>
+            <h2>Orden de Trabajo {text(order['ot_number'])}</h2>
+            <table cellpadding='3'>
+              <tr><td><b>Asesor:</b></td><td>{text(order['sales_advisor'])}</td>
+                  <td><b>Fecha de Pedido:</b></td><td>{text(order['request_date'])}</td></tr>
+              <tr><td><b>Estado:</b></td><td>{text(order['status'])}</td>
+                  <td><b>Seguro:</b></td><td>{text(order['insurance'] or 'N/A')}</td></tr>
+              <tr><td><b>VIN:</b></td><td>{text(order['vin'])}</td>
+                  <td><b>Vehículo:</b></td><td>{text(vehicle)}</td></tr>
+              <tr><td><b>Propietario:</b></td><td>{text(order['owner_name'])}</td>
+                  <td><b>Teléfono:</b></td><td>{text(order['owner_phone'])}</td></tr>
+            </table>
+            <h3>Partes</h3>
+            <table border='1' cellspacing='0' cellpadding='4' width='100%'>
+              <tr><th>No. de Parte</th><th>Nombre</th><th>Cantidad</th><th>Estado</th></tr>
+              {parts_rows}
+            </table>
+            </div>
+        """)
+    return "".join(pages)
+
+
+# ----------------------------------------------------------------------
+# --- MODELOS DE DATOS (listas virtualizadas) ---
+# ----------------------------------------------------------------------
+
+class OTTableModel(QAbstractTableModel):
+    """Modelo de la lista de OTs que lee de SQLite por páginas.
+
+    La vista pide filas nuevas con `canFetchMore`/`fetchMore` a medida que se
+    desplaza. Cada página continúa desde la clave (valor de orden, id) de la
+    última fila de la página anterior, de modo que leer la página 1000 cuesta lo
+    mismo que leer la primera. Solo se conservan en memoria las últimas
+    `MAX_CACHED_PAGES` páginas; si la vista vuelve a una página descartada, se
+    lee de nuevo a partir de la clave guardada.
+
+    Las lecturas se hacen en segundo plano con `query_executor()`; mientras
+    llega una página, `canFetchMore` devuelve False y las celdas de una página
+    descartada se muestran vacías hasta que vuelve a estar en memoria.
+    """
+    loading_changed = pyqtSignal(bool)
+    query_failed = pyqtSignal(str)
+
+    HEADERS = ["OT", "Asesor de Ventas", "No. de Piezas", "Fecha de Pedido", "Seguro", "Estado"]
+    PAGE_SIZE = 200
+    MAX_CACHED_PAGES = 10
+
+    # Columnas que se pueden ordenar en la base de datos (cada una tiene índice)
+    SORT_COLUMNS = {
+        0: "ot_number",
+        1: "sales_advisor",
+        2: "parts_count",
+        3: "request_date",
+        5: "status",
+    }
+    ID_COLUMN = core.OTListQuery.ID_COLUMN
+    PENDING_PARTS_COLUMN = core.OTListQuery.PENDING_PARTS_COLUMN
+
+    def __init__(self, parent=None, query_key="ot_list"):
+        super().__init__(parent)
+        self.query_key = query_key
+        self.filter_advisor = None
+        self.search_term = None
+        self.sort_column = None
+        self.sort_order = Qt.SortOrder.AscendingOrder
+        self._row_count = 0
+        self._exhausted = False
+        self._pages = OrderedDict()  # número de página -> lista de filas
+        self._ids = array("q")  # id de cada fila leída, aunque su página ya no esté en memoria
+        self._page_bounds = []  # clave (valor de orden, id) de la última fila de cada página
+        self._generation = 0  # cambia en cada reinicio para descartar respuestas viejas
+        self._fetching = False
+        self._pending_pages = set()
+
+    def is_loading(self):
+        return self._fetching
+
+    def set_query(self, filter_advisor=None, search_term=None):
+        """Reinicia el modelo con un nuevo filtro y carga la primera página."""
+        self.beginResetModel()
+        self.filter_advisor = filter_advisor
+        self.search_term = search_term
+        self._row_count = 0
+        self._exhausted = False
+        self._pages.clear()
+        self._ids = array("q")
+        self._page_bounds = []
+        self._generation += 1
+        self._fetching = False
+        self._pending_pages.clear()
+        self.endResetModel()
+        self.fetchMore(QModelIndex())
+
+    # --- API de QAbstractTableModel ---
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else self._row_count
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.HEADERS)
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if role == Qt.ItemDataRole.DisplayRole and orientation == Qt.Orientation.Horizontal:
+            return self.HEADERS[section]
+        return super().headerData(section, orientation, role)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        if role == Qt.ItemDataRole.ToolTipRole and index.column() == 2:
+            row = self._row(index.row())
+            return None if row is None else f"{row[self.PENDING_PARTS_COLUMN]} pendientes de entrega"
+        if role != Qt.ItemDataRole.DisplayRole:
+            return None
+        row = self._row(index.row())
+        if row is None:
+            return None
+        value = row[index.column()]
+        if index.column() == 4:
+            return value or "N/A"
+        return "" if value is None else str(value)
+
+    def canFetchMore(self, parent):
+        return not parent.isValid() and not self._exhausted and not self._fetching
+
+    def fetchMore(self, parent):
+        if not self.canFetchMore(parent):
+            return
+        page_no = self._row_count // self.PAGE_SIZE
+        generation = self._generation
+        queries = self._page_queries(page_no)
+        self._fetching = True
+        self.loading_changed.emit(True)
+        query_executor().submit(
+            self.query_key,
+            lambda conn: core.OTListQuery.run_page_queries(conn, queries, self.PAGE_SIZE),
+            lambda rows: self._append_page(generation, page_no, rows),
+            lambda message: self._fetch_failed(generation, message),
+        )
+
+    def _append_page(self, generation, page_no, rows):
+        if generation != self._generation:
+            return
+        self._fetching = False
+        self._set_page_bound(page_no, rows)
+        if len(rows) < self.PAGE_SIZE:
+            self._exhausted = True
+        if rows:
+            self.beginInsertRows(QModelIndex(), self._row_count, self._row_count + len(rows) - 1)
+            self._store_page(page_no, rows)
+            self._ids.extend(row[self.ID_COLUMN] for row in rows)
+            self._row_count += len(rows)
+            self.endInsertRows()
+        self.loading_changed.emit(False)
+
+    def _fetch_failed(self, generation, message):
+        if generation != self._generation:
+            return
+        self._fetching = False
+        self._exhausted = True
+        self.loading_changed.emit(False)
+        self.query_failed.emit(message)
+
+    def narrow(self, search_term):
+        """Aplica en memoria un término que restringe la búsqueda actual.
+
+        Solo es posible si el resultado actual está completo en memoria; las filas
+        conservan el orden que tenían. Devuelve False si hay que volver a
+        consultar la base de datos.
+        """
+        if not core.fts_is_refinement(self.search_term, search_term):
+            return False
+        if self._fetching or not self._exhausted:
+            return False
+        page_count = -(-self._row_count // self.PAGE_SIZE)
+        if any(page_no not in self._pages for page_no in range(page_count)):
+            return False
+
+        list_query = self._list_query()
+        rows = [row for page_no in range(page_count) for row in self._pages[page_no]
+                if list_query.matches(row, search_term)]
+
+        self.beginResetModel()
+        self.search_term = search_term
+        self._generation += 1
+        self._pending_pages.clear()
+        self._pages.clear()
+        self._ids = array("q", (row[self.ID_COLUMN] for row in rows))
+        self._page_bounds = []
+        for page_no, start in enumerate(range(0, len(rows), self.PAGE_SIZE)):
+            page = rows[start:start + self.PAGE_SIZE]
+            self._pages[page_no] = page
+            self._page_bounds.append(list_query.row_key(page[-1]))
+        self._row_count = len(rows)
+        self.endResetModel()
+        return True
+
+    def sort(self, column, order=Qt.SortOrder.AscendingOrder):
+        """Ordena en la base de datos. Las columnas sin índice se ignoran."""
+        if column not in self.SORT_COLUMNS:
+            return
+        self.sort_column = column
+        self.sort_order = order
+        self.set_query(self.filter_advisor, self.search_term)
+
+    # --- Acceso a filas ---
+
+    def ot_number(self, row):
+        data = self._row(row)
+        return data[0] if data else None
+
+    def ot_ids(self, rows):
+        """Ids de las OTs en las filas `rows` (no hace falta que su página esté en memoria)."""
+        return [self._ids[row] for row in rows if 0 <= row < len(self._ids)]
+
+    def _row(self, row):
+        if row < 0 or row >= self._row_count:
+            return None
+        page_no, offset = divmod(row, self.PAGE_SIZE)
+        page = self._pages.get(page_no)
+        if page is None:
+            self._reload_page(page_no)
+            return None
+        self._pages.move_to_end(page_no)
+        return page[offset] if offset < len(page) else None
+
+    def _reload_page(self, page_no):
+        """Vuelve a pedir una página que salió de la ventana en memoria."""
+        if page_no in self._pending_pages:
+            return
+        self._pending_pages.add(page_no)
+        generation = self._generation
+        queries = self._page_queries(page_no)
+        query_executor().submit(
+            f"{self.query_key}:page:{page_no}",
+            lambda conn: core.OTListQuery.run_page_queries(conn, queries, self.PAGE_SIZE),
+            lambda rows: self._page_reloaded(generation, page_no, rows),
+            lambda message: self._pending_pages.discard(page_no),
+        )
+
+    def _page_reloaded(self, generation, page_no, rows):
+        if generation != self._generation:
+            return
+        self._pending_pages.discard(page_no)
+        self._set_page_bound(page_no, rows)
+        self._store_page(page_no, rows)
+        first = page_no * self.PAGE_SIZE
+        last = min(first + self.PAGE_SIZE, self._row_count) - 1
+        if last >= first:
+            self.dataChanged.emit(self.index(first, 0), self.index(last, self.columnCount() - 1))
+
+    def _store_page(self, page_no, rows):
+        self._pages[page_no] = rows
+        self._pages.move_to_end(page_no)
+        while len(self._pages) > self.MAX_CACHED_PAGES:
+            self._pages.popitem(last=False)
+
+    # --- Construcción de consultas ---
+
+    def _list_query(self, selected_only=False):
+        """Consulta del núcleo con el filtro, la búsqueda y el orden actuales."""
+        return core.OTListQuery(
+            self.filter_advisor,
+            self.search_term,
+            self.SORT_COLUMNS.get(self.sort_column),
+            self.sort_order == Qt.SortOrder.DescendingOrder,
+            selected_only,
+        )
+
+    def export_query(self, selected_only=False):
+        """Consulta completa, sin paginar, con el filtro, la búsqueda y el orden actuales.
+
+        Con `selected_only`, solo las OTs de la tabla temporal `selected_ots`.
+        """
+        return self._list_query(selected_only).export_query()
+
+    def _page_queries(self, page_no):
+        """Arma (en el hilo de la GUI) las consultas que leen una página."""
+        after = self._page_bounds[page_no - 1] if page_no > 0 else None
+        return self._list_query().page_queries(after)
+
+    def _set_page_bound(self, page_no, rows):
+        if not rows:
+            return
+        if page_no < len(self._page_bounds):
+            self._page_bounds[page_no] = self._list_query().row_key(rows[-1])
+        else:
+            self._page_bounds.append(self._list_query().row_key(rows[-1]))
 
 
 # ----------------------------------------------------------------------
@@ -955,6 +1802,9 @@ class AddAdvisorWindow(QDialog):
 # ----------------------------------------------------------------------
 
 class OTWindow(QWidget):
+    # Tablas que muestra la lista (los contadores de partes viven en `ots`)
+    TABLES = ("ots", "vins")
+
     # ⭐️ Eliminado 'main_window' del constructor ⭐️
     def __init__(self, estilo_css=""):
         super().__init__()
@@ -975,9 +1825,22 @@ class OTWindow(QWidget):
         add_ot_button.setObjectName("add_button")
         # Nota: La conexión se realiza a un método interno, que llama al diálogo
         add_ot_button.clicked.connect(self.add_new_ot) 
+        export_button = QPushButton("📤 Exportar")
+        export_button.clicked.connect(self.export_ots)
+        
+        # Acciones sobre las filas seleccionadas (Ctrl/Mayús + clic)
+        self.selection_label = QLabel("")
+        self.bulk_button = QPushButton("Acciones con Selección ▼")
+        self.bulk_menu = self.create_bulk_menu(estilo_css)
+        self.bulk_button.clicked.connect(
+            lambda: self.bulk_menu.exec(self.bulk_button.mapToGlobal(self.bulk_button.rect().bottomLeft()))
+        )
         
         header_layout.addWidget(self.title_label)
         header_layout.addStretch()
+        header_layout.addWidget(self.selection_label)
+        header_layout.addWidget(self.bulk_button)
+        header_layout.addWidget(export_button)
         header_layout.addWidget(add_ot_button)
         
         layout.addLayout(header_layout)
@@ -986,41 +1849,178 @@ class OTWindow(QWidget):
         search_layout = QHBoxLayout()
         search_layout.addWidget(QLabel("Buscar:"))
         self.search_input = QLineEdit()
-        self.search_input.setPlaceholderText("Buscar por OT, asesor, fecha, seguro o estado...")
-        self.search_input.textChanged.connect(self.search_ots)
+        self.search_input.setPlaceholderText("Buscar por OT, asesor, fecha, estado, seguro, VIN, propietario o modelo...")
+        self.search = DebouncedSearch(self.search_input)
+        self.search.triggered.connect(self.search_ots)
         search_button = QPushButton("🔍 Buscar")
-        search_button.clicked.connect(self.search_ots)
+        search_button.clicked.connect(self.search.flush)
         clear_button = QPushButton("Limpiar")
         clear_button.clicked.connect(self.clear_search)
         
+        self.loading_label = create_loading_label()
+        
         search_layout.addWidget(self.search_input)
         search_layout.addWidget(search_button)
         search_layout.addWidget(clear_button)
         search_layout.addStretch()
+        search_layout.addWidget(self.loading_label)
         
         layout.addLayout(search_layout)
         
-        self.ot_table = QTableWidget()
-        self.ot_table.setColumnCount(6)
-        self.ot_table.setHorizontalHeaderLabels([
-            "OT", "Asesor de Ventas", "No. de Piezas", "Fecha de Pedido", "Seguro", "Estado"
-        ])
+        self.ot_model = OTTableModel(self)
+        self.ot_model.loading_changed.connect(self._on_loading_changed)
+        self.ot_model.query_failed.connect(self._on_query_failed)
+        self.ot_table = QTableView()
+        self.ot_table.setModel(self.ot_model)
+        self.ot_table.setSelectionBehavior(QTableView.SelectionBehavior.SelectRows)
+        self.ot_table.setSelectionMode(QTableView.SelectionMode.ExtendedSelection)
+        self.ot_table.selectionModel().selectionChanged.connect(self._update_selection_state)
+        self.ot_model.modelReset.connect(self._update_selection_state)
+        
+        # El orden lo resuelve la base de datos; la cabecera solo muestra el indicador
+        header = self.ot_table.horizontalHeader()
+        header.setSectionsClickable(True)
+        header.setSortIndicatorShown(True)
+        header.setSortIndicator(-1, Qt.SortOrder.AscendingOrder)
+        header.sortIndicatorChanged.connect(self.sort_ots)
         
         self.current_filter_advisor = None  # Para mantener el filtro de asesor activo
+        self._first_page_pending = False
         self.load_ot_data()
         
-        self.ot_table.cellDoubleClicked.connect(self.show_ot_parts)
+        self.ot_table.doubleClicked.connect(self.show_ot_parts)
+        
+        self.empty_label = create_empty_results_label()
         
         layout.addWidget(self.ot_table)
+        layout.addWidget(self.empty_label)
+        self._update_selection_state()
         
     # ❌ ELIMINADO: go_back_to_home() ❌
 
-    def show_ot_parts(self, row, column):
-        ot_number_item = self.ot_table.item(row, 0)
-        if ot_number_item is None:
+    def export_ots(self):
+        query, params = self.ot_model.export_query()
+        export_view(self, "Órdenes de Trabajo", query, params, core.OTListQuery.EXPORT_COLUMNS, "ots.csv")
+
+    # ------------------
+    # ACCIONES CON VARIAS OTs
+    # ------------------
+    # Cada acción es una sola sentencia sobre la tabla temporal de ids
+    # seleccionados (core.load_selected_ots), sin importar cuántas OTs sean.
+
+    def create_bulk_menu(self, estilo_css):
+        menu = QMenu(self)
+        menu.setStyleSheet(estilo_css)
+        
+        status_menu = menu.addMenu("Cambiar Estatus")
+        for status in core.STATUSES:
+            action = status_menu.addAction(status)
+            action.triggered.connect(lambda checked, s=status: self.bulk_change_status(s))
+        self.reassign_menu = menu.addMenu("Reasignar Asesor")
+        self.reassign_menu.aboutToShow.connect(self._fill_reassign_menu)
+        menu.addSeparator()
+        action_export = menu.addAction("📤 Exportar Selección")
+        action_export.triggered.connect(self.export_selected_ots)
+        action_print = menu.addAction("🖨️ Imprimir Órdenes de Trabajo")
+        action_print.triggered.connect(self.print_selected_ots)
+        
+        return menu
+
+    def _fill_reassign_menu(self):
+        self.reassign_menu.clear()
+        for advisor in core.cached_advisors():
+            action = self.reassign_menu.addAction(advisor)
+            action.triggered.connect(lambda checked, a=advisor: self.bulk_reassign(a))
+
+    def _selected_rows(self):
+        # Por rangos: con miles de filas seleccionadas no se crea un índice por celda
+        rows = set()
+        for selection_range in self.ot_table.selectionModel().selection():
+            rows.update(range(selection_range.top(), selection_range.bottom() + 1))
+        return sorted(rows)
+
+    def selected_ot_ids(self):
+        return self.ot_model.ot_ids(self._selected_rows())
+
+    def _update_selection_state(self, *args):
+        count = len(self._selected_rows())
+        self.selection_label.setText(f"{count} seleccionada(s)" if count > 1 else "")
+        self.bulk_button.setEnabled(count > 0)
+
+    def bulk_change_status(self, status):
+        ot_ids = self.selected_ot_ids()
+        if not ot_ids:
+            return
+        if QMessageBox.question(self, "Cambiar Estatus",
+                                f"¿Cambiar el estatus de {len(ot_ids)} OT(s) a '{status}'?"
+                                ) != QMessageBox.StandardButton.Yes:
+            return
+        self._run_bulk_write(core.update_ots_status(ot_ids, status), "cambiar el estatus")
+
+    def bulk_reassign(self, advisor):
+        ot_ids = self.selected_ot_ids()
+        if not ot_ids:
+            return
+        if QMessageBox.question(self, "Reasignar Asesor",
+                                f"¿Asignar {len(ot_ids)} OT(s) al asesor {advisor}?"
+                                ) != QMessageBox.StandardButton.Yes:
+            return
+        self._run_bulk_write(core.reassign_ots(ot_ids, advisor), "reasignar las OTs")
+
+    def _run_bulk_write(self, future, action):
+        def saved(count):
+            self.setEnabled(True)
+            QMessageBox.information(self, "Actualización Exitosa", f"Se actualizaron {count} OT(s).")
+            self.refresh_if_changed()
+
+        def failed(error):
+            self.setEnabled(True)
+            if isinstance(error, core.ValidationError):
+                QMessageBox.warning(self, "Error de Validación", str(error))
+            else:
+                show_write_error(self, error, action)
+
+        self.setEnabled(False)
+        when_written(future, saved, failed)
+
+    def export_selected_ots(self):
+        ot_ids = self.selected_ot_ids()
+        if not ot_ids:
+            return
+        query, params = self.ot_model.export_query(selected_only=True)
+        export_view(self, "Órdenes de Trabajo Seleccionadas", query, params,
+                    core.OTListQuery.EXPORT_COLUMNS, "ots-seleccion.csv",
+                    prepare=lambda conn: core.load_selected_ots(conn, ot_ids))
+
+    def print_selected_ots(self):
+        ot_ids = self.selected_ot_ids()
+        if not ot_ids:
+            return
+        self.loading_label.setVisible(True)
+        query_executor().submit(
+            "ot_print",
+            lambda conn: core.list_work_orders(ot_ids, conn),
+            self._print_work_orders,
+            self._on_print_failed,
+        )
+
+    def _print_work_orders(self, orders):
+        self.loading_label.setVisible(self.ot_model.is_loading())
+        printer = QPrinter()
+        if QPrintDialog(printer, self).exec() != QDialog.DialogCode.Accepted:
+            return
+        document = QTextDocument()
+        document.setHtml(work_orders_html(orders))
+        document.print(printer)
+
+    def _on_print_failed(self, message):
+        self.loading_label.setVisible(self.ot_model.is_loading())
+        show_query_error(self, message)
+
+    def show_ot_parts(self, index):
+        ot_number = self.ot_model.ot_number(index.row())
+        if ot_number is None:
             return
-            
-        ot_number = ot_number_item.text()
         
         # Obtiene el estilo de la app o de la ventana principal
         estilo_css = self.parent().styleSheet() if self.parent() else self.styleSheet()
@@ -1030,71 +2030,62 @@ class OTWindow(QWidget):
     def load_ot_data(self, filter_advisor=None, search_term=None):
         self.current_filter_advisor = filter_advisor  # Guardar el filtro actual
         
-        conn = sqlite3.connect(DATABASE_NAME)
-        cursor = conn.cursor()
-        
-        base_query = """
-        SELECT o.ot_number, o.sales_advisor, o.request_date, o.status,
-               v.insurance, COUNT(op.part_id) as total_parts
-        FROM ots AS o
-        LEFT JOIN ot_parts AS op ON o.id = op.ot_id
-        LEFT JOIN vins AS v ON o.vin = v.vin
-        """
-        where_clauses = []
-        params = []
-        
-        # Filtro por asesor
         if filter_advisor:
-            where_clauses.append("o.sales_advisor = ?")
-            params.append(filter_advisor)
             self.title_label.setText(f"Órdenes de Trabajo - Filtrado por: {filter_advisor}")
         else:
             self.title_label.setText("Órdenes de Trabajo por Asesor")
         
-        # Filtro de búsqueda
-        if search_term:
-            search_condition = """(
-                o.ot_number LIKE ? OR 
-                o.sales_advisor LIKE ? OR 
-                o.request_date LIKE ? OR 
-                o.status LIKE ? OR 
-                v.insurance LIKE ?
-            )"""
-            where_clauses.append(search_condition)
-            search_param = f'%{search_term}%'
-            params.extend([search_param] * 5)
-        
-        # Construir WHERE clause
-        where_clause = ""
-        if where_clauses:
-            where_clause = " WHERE " + " AND ".join(where_clauses)
-
-        group_by_clause = " GROUP BY o.id"
-        
-        cursor.execute(base_query + where_clause + group_by_clause, params)
-        ots_data = cursor.fetchall()
-        conn.close()
-        
-        self.ot_table.setRowCount(len(ots_data))
-        for row_idx, row_data in enumerate(ots_data):
-            self.ot_table.setItem(row_idx, 0, QTableWidgetItem(row_data[0]))
-            self.ot_table.setItem(row_idx, 1, QTableWidgetItem(row_data[1]))
-            self.ot_table.setItem(row_idx, 2, QTableWidgetItem(str(row_data[5])))
-            self.ot_table.setItem(row_idx, 3, QTableWidgetItem(row_data[2]))
-            self.ot_table.setItem(row_idx, 4, QTableWidgetItem(row_data[4] or "N/A"))
-            self.ot_table.setItem(row_idx, 5, QTableWidgetItem(row_data[3]))
-        
+        # El modelo solo lee la primera página (en segundo plano); el resto se
+        # pide al desplazarse
+        self._first_page_pending = True
+        self._data_versions = core.table_versions(self.TABLES)
+        self.ot_model.set_query(filter_advisor=filter_advisor, search_term=search_term)
+
+    def refresh_if_changed(self):
+        """Vuelve a leer la lista, con el filtro y la búsqueda actuales, solo si cambiaron sus tablas."""
+        if self._data_versions != core.table_versions(self.TABLES):
+            self.load_ot_data(self.current_filter_advisor, self.ot_model.search_term)
+    
+    def _on_loading_changed(self, loading):
+        self.loading_label.setVisible(loading)
+        if loading or not self._first_page_pending:
+            return
+        self._first_page_pending = False
         self.ot_table.resizeColumnsToContents()
-        self.ot_table.setSortingEnabled(True)
-        
-        # Mostrar mensaje si no hay resultados de búsqueda
-        if search_term and len(ots_data) == 0:
-            QMessageBox.information(self, "Sin resultados", 
-                                   f"No se encontraron órdenes de trabajo que coincidan con '{search_term}'.")
+        self._update_empty_label()
+    
+    def _update_empty_label(self):
+        """Muestra en línea (sin diálogo) cuando la búsqueda no tiene resultados."""
+        search_term = self.ot_model.search_term
+        if search_term and self.ot_model.rowCount() == 0:
+            self.empty_label.setText(f"No se encontraron órdenes de trabajo que coincidan con '{search_term}'.")
+            self.empty_label.setVisible(True)
+        else:
+            self.empty_label.setVisible(False)
     
+    def _on_query_failed(self, message):
+        self._first_page_pending = False
+        show_query_error(self, message)
+    
+    def sort_ots(self, column, order):
+        """Ordena la lista en la base de datos por la columna pulsada."""
+        if column in OTTableModel.SORT_COLUMNS:
+            self.ot_model.sort(column, order)
+            return
+        # Columna sin índice: se restaura el indicador del orden vigente
+        header = self.ot_table.horizontalHeader()
+        header.blockSignals(True)
+        current = self.ot_model.sort_column
+        header.setSortIndicator(-1 if current is None else current, self.ot_model.sort_order)
+        header.blockSignals(False)
+
     def search_ots(self):
         """Busca órdenes de trabajo por cualquier atributo"""
         search_term = self.search_input.text().strip()
+        # Si el término solo agrega letras al anterior, se filtra lo ya cargado
+        if search_term and self.ot_model.narrow(search_term):
+            self._update_empty_label()
+            return
         self.load_ot_data(
             filter_advisor=self.current_filter_advisor,
             search_term=search_term if search_term else None
@@ -1103,6 +2094,7 @@ class OTWindow(QWidget):
     def clear_search(self):
         """Limpia la búsqueda y muestra todas las OT (manteniendo filtro de asesor si existe)"""
         self.search_input.clear()
+        self.search.cancel()
         self.load_ot_data(filter_advisor=self.current_filter_advisor)
 
     def add_new_ot(self):
@@ -1112,7 +2104,85 @@ class OTWindow(QWidget):
         if add_ot_window.exec() == QDialog.DialogCode.Accepted:
             self.load_ot_data()
 
+class PartUsagePanel(QWidget):
+    """Dónde se usa una parte: OTs con su cantidad y estatus, pendientes primero."""
+    HEADERS = ["OT", "Asesor de Ventas", "Fecha de Pedido", "Cantidad", "Estado"]
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.part_id = None
+        self.part_number = None
+
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(0, 0, 0, 0)
+        header_layout = QHBoxLayout()
+        self.title_label = QLabel("")
+        self.loading_label = create_loading_label()
+        close_button = QPushButton("Cerrar")
+        close_button.clicked.connect(self.hide)
+        header_layout.addWidget(self.title_label)
+        header_layout.addStretch()
+        header_layout.addWidget(self.loading_label)
+        header_layout.addWidget(close_button)
+        layout.addLayout(header_layout)
+
+        self.usage_table = QTableWidget()
+        self.usage_table.setColumnCount(len(self.HEADERS))
+        self.usage_table.setHorizontalHeaderLabels(self.HEADERS)
+        self.usage_table.setEditTriggers(QTableWidget.EditTrigger.NoEditTriggers)
+        self.usage_table.setSelectionBehavior(QTableWidget.SelectionBehavior.SelectRows)
+        self.usage_table.doubleClicked.connect(self.show_ot_parts)
+        layout.addWidget(self.usage_table)
+        self.setVisible(False)
+
+    def show_part(self, part_id, part_number):
+        self.part_id = part_id
+        self.part_number = part_number
+        self.setVisible(True)
+        self.reload()
+
+    def reload(self):
+        if self.part_id is None:
+            return
+        part_id = self.part_id
+        self.loading_label.setVisible(True)
+        query_executor().submit(
+            "part_usage",
+            lambda conn: core.list_part_usage(part_id, conn),
+            self._show_usage,
+            self._on_query_failed,
+        )
+
+    def _on_query_failed(self, message):
+        self.loading_label.setVisible(False)
+        show_query_error(self, message)
+
+    def _show_usage(self, rows):
+        self.loading_label.setVisible(False)
+        # Misma condición que `status <> 'Entregada'`: sin estatus no está pendiente
+        pending = [row for row in rows if row[4] is not None and row[4] != core.STATUS_DELIVERED]
+        self.title_label.setText(
+            f"Dónde se usa {self.part_number}: {len(rows)} OTs, "
+            f"{len(pending)} pendientes de entrega ({sum(row[3] or 0 for row in pending)} piezas)"
+        )
+        self.usage_table.setRowCount(len(rows))
+        for row_idx, row_data in enumerate(rows):
+            for column, value in enumerate(row_data):
+                self.usage_table.setItem(row_idx, column, QTableWidgetItem("" if value is None else str(value)))
+        self.usage_table.resizeColumnsToContents()
+
+    def show_ot_parts(self, index):
+        item = self.usage_table.item(index.row(), 0)
+        if item is None:
+            return
+        parts_dialog = OTPartsDialog(item.text(), estilo_css=QApplication.instance().styleSheet())
+        parts_dialog.exec()
+
+
 class PartsListWindow(QWidget):
+    # `ot_parts` por la cantidad pendiente de cada parte
+    TABLES = ("parts", "ot_parts")
+
     def __init__(self, estilo_css=""):
         super().__init__()
         
@@ -1129,9 +2199,12 @@ class PartsListWindow(QWidget):
         add_part_button = QPushButton("Agregar Parte al Inventario")
         add_part_button.setObjectName("add_button")
         add_part_button.clicked.connect(self.add_new_part)
+        export_button = QPushButton("📤 Exportar")
+        export_button.clicked.connect(self.export_parts)
         
         header_layout.addWidget(title_label)
         header_layout.addStretch()
+        header_layout.addWidget(export_button)
         header_layout.addWidget(add_part_button)
         
         layout.addLayout(header_layout)
@@ -1141,67 +2214,124 @@ class PartsListWindow(QWidget):
         search_layout.addWidget(QLabel("Buscar:"))
         self.search_input = QLineEdit()
         self.search_input.setPlaceholderText("Ingrese número de parte o nombre...")
-        self.search_input.textChanged.connect(self.search_parts)
+        self.search = DebouncedSearch(self.search_input)
+        self.search.triggered.connect(self.search_parts)
         search_button = QPushButton("🔍 Buscar")
-        search_button.clicked.connect(self.search_parts)
+        search_button.clicked.connect(self.search.flush)
         clear_button = QPushButton("Limpiar")
         clear_button.clicked.connect(self.clear_search)
         
+        self.loading_label = create_loading_label()
+        
         search_layout.addWidget(self.search_input)
         search_layout.addWidget(search_button)
         search_layout.addWidget(clear_button)
         search_layout.addStretch()
+        search_layout.addWidget(self.loading_label)
         
         layout.addLayout(search_layout)
 
         self.parts_table = QTableWidget()
-        self.parts_table.setColumnCount(2)
-        self.parts_table.setHorizontalHeaderLabels(["No. de Parte", "Nombre"])
+        self.parts_table.setColumnCount(3)
+        self.parts_table.setHorizontalHeaderLabels(["No. de Parte", "Nombre", "Cant. Pendiente"])
+        self.parts_table.setEditTriggers(QTableWidget.EditTrigger.NoEditTriggers)
+        self.parts_table.setSelectionBehavior(QTableWidget.SelectionBehavior.SelectRows)
+        # Doble clic: OTs que usan la parte
+        self.parts_table.doubleClicked.connect(self.show_part_usage)
+        self.usage_panel = PartUsagePanel(self)
+        
+        self.empty_label = create_empty_results_label()
+        self.truncated_label = create_empty_results_label()
+        self._parts_rows = []     # Último resultado mostrado
+        self._parts_term = None   # Término con el que se obtuvo
+        self._parts_truncated = False
         
         self.load_parts_data()
         
         layout.addWidget(self.parts_table)
+        layout.addWidget(self.empty_label)
+        layout.addWidget(self.truncated_label)
+        layout.addWidget(self.usage_panel)
         
     # ❌ ELIMINADO: go_back_to_home() ❌
             
+    # Máximo de filas que se muestran; el catálogo completo se explora buscando
+    MAX_ROWS = 1000
+
+    def export_parts(self):
+        """Exporta todas las partes de la búsqueda mostrada, sin el límite de la lista."""
+        query, params = core.parts_export_query(self._parts_term)
+        export_view(self, "Partes", query, params, core.PARTS_EXPORT_COLUMNS, "partes.csv")
+
     def load_parts_data(self, search_term=None):
-        conn = sqlite3.connect(DATABASE_NAME)
-        cursor = conn.cursor()
-        
-        if search_term:
-            # Buscar por número de parte o nombre
-            cursor.execute("""
-                SELECT part_number, part_name 
-                FROM parts 
-                WHERE part_number LIKE ? OR part_name LIKE ?
-                ORDER BY part_number
-            """, (f'%{search_term}%', f'%{search_term}%'))
-        else:
-            cursor.execute("SELECT part_number, part_name FROM parts ORDER BY part_number")
-            
-        parts_data = cursor.fetchall()
-        conn.close()
-        
+        # Se pide una fila de más para saber si el resultado quedó recortado
+        # (con búsqueda, por número de parte o nombre en el índice de trigramas)
+        self.loading_label.setVisible(True)
+        self._data_versions = core.table_versions(self.TABLES)
+        query_executor().submit(
+            "parts_list",
+            lambda conn: core.list_parts(search_term, self.MAX_ROWS + 1, conn=conn, with_outstanding=True),
+            lambda rows: self._show_parts(rows[:self.MAX_ROWS], search_term, len(rows) > self.MAX_ROWS),
+            self._on_query_failed,
+        )
+    
+    def refresh_if_changed(self):
+        """Vuelve a leer la lista, con la búsqueda actual, solo si cambió el catálogo o su uso."""
+        if self._data_versions != core.table_versions(self.TABLES):
+            self.load_parts_data(self._parts_term)
+            if not self.usage_panel.isHidden():
+                self.usage_panel.reload()
+
+    def show_part_usage(self, index):
+        if index.row() >= len(self._parts_rows):
+            return
+        part_id, part_number = self._parts_rows[index.row()][:2]
+        self.usage_panel.show_part(part_id, part_number)
+
+    def _show_parts(self, parts_data, search_term, truncated=False):
+        self.loading_label.setVisible(False)
+        self._parts_rows = parts_data
+        self._parts_term = search_term
+        self._parts_truncated = truncated
         self.parts_table.setRowCount(len(parts_data))
         for row_idx, row_data in enumerate(parts_data):
-            self.parts_table.setItem(row_idx, 0, QTableWidgetItem(row_data[0]))
-            self.parts_table.setItem(row_idx, 1, QTableWidgetItem(row_data[1]))
+            self.parts_table.setItem(row_idx, 0, QTableWidgetItem(row_data[1]))
+            self.parts_table.setItem(row_idx, 1, QTableWidgetItem(row_data[2]))
+            self.parts_table.setItem(row_idx, 2, QTableWidgetItem(str(row_data[3])))
             
         self.parts_table.resizeColumnsToContents()
         
-        # Mostrar mensaje si no hay resultados
+        self.truncated_label.setText(f"Se muestran las primeras {self.MAX_ROWS} partes; "
+                                     "escriba en el buscador para encontrar otras.")
+        self.truncated_label.setVisible(truncated)
+        
+        # Aviso en línea si no hay resultados
         if search_term and len(parts_data) == 0:
-            QMessageBox.information(self, "Sin resultados", 
-                                   f"No se encontraron partes que coincidan con '{search_term}'.")
+            self.empty_label.setText(f"No se encontraron partes que coincidan con '{search_term}'.")
+            self.empty_label.setVisible(True)
+        else:
+            self.empty_label.setVisible(False)
+
+    def _on_query_failed(self, message):
+        self.loading_label.setVisible(False)
+        show_query_error(self, message)
 
     def search_parts(self):
         """Busca partes por número o nombre"""
         search_term = self.search_input.text().strip()
+        # Si el término solo agrega letras al anterior, se filtra lo ya cargado
+        if (core.parts_is_refinement(self._parts_term, search_term) and not self._parts_truncated
+                and not query_executor().is_pending("parts_list")):
+            parts_data = [row for row in self._parts_rows
+                          if core.text_contains(row[1], search_term) or core.text_contains(row[2], search_term)]
+            self._show_parts(parts_data, search_term)
+            return
         self.load_parts_data(search_term if search_term else None)
     
     def clear_search(self):
         """Limpia la búsqueda y muestra todas las partes"""
         self.search_input.clear()
+        self.search.cancel()
         self.load_parts_data()
 
     def add_new_part(self):
@@ -1211,6 +2341,18 @@ class PartsListWindow(QWidget):
             self.load_parts_data()
 
 class VINLookupWindow(QWidget):
+    """Historial de vehículos: busca por VIN, propietario, teléfono, correo o número de OT.
+
+    Cada búsqueda lee los vehículos con todas sus OTs y partes en una sola
+    consulta; al elegir un vehículo, su historial se muestra desde memoria.
+    """
+    TABLES = ("vins", "ots", "ot_parts", "parts")
+    VEHICLE_HEADERS = ["VIN", "Modelo", "Año", "Seguro", "Propietario", "Correo", "Teléfono", "Asesor", "OTs"]
+    VEHICLE_KEYS = ("vin", "model", "year", "insurance", "owner_name", "owner_email", "owner_phone", "sales_advisor")
+    HISTORY_HEADERS = ["OT / Parte", "Nombre / Asesor", "Fecha de Pedido", "Cantidad", "Estado"]
+    # Vehículos que se muestran; una búsqueda más amplia se afina escribiendo más
+    MAX_VEHICLES = 50
+
     def __init__(self, estilo_css=""):
         super().__init__()
         
@@ -1223,7 +2365,7 @@ class VINLookupWindow(QWidget):
         
         header_layout.addSpacing(20)
         
-        title_label = QLabel("Búsqueda de Información por OT")
+        title_label = QLabel("Historial de Vehículos")
         title_label.setObjectName("title_label")
         header_layout.addWidget(title_label)
         header_layout.addStretch()
@@ -1231,65 +2373,294 @@ class VINLookupWindow(QWidget):
         
         # ⭐️ BUSCADOR - Aseguramos la visibilidad ⭐️
         search_layout = QHBoxLayout()
-        self.ot_input = QLineEdit()
-        self.ot_input.setPlaceholderText("Ingrese el número de OT")
+        self.search_input = QLineEdit()
+        self.search_input.setPlaceholderText("VIN (o su inicio), propietario, teléfono, correo o número de OT")
+        self.search_input.returnPressed.connect(self.search_vehicles)
         self.search_button = QPushButton("Buscar")
-        self.search_button.clicked.connect(self.search_ot)
+        self.search_button.clicked.connect(self.search_vehicles)
+        
+        self.loading_label = create_loading_label()
         
-        search_layout.addWidget(self.ot_input)
+        search_layout.addWidget(self.search_input)
         search_layout.addWidget(self.search_button)
+        search_layout.addWidget(self.loading_label)
         layout.addLayout(search_layout) # <-- Esta línea es vital
         
+        self.vehicles_table = QTableWidget()
+        self.vehicles_table.setColumnCount(len(self.VEHICLE_HEADERS))
+        self.vehicles_table.setHorizontalHeaderLabels(self.VEHICLE_HEADERS)
+        self.vehicles_table.setEditTriggers(QTableWidget.EditTrigger.NoEditTriggers)
+        self.vehicles_table.setSelectionBehavior(QTableWidget.SelectionBehavior.SelectRows)
+        self.vehicles_table.setSelectionMode(QTableWidget.SelectionMode.SingleSelection)
+        self.vehicles_table.itemSelectionChanged.connect(self._show_selected_history)
+
+        self.history_label = QLabel("")
+        self.history_tree = QTreeWidget()
+        self.history_tree.setColumnCount(len(self.HISTORY_HEADERS))
+        self.history_tree.setHeaderLabels(self.HISTORY_HEADERS)
+        self.history_tree.itemDoubleClicked.connect(self.show_ot_parts)
+
+        self.empty_label = create_empty_results_label()
+        self.truncated_label = create_empty_results_label()
+        self.truncated_label.setText(f"Se muestran los primeros {self.MAX_VEHICLES} vehículos; "
+                                     "escriba más para afinar la búsqueda.")
+        self._vehicles = []       # Último resultado mostrado
+        self._search_term = None  # Término con el que se obtuvo
+        self._data_versions = None
+
         self.results_container = QWidget()
-        self.results_layout = QVBoxLayout(self.results_container)
+        results_layout = QVBoxLayout(self.results_container)
+        results_layout.setContentsMargins(0, 0, 0, 0)
+        results_layout.addWidget(self.vehicles_table, 1)
+        results_layout.addWidget(self.truncated_label)
+        results_layout.addWidget(self.history_label)
+        results_layout.addWidget(self.history_tree, 2)
         self.results_container.setVisible(False)
         
         layout.addWidget(self.results_container)
+        layout.addWidget(self.empty_label)
 
     # ❌ ELIMINADO: go_back_to_home() ❌
 
-    def search_ot(self):
-        ot_number = self.ot_input.text()
-        conn = sqlite3.connect(DATABASE_NAME)
-        cursor = conn.cursor()
-        
-        query = """
-        SELECT o.vin, v.model, v.year, v.insurance, v.owner_name, v.owner_email, v.owner_phone, o.sales_advisor
-        FROM ots AS o
-        LEFT JOIN vins AS v ON o.vin = v.vin
-        WHERE o.ot_number = ?
-        """
-        cursor.execute(query, (ot_number,))
-        result = cursor.fetchone()
-        conn.close()
-        
-        for i in reversed(range(self.results_layout.count())):
-            widget = self.results_layout.itemAt(i).widget()
-            if widget:
-                widget.setParent(None)
-
-        if result:
-            self.results_container.setVisible(True)
-            labels_data = [
-                ("VIN", result[0]),
-                ("Modelo", result[1]),
-                ("Año", str(result[2])),
-                ("Seguro", result[3]),
-                ("Propietario", result[4]),
-                ("Correo", result[5]),
-                ("Teléfono", result[6]),
-                ("Asesor (OT)", result[7])
-            ]
-            
-            for label_text, data in labels_data:
-                info_label = QLabel(f"<span style='font-weight: bold;'>{label_text}:</span> {data}")
-                info_label.setStyleSheet("font-size: 14px; margin-bottom: 5px;")
-                self.results_layout.addWidget(info_label)
+    def search_vehicles(self):
+        search_term = self.search_input.text().strip()
+        if not search_term:
+            return
+        self.load_vehicles(search_term)
+
+    def load_vehicles(self, search_term):
+        # Se pide un vehículo de más para saber si el resultado quedó recortado
+        self.loading_label.setVisible(True)
+        self._data_versions = core.table_versions(self.TABLES)
+        query_executor().submit(
+            "vin_lookup",
+            lambda conn: core.find_vehicles(search_term, self.MAX_VEHICLES + 1, conn),
+            lambda vehicles: self._show_result(vehicles, search_term),
+            self._on_query_failed,
+        )
+
+    def refresh_if_changed(self):
+        """Repite la búsqueda mostrada si cambiaron vehículos, OTs o partes."""
+        if self._search_term and self._data_versions != core.table_versions(self.TABLES):
+            self.load_vehicles(self._search_term)
+
+    def _on_query_failed(self, message):
+        self.loading_label.setVisible(False)
+        show_query_error(self, message)
+
+    def _show_result(self, vehicles, search_term):
+        self.loading_label.setVisible(False)
+        # Al recargar se conserva el vehículo elegido
+        selected_vin = self._selected_vin() if search_term == self._search_term else None
+        truncated = len(vehicles) > self.MAX_VEHICLES
+        self._vehicles = vehicles[:self.MAX_VEHICLES]
+        self._search_term = search_term
+
+        table = self.vehicles_table
+        table.blockSignals(True)
+        table.setRowCount(len(self._vehicles))
+        selected_row = 0
+        for row_idx, vehicle in enumerate(self._vehicles):
+            values = [vehicle[key] for key in self.VEHICLE_KEYS] + [len(vehicle["orders"])]
+            for column, value in enumerate(values):
+                table.setItem(row_idx, column, QTableWidgetItem("" if value is None else str(value)))
+            if vehicle["vin"] == selected_vin:
+                selected_row = row_idx
+        table.resizeColumnsToContents()
+        table.clearSelection()
+        table.blockSignals(False)
+
+        self.truncated_label.setVisible(truncated)
+        self.results_container.setVisible(bool(self._vehicles))
+        self.empty_label.setText(f"No se encontró ningún vehículo para '{search_term}'.")
+        self.empty_label.setVisible(not self._vehicles)
+        if self._vehicles:
+            table.selectRow(selected_row)
         else:
-            self.results_container.setVisible(False)
-            QMessageBox.warning(self, "No se encontró", "No se encontró ninguna OT con ese número.")
+            self.history_tree.clear()
+
+    def _selected_vin(self):
+        rows = self.vehicles_table.selectionModel().selectedRows()
+        if not rows or rows[0].row() >= len(self._vehicles):
+            return None
+        return self._vehicles[rows[0].row()]["vin"]
+
+    def _show_selected_history(self):
+        rows = self.vehicles_table.selectionModel().selectedRows()
+        if not rows or rows[0].row() >= len(self._vehicles):
+            return
+        vehicle = self._vehicles[rows[0].row()]
+        orders = vehicle["orders"]
+        self.history_label.setText(
+            f"<b>Historial de {vehicle['vin']}</b> ({vehicle['model'] or ''} {vehicle['year'] or ''}): "
+            f"{len(orders)} OTs, {sum(len(order['parts']) for order in orders)} partes"
+        )
+        self.history_tree.setUpdatesEnabled(False)
+        self.history_tree.clear()
+        for order in orders:
+            ot_item = QTreeWidgetItem(self.history_tree, [
+                order["ot_number"], order["sales_advisor"] or "", order["request_date"] or "",
+                str(len(order["parts"])), order["status"] or "",
+            ])
+            ot_item.setData(0, Qt.ItemDataRole.UserRole, order["ot_number"])
+            ot_item.addChildren([
+                QTreeWidgetItem([part_number, part_name or "", "", "" if quantity is None else str(quantity),
+                                 status or ""])
+                for part_number, part_name, quantity, status in order["parts"]
+            ])
+        self.history_tree.resizeColumnToContents(0)
+        self.history_tree.setUpdatesEnabled(True)
+
+    def show_ot_parts(self, item, column):
+        ot_item = item.parent() or item
+        parts_dialog = OTPartsDialog(ot_item.data(0, Qt.ItemDataRole.UserRole),
+                                     estilo_css=QApplication.instance().styleSheet())
+        parts_dialog.exec()
+        self.refresh_if_changed()
+
+class PendingPartsWindow(QWidget):
+    """OTs con partes sin entregar, agrupadas por asesor y antigüedad.
+
+    Cada grupo muestra sus totales; sus OTs se agregan al árbol al expandirlo,
+    así la vista abre igual de rápido aunque haya miles de OTs pendientes.
+    """
+    TABLES = ("ots", "ot_parts")
+    HEADERS = ["Asesor / Antigüedad / OT", "Fecha de Pedido", "Días", "Partes Pendientes", "Cantidad Pendiente"]
+
+    def __init__(self, estilo_css=""):
+        super().__init__()
+        
+        layout = QVBoxLayout(self)
+        
+        header_layout = QHBoxLayout()
+        header_layout.addSpacing(20)
+
+        title_label = QLabel("OTs Pendientes de Partes")
+        title_label.setObjectName("title_label")
+        self.summary_label = QLabel("")
+        self.loading_label = create_loading_label()
+        export_button = QPushButton("📤 Exportar")
+        export_button.clicked.connect(self.export_pending)
+        
+        header_layout.addWidget(title_label)
+        header_layout.addStretch()
+        header_layout.addWidget(self.summary_label)
+        header_layout.addWidget(self.loading_label)
+        header_layout.addWidget(export_button)
+        
+        layout.addLayout(header_layout)
+
+        self.pending_tree = QTreeWidget()
+        self.pending_tree.setColumnCount(len(self.HEADERS))
+        self.pending_tree.setHeaderLabels(self.HEADERS)
+        self.pending_tree.itemExpanded.connect(self._fill_group)
+        self.pending_tree.itemDoubleClicked.connect(self.show_ot_parts)
+        self.empty_label = create_empty_results_label()
+        self.empty_label.setText("No hay partes pendientes de entrega.")
+        
+        layout.addWidget(self.pending_tree)
+        layout.addWidget(self.empty_label)
+        
+        self.load_pending_data()
+
+    def load_pending_data(self):
+        self.loading_label.setVisible(True)
+        self._data_versions = core.table_versions(self.TABLES)
+        query_executor().submit(
+            "pending_parts",
+            lambda conn: core.list_pending_parts(conn),
+            self._show_pending,
+            self._on_query_failed,
+        )
+
+    def refresh_if_changed(self):
+        if self._data_versions != core.table_versions(self.TABLES):
+            self.load_pending_data()
+
+    def _on_query_failed(self, message):
+        self.loading_label.setVisible(False)
+        show_query_error(self, message)
+
+    def _show_pending(self, rows):
+        self.loading_label.setVisible(False)
+        # Los grupos abiertos siguen abiertos al recargar
+        expanded = set()
+        for advisor_idx in range(self.pending_tree.topLevelItemCount()):
+            advisor_item = self.pending_tree.topLevelItem(advisor_idx)
+            for bucket_idx in range(advisor_item.childCount()):
+                bucket_item = advisor_item.child(bucket_idx)
+                if bucket_item.isExpanded():
+                    expanded.add((advisor_item.text(0), bucket_item.data(0, Qt.ItemDataRole.UserRole)))
+
+        grouped = {}  # asesor -> {antigüedad: filas}
+        for row in rows:
+            advisor = row[0] or core.NO_ADVISOR
+            grouped.setdefault(advisor, {}).setdefault(core.pending_age_bucket(row[3]), []).append(row)
+        # Primero las más antiguas
+        bucket_order = [label for _, label in reversed(core.PENDING_AGE_BUCKETS)] + [core.PENDING_UNDATED]
+
+        self.pending_tree.setUpdatesEnabled(False)
+        self.pending_tree.clear()
+        for advisor, buckets in grouped.items():
+            advisor_rows = [row for bucket_rows in buckets.values() for row in bucket_rows]
+            advisor_item = QTreeWidgetItem(self.pending_tree, self._group_texts(advisor, advisor_rows))
+            for label in bucket_order:
+                bucket_rows = buckets.get(label)
+                if not bucket_rows:
+                    continue
+                bucket_item = QTreeWidgetItem(advisor_item, self._group_texts(
+                    f"{label} ({len(bucket_rows)} OTs)", bucket_rows))
+                bucket_item.setData(0, Qt.ItemDataRole.UserRole, label)
+                bucket_item.setData(1, Qt.ItemDataRole.UserRole, bucket_rows)
+                # Las OTs se agregan al expandir (ver _fill_group)
+                bucket_item.setChildIndicatorPolicy(QTreeWidgetItem.ChildIndicatorPolicy.ShowIndicator)
+                if (advisor, label) in expanded:
+                    bucket_item.setExpanded(True)
+            advisor_item.setExpanded(True)
+        self.pending_tree.resizeColumnToContents(0)
+        self.pending_tree.setUpdatesEnabled(True)
+
+        ot_count = len(rows)
+        self.summary_label.setText(f"{ot_count} OTs, {sum(row[4] for row in rows)} partes pendientes"
+                                   if ot_count else "")
+        self.empty_label.setVisible(not ot_count)
+
+    @staticmethod
+    def _group_texts(title, rows):
+        return [title, "", "", str(sum(row[4] for row in rows)), str(sum(row[5] or 0 for row in rows))]
+
+    def _fill_group(self, item):
+        rows = item.data(1, Qt.ItemDataRole.UserRole)
+        if not rows or item.childCount():
+            return
+        item.addChildren([
+            self._ot_item(ot_number, request_date, age_days, parts, quantity)
+            for _, ot_number, request_date, age_days, parts, quantity in rows
+        ])
+
+    @staticmethod
+    def _ot_item(ot_number, request_date, age_days, parts, quantity):
+        ot_item = QTreeWidgetItem([ot_number, request_date or "", "" if age_days is None else str(age_days),
+                                   str(parts), str(quantity or 0)])
+        ot_item.setData(0, Qt.ItemDataRole.UserRole, ot_number)
+        return ot_item
+
+    def show_ot_parts(self, item, column):
+        # Solo las OTs (sin hijos posibles) abren el detalle
+        if item.parent() is None or item.data(1, Qt.ItemDataRole.UserRole) is not None:
+            return
+        parts_dialog = OTPartsDialog(item.data(0, Qt.ItemDataRole.UserRole),
+                                     estilo_css=QApplication.instance().styleSheet())
+        parts_dialog.exec()
+        self.refresh_if_changed()
+
+    def export_pending(self):
+        report = core.REPORTS["partes-pendientes"]
+        export_view(self, report["label"], report["query"], (), report["columns"], "partes-pendientes.csv")
 
 class AdvisorListWindow(QWidget):
+    TABLES = ("advisors",)
+
     def __init__(self, estilo_css=""):
         super().__init__()
         
@@ -1307,9 +2678,12 @@ class AdvisorListWindow(QWidget):
         add_advisor_button = QPushButton("Agregar Asesor")
         add_advisor_button.setObjectName("add_button")
         add_advisor_button.clicked.connect(self.add_new_advisor_dialog)
+        export_button = QPushButton("📤 Exportar")
+        export_button.clicked.connect(self.export_advisors)
         
         header_layout.addWidget(title_label)
         header_layout.addStretch()
+        header_layout.addWidget(export_button)
         header_layout.addWidget(add_advisor_button)
         
         layout.addLayout(header_layout)
@@ -1325,15 +2699,29 @@ class AdvisorListWindow(QWidget):
     # ❌ ELIMINADO: go_back_to_home() ❌
             
     def load_advisor_data(self):
-        conn = sqlite3.connect(DATABASE_NAME)
-        cursor = conn.cursor()
-        cursor.execute("SELECT name FROM advisors ORDER BY name")
-        advisor_data = cursor.fetchall()
-        conn.close()
-        
+        # La lista sale de la caché de referencia: solo consulta si cambió la tabla
+        self._data_versions = core.table_versions(self.TABLES)
+        try:
+            advisors = core.cached_advisors()
+        except sqlite3.Error as e:
+            QMessageBox.critical(self, "Error de DB", f"No se pudo cargar la lista de asesores: {e}")
+            return
+        self._show_advisors(advisors)
+
+    def refresh_if_changed(self):
+        if self._data_versions != core.table_versions(self.TABLES):
+            self.load_advisor_data()
+
+    def export_advisors(self):
+        query, params = core.advisors_export_query()
+        export_view(self, "Asesores", query, params, core.ADVISORS_EXPORT_COLUMNS, "asesores.csv")
+
+    def _show_advisors(self, advisor_data):
+        # Sin ordenar mientras se llena, para que las filas no se reacomoden
+        self.advisor_table.setSortingEnabled(False)
         self.advisor_table.setRowCount(len(advisor_data))
-        for row_idx, row_data in enumerate(advisor_data):
-            self.advisor_table.setItem(row_idx, 0, QTableWidgetItem(row_data[0]))
+        for row_idx, advisor in enumerate(advisor_data):
+            self.advisor_table.setItem(row_idx, 0, QTableWidgetItem(advisor))
             
         self.advisor_table.resizeColumnsToContents()
         self.advisor_table.setSortingEnabled(True)
@@ -1352,8 +2740,21 @@ class AdvisorListWindow(QWidget):
 # ----------------------------------------------------------------------
 
 class MainWindow(QMainWindow):
+    # Vistas de la pila que se crean en el primer uso; cada una carga sus
+    # datos al crearse y después solo si cambiaron sus tablas
+    VIEW_CLASSES = {
+        "ot_list": OTWindow,
+        "parts_list": PartsListWindow,
+        "vin_lookup": VINLookupWindow,
+        "advisor_list": AdvisorListWindow,
+        "pending_parts": PendingPartsWindow,
+    }
+
     def __init__(self, estilo_css):
         super().__init__()
+        self.estilo_css = estilo_css
+        self._views = {}
+        self._advisor_menu_items = None
         self.user_role = LoginWindow.user_role
         self.user_full_name = LoginWindow.username_logged
         
@@ -1439,19 +2840,6 @@ class MainWindow(QMainWindow):
         self.home_widget = QWidget()
         self.setup_home_widget(self.home_widget)
         self.stacked_widget.addWidget(self.home_widget) 
-        
-        # ⭐️ Vistas sin el argumento 'main_window' ⭐️
-        self.ot_widget = OTWindow(estilo_css=estilo_css)
-        self.stacked_widget.addWidget(self.ot_widget) 
-        
-        self.parts_widget = PartsListWindow(estilo_css=estilo_css)
-        self.stacked_widget.addWidget(self.parts_widget) 
-        
-        self.vin_widget = VINLookupWindow(estilo_css=estilo_css)
-        self.stacked_widget.addWidget(self.vin_widget) 
-
-        self.advisor_widget = AdvisorListWindow(estilo_css=estilo_css)
-        self.stacked_widget.addWidget(self.advisor_widget) 
 
         self.ot_menu = self.create_ot_menu(estilo_css)
         self.parts_menu = self.create_parts_menu(estilo_css)
@@ -1468,6 +2856,62 @@ class MainWindow(QMainWindow):
         
         self.change_view("home")
 
+        # Cambios hechos desde otros equipos: mientras la base no cambie, cada
+        # revisión es un solo PRAGMA, sin consultar ninguna tabla
+        self.change_detector = core.ChangeDetector()
+        self._change_timer = QTimer(self)
+        self._change_timer.timeout.connect(self.check_for_changes)
+        self._change_timer.start(CHANGE_POLL_MS)
+
+    # ------------------
+    # VISTAS (creadas en el primer uso)
+    # ------------------
+
+    def view(self, view_name):
+        """Devuelve la vista, creándola (y cargando sus datos) la primera vez."""
+        widget = self._views.get(view_name)
+        if widget is None:
+            # ⭐️ Vistas sin el argumento 'main_window' ⭐️
+            widget = self.VIEW_CLASSES[view_name](estilo_css=self.estilo_css)
+            self.stacked_widget.addWidget(widget)
+            self._views[view_name] = widget
+        return widget
+
+    @property
+    def ot_widget(self):
+        return self.view("ot_list")
+
+    @property
+    def parts_widget(self):
+        return self.view("parts_list")
+
+    @property
+    def vin_widget(self):
+        return self.view("vin_lookup")
+
+    @property
+    def advisor_widget(self):
+        return self.view("advisor_list")
+
+    def refresh_current_view(self):
+        """Recarga la vista visible si cambiaron las tablas que muestra."""
+        current = self.stacked_widget.currentWidget()
+        if hasattr(current, "refresh_if_changed"):
+            current.refresh_if_changed()
+
+    def check_for_changes(self):
+        """Refresca la vista visible y el menú de asesores abierto si cambiaron sus tablas."""
+        try:
+            changed = self.change_detector.poll()
+        except sqlite3.Error:
+            return  # base ocupada o inaccesible por el momento; se reintenta en la siguiente revisión
+        if not changed:
+            return
+        self.refresh_current_view()
+        # Cerrado, el menú se actualiza al abrirse (show_dropdown_menu)
+        if "advisors" in changed and self.advisor_filter_menu.isVisible():
+            self.update_advisor_filter_menu()
+
     # ------------------
     # MÉTODOS DE ADMIN Y UTILIDAD
     # ------------------
@@ -1478,6 +2922,12 @@ class MainWindow(QMainWindow):
         
         action_add_user = menu.addAction("➕ Crear Nuevo Usuario")
         action_add_user.triggered.connect(self.add_new_user)
+
+        action_import = menu.addAction("📥 Importar Datos (CSV/XLSX)")
+        action_import.triggered.connect(self.import_data)
+
+        action_storage = menu.addAction("📊 Diagnóstico de Almacenamiento")
+        action_storage.triggered.connect(self.show_storage_diagnostics)
         
         menu.addSeparator()
         
@@ -1490,6 +2940,20 @@ class MainWindow(QMainWindow):
         add_user_dialog = AddUserDialog(self.styleSheet())
         add_user_dialog.exec()
         
+    def import_data(self):
+        import_dialog = ImportDialog(self.styleSheet())
+        import_dialog.exec()
+        # Refrescar la lista visible con los datos importados
+        self.refresh_current_view()
+
+    def show_storage_diagnostics(self):
+        try:
+            report = core.format_storage_diagnostics(core.storage_diagnostics())
+        except sqlite3.Error as e:
+            QMessageBox.critical(self, "Error de DB", f"No se pudo medir el almacenamiento: {e}")
+            return
+        QMessageBox.information(self, "Diagnóstico de Almacenamiento", report)
+
     def logout(self):
         """Cierra la ventana principal para volver a la pantalla de login (manejado en __main__)."""
         self.close()
@@ -1503,7 +2967,7 @@ class MainWindow(QMainWindow):
             
         menu.exec(button.mapToGlobal(button.rect().bottomLeft()))
 
-    def change_view(self, view_name):
+    def change_view(self, view_name, refresh=True):
      # MODIFICACIÓN DE LÓGICA DE CHEQUEO 
         # Desactivar el 'checked' de TODOS los botones
         for name, button in self.nav_buttons.items():
@@ -1512,13 +2976,10 @@ class MainWindow(QMainWindow):
                 button.setChecked(False)
      # Activar el 'checked' del botón actual
         # Esta parte marca el botón seleccionado después de desmarcar los demás
-        view_map = {
-            "home": 0, "ot_list": 1, "parts_list": 2, "vin_lookup": 3, "advisor_list": 4
-        }
-        
         # Aquí debes mapear el nombre de la vista al nombre del botón
         button_name_map = {
-            "home": "home", "ot_list": "ot", "parts_list": "parts", "vin_lookup": "vin", "advisor_list": "advisor_filter"
+            "home": "home", "ot_list": "ot", "parts_list": "parts", "vin_lookup": "vin", "advisor_list": "advisor_filter",
+            "pending_parts": "ot"
         }
         
         if view_name in button_name_map:
@@ -1527,19 +2988,17 @@ class MainWindow(QMainWindow):
                 self.nav_buttons[button_key].setChecked(True)
         # FIN MODIFICACIÓN DE LÓGICA DE CHEQUEO 
         
-        index = view_map.get(view_name)
-        if index is not None:
-            self.stacked_widget.setCurrentIndex(index)
-            # Recargar datos si es necesario al cambiar de vista
-            if view_name == "ot_list":
-                self.ot_widget.load_ot_data()
-            elif view_name == "parts_list":
-                self.parts_widget.load_parts_data()
-            elif view_name == "advisor_list":
-                self.advisor_widget.load_advisor_data()
+        if view_name == "home":
+            self.stacked_widget.setCurrentWidget(self.home_widget)
+        elif view_name in self.VIEW_CLASSES:
+            self.stacked_widget.setCurrentWidget(self.view(view_name))
+            # Una vista ya creada conserva sus datos mientras sus tablas no cambien
+            if refresh:
+                self.refresh_current_view()
                 
     def apply_advisor_filter(self, advisor_name=None):
-        self.change_view("ot_list")
+        # Sin refrescar: la lista se vuelve a leer enseguida con el filtro nuevo
+        self.change_view("ot_list", refresh=False)
         self.ot_widget.load_ot_data(filter_advisor=advisor_name)
         
         if advisor_name:
@@ -1554,9 +3013,9 @@ class MainWindow(QMainWindow):
         action_list = menu.addAction("Ver Todas las OTs")
         action_list.triggered.connect(lambda: self.apply_advisor_filter(None))
         action_add = menu.addAction("➕ Agregar Nueva OT")
-        action_add.triggered.connect(self.ot_widget.add_new_ot)
+        action_add.triggered.connect(lambda: self.ot_widget.add_new_ot())
         action_pending = menu.addAction("OTs Pendientes de Partes")
-        action_pending.triggered.connect(lambda: (self.change_view("ot_list"), QMessageBox.information(self, "Filtro", "Se ha aplicado el filtro de OTs Pendientes.")))
+        action_pending.triggered.connect(lambda: self.change_view("pending_parts"))
         menu.addSeparator()
         action_add_advisor = menu.addAction("👤 Registrar Asesor")
         action_add_advisor.triggered.connect(self.add_new_advisor)
@@ -1568,31 +3027,39 @@ class MainWindow(QMainWindow):
     def create_advisor_filter_menu(self, estilo_css):
         menu = QMenu(self)
         menu.setStyleSheet(estilo_css)
-        self.update_advisor_filter_menu(menu) 
-        return menu
-
-    def update_advisor_filter_menu(self, menu=None):
-        if menu is None:
-            menu = self.advisor_filter_menu
-            
-        menu.clear()
         
         action_all = menu.addAction("Mostrar Todas las OTs")
         action_all.triggered.connect(lambda: self.apply_advisor_filter(None))
         menu.addSeparator()
-        
-        conn = sqlite3.connect(DATABASE_NAME)
-        cursor = conn.cursor()
-        cursor.execute("SELECT name FROM advisors ORDER BY name")
-        advisors = [row[0] for row in cursor.fetchall()]
-        conn.close()
-        
-        if not advisors:
-            menu.addAction("No hay asesores registrados")
-        else:
-            for advisor in advisors:
-                action = menu.addAction(advisor)
+        self._no_advisors_action = menu.addAction("No hay asesores registrados")
+        # Los asesores se agregan al abrirse (show_dropdown_menu), no al iniciar la ventana
+        self._advisor_actions = {}  # nombre -> QAction
+        return menu
+
+    def update_advisor_filter_menu(self):
+        """Sincroniza el menú con la caché de asesores: agrega y quita solo los que cambiaron."""
+        advisors = core.cached_advisors()
+        if advisors == self._advisor_menu_items:
+            return
+        self._advisor_menu_items = advisors
+        menu = self.advisor_filter_menu
+
+        wanted = set(advisors)
+        for name in [name for name in self._advisor_actions if name not in wanted]:
+            action = self._advisor_actions.pop(name)
+            menu.removeAction(action)
+            action.deleteLater()
+        # De atrás hacia adelante, cada asesor nuevo se inserta antes del siguiente
+        next_action = None
+        for advisor in reversed(advisors):
+            action = self._advisor_actions.get(advisor)
+            if action is None:
+                action = QAction(advisor, menu)
                 action.triggered.connect(lambda checked, a=advisor: self.apply_advisor_filter(a))
+                menu.insertAction(next_action, action)
+                self._advisor_actions[advisor] = action
+            next_action = action
+        self._no_advisors_action.setVisible(not advisors)
 
     def create_parts_menu(self, estilo_css):
         menu = QMenu(self)
@@ -1601,7 +3068,7 @@ class MainWindow(QMainWindow):
         action_list = menu.addAction("Ver Listado de Partes (Inventario)")
         action_list.triggered.connect(lambda: self.change_view("parts_list"))
         action_add = menu.addAction("➕ Agregar Nueva Parte a Inventario")
-        action_add.triggered.connect(self.parts_widget.add_new_part)
+        action_add.triggered.connect(lambda: self.parts_widget.add_new_part())
         action_search = menu.addAction("🔍 Buscar por No. de Parte")
         action_search.triggered.connect(lambda: (self.change_view("parts_list"), QMessageBox.information(self, "Búsqueda", "Lógica para abrir la barra de búsqueda rápida aquí.")))
         
@@ -1626,7 +3093,7 @@ class MainWindow(QMainWindow):
         company_logo = QLabel()
         
         # Intentar cargar imagen desde la carpeta del ejecutable/proyecto
-        image_path = os.path.join(base_path, 'image.jpeg')
+        image_path = os.path.join(core.base_path, 'image.jpeg')
         pixmap = QPixmap(image_path)
         # Si no existe en la carpeta del exe, intentar en el bundle temporal (PyInstaller _MEIPASS)
         if pixmap.isNull() and getattr(sys, 'frozen', False):
@@ -1657,16 +3124,12 @@ class MainWindow(QMainWindow):
     def add_new_vin(self):
         add_vin_window = AddVINWindow(self.styleSheet())
         if add_vin_window.exec() == QDialog.DialogCode.Accepted:
-            self.update_advisor_filter_menu()
-            if self.stacked_widget.currentIndex() == 1: 
-                self.ot_widget.load_ot_data()
+            self.refresh_current_view()
         
     def add_new_advisor(self):
         add_advisor_window = AddAdvisorWindow(self.styleSheet())
         if add_advisor_window.exec() == QDialog.DialogCode.Accepted:
-            if self.stacked_widget.currentIndex() == 4:
-                self.advisor_widget.load_advisor_data()
-            self.update_advisor_filter_menu()
+            self.refresh_current_view()
 
 
 # ----------------------------------------------------------------------
@@ -1674,7 +3137,7 @@ class MainWindow(QMainWindow):
 # ----------------------------------------------------------------------
 
 if __name__ == "__main__":
-    setup_database()
+    core.setup_database()
     app = QApplication(sys.argv)
     
     # Cargar estilos: preferir archivo externo si existe, sino usar estilos embebidos
@@ -0,0 +1,202 @@
+"""empresa-cli: tareas por lotes sin la interfaz gráfica.
+
+Importación y exportación masiva, reportes, mantenimiento de índices y
+respaldos sobre la misma base de datos que usa `empresa.py` (junto al .exe
+cuando está empaquetado). No importa Qt, así que se puede programar en el
+Programador de tareas fuera del horario de oficina.
+
+Ejemplos:
+    empresa-cli importar ots ordenes.csv --modo upsert
+    empresa-cli exportar ots ots.jsonl --asesor "Laura Gómez"
+    empresa-cli reporte partes-pendientes pendientes.csv
+    empresa-cli reindexar --vacuum
+    empresa-cli respaldar respaldos/
+
+Códigos de salida: 0 éxito, 1 error, 2 argumentos inválidos, 3 importación
+con filas rechazadas, 130 interrumpido (Ctrl+C).
+"""
+import argparse
+import os
+import sqlite3
+import sys
+import time
+from datetime import datetime
+
+import empresa_core as core
+
+EXIT_OK = 0
+EXIT_ERROR = 1
+EXIT_USAGE = 2  # el que usa argparse
+EXIT_REJECTED_ROWS = 3
+EXIT_INTERRUPTED = 130
+
+# Vistas exportables: (descripción, columnas)
+EXPORT_VIEWS = {
+    "ots": ("Órdenes de Trabajo", core.OTListQuery.EXPORT_COLUMNS),
+    "partes": ("Partes", core.PARTS_EXPORT_COLUMNS),
+    "asesores": ("Asesores", core.ADVISORS_EXPORT_COLUMNS),
+}
+
+
+def log(message):
+    print(message, file=sys.stderr)
+
+def progress_printer(label):
+    """Avance en una sola línea de stderr; en un archivo de log no escribe nada."""
+    if not sys.stderr.isatty():
+        return None
+    def progress(count):
+        sys.stderr.write(f"\r{label}: {count} filas")
+        sys.stderr.flush()
+    return progress
+
+def end_progress():
+    if sys.stderr.isatty():
+        sys.stderr.write("\n")
+
+def output_format(path, fmt):
+    """Formato pedido o, si no se indicó, el de la extensión del archivo (CSV por omisión)."""
+    if fmt:
+        return fmt
+    return "jsonl" if path.lower().endswith((".jsonl", ".json")) else "csv"
+
+def run_export(description, query, params, columns, path, fmt):
+    fmt = output_format(path, fmt)
+    start = time.perf_counter()
+    try:
+        summary = core.export_query(query, params, columns, path, fmt, progress_printer(description))
+    except KeyboardInterrupt:
+        # No se deja un archivo a medias que parezca completo
+        if os.path.exists(path):
+            os.remove(path)
+        raise
+    finally:
+        end_progress()
+    log(f"{description}: {summary['rows']} filas exportadas a {path} "
+        f"({time.perf_counter() - start:.1f} s)")
+    return EXIT_OK
+
+
+# --- Subcomandos ---
+
+def cmd_import(args):
+    core.setup_database()
+    start = time.perf_counter()
+    try:
+        summary = core.import_file(args.archivo, args.tipo, args.modo,
+                                   progress_printer("Leídas"), chunk_size=args.bloque)
+    finally:
+        end_progress()
+    log(core.format_import_summary(summary))
+    log(f"Tiempo: {time.perf_counter() - start:.1f} s")
+    return EXIT_REJECTED_ROWS if summary["rejected"] else EXIT_OK
+
+def cmd_export(args):
+    core.setup_database()
+    description, columns = EXPORT_VIEWS[args.vista]
+    if args.vista == "ots":
+        list_query = core.OTListQuery(args.asesor, args.buscar, args.orden, args.desc)
+        query, params = list_query.export_query()
+    elif args.vista == "partes":
+        query, params = core.parts_export_query(args.buscar)
+    else:
+        query, params = core.advisors_export_query()
+    return run_export(description, query, params, columns, args.salida, args.formato)
+
+def cmd_report(args):
+    core.setup_database()
+    report = core.REPORTS[args.reporte]
+    path = args.salida or f"{args.reporte}-{datetime.now():%Y%m%d}.{args.formato or 'csv'}"
+    return run_export(report["label"], report["query"], (), report["columns"], path, args.formato)
+
+def cmd_reindex(args):
+    core.setup_database()
+    timings, plan_problems = core.rebuild_indexes(lambda step: log(f"{step}..."), vacuum=args.vacuum)
+    for description, seconds in timings:
+        log(f"  {description}: {seconds:.1f} s")
+    for problem in plan_problems:
+        log(f"Advertencia de plan de consulta: {problem}")
+    return EXIT_OK
+
+def cmd_backup(args):
+    if not os.path.exists(core.DATABASE_NAME):
+        log(f"No existe la base de datos {core.DATABASE_NAME}")
+        return EXIT_ERROR
+    path = args.destino or os.path.join(os.path.dirname(core.DATABASE_NAME), "respaldos", "")
+    if os.path.isdir(path) or path.endswith(("/", os.sep)):
+        os.makedirs(path, exist_ok=True)
+        path = os.path.join(path, f"empresa-{datetime.now():%Y%m%d-%H%M%S}.db")
+    elif os.path.exists(path) and not args.forzar:
+        log(f"{path} ya existe; use --forzar para reemplazarlo.")
+        return EXIT_ERROR
+    start = time.perf_counter()
+    size = core.backup_database(path)
+    log(f"Respaldo verificado en {path} ({size / 1048576:.1f} MiB, "
+        f"{time.perf_counter() - start:.1f} s)")
+    return EXIT_OK
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog="empresa-cli",
+        description="Tareas por lotes sobre la base de datos de la empresa.",
+        epilog="Códigos de salida: 0 éxito, 1 error, 2 argumentos inválidos, "
+               "3 importación con filas rechazadas, 130 interrumpido.",
+    )
+    parser.add_argument("--db", help=f"archivo de base de datos (por omisión {core.DATABASE_NAME})")
+    commands = parser.add_subparsers(dest="command", required=True, metavar="comando")
+
+    p = commands.add_parser("importar", help="importar un CSV o XLSX")
+    p.add_argument("tipo", choices=core.IMPORT_TARGETS, help="tabla destino")
+    p.add_argument("archivo", help="archivo .csv o .xlsx con encabezados")
+    p.add_argument("--modo", choices=core.IMPORT_MODES, default="skip",
+                   help="registros existentes: omitir (skip) o actualizar (upsert)")
+    p.add_argument("--bloque", type=int, default=core.IMPORT_CHUNK_SIZE,
+                   help="filas por transacción (por omisión %(default)s)")
+    p.set_defaults(func=cmd_import)
+
+    p = commands.add_parser("exportar", help="exportar una vista a CSV o JSONL")
+    p.add_argument("vista", choices=EXPORT_VIEWS)
+    p.add_argument("salida", help="archivo de salida")
+    p.add_argument("--formato", choices=core.EXPORT_FORMATS, help="por omisión, según la extensión")
+    p.add_argument("--buscar", help="término de búsqueda (OTs y partes)")
+    p.add_argument("--asesor", help="solo las OTs de este asesor")
+    p.add_argument("--orden", choices=core.OTListQuery.SORT_EXPRESSIONS, help="orden de las OTs")
+    p.add_argument("--desc", action="store_true", help="orden descendente")
+    p.set_defaults(func=cmd_export)
+
+    p = commands.add_parser("reporte", help="generar un reporte",
+                            description="Reportes: " + "; ".join(
+                                f"{name} ({report['label']})" for name, report in core.REPORTS.items()))
+    p.add_argument("reporte", choices=core.REPORTS)
+    p.add_argument("salida", nargs="?", help="archivo de salida (por omisión <reporte>-<fecha>.csv)")
+    p.add_argument("--formato", choices=core.EXPORT_FORMATS)
+    p.set_defaults(func=cmd_report)
+
+    p = commands.add_parser("reindexar", help="reconstruir índices y ejecutar ANALYZE")
+    p.add_argument("--vacuum", action="store_true", help="compactar también el archivo")
+    p.set_defaults(func=cmd_reindex)
+
+    p = commands.add_parser("respaldar", help="copiar la base de datos en caliente")
+    p.add_argument("destino", nargs="?",
+                   help="archivo o carpeta (por omisión la carpeta 'respaldos' junto a la base)")
+    p.add_argument("--forzar", action="store_true", help="reemplazar el archivo si ya existe")
+    p.set_defaults(func=cmd_backup)
+    return parser
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.db:
+        core.DATABASE_NAME = os.path.abspath(args.db)
+    try:
+        return args.func(args)
+    except KeyboardInterrupt:
+        log("Interrumpido.")
+        return EXIT_INTERRUPTED
+    except (sqlite3.Error, OSError, ValueError) as e:
+        log(f"Error: {e}")
+        return EXIT_ERROR
+
+
+if __name__ == "__main__":
+    sys.exit(main())
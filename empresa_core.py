@@ -0,0 +1,2091 @@
+"""Núcleo de datos de la aplicación: esquema, consultas y operaciones.
+
+No depende de Qt, así que lo pueden usar la interfaz gráfica (`empresa.py`),
+scripts de línea de comandos, pruebas o procesos de trabajo. Todas las
+funciones usan la conexión del hilo actual (`get_connection()`).
+"""
+import sys
+import os
+import sqlite3
+import atexit
+import configparser
+import csv
+import json
+import queue
+import random
+import re
+import tempfile
+import threading
+import time
+import unicodedata
+from concurrent.futures import Future
+from contextlib import contextmanager
+from datetime import date, datetime
+
+# --- Configuración de la base de datos ---
+# Base path for resources and database.
+# When packaged with PyInstaller (--onefile), sys.frozen is True and
+# the executable lives outside the source tree. Use the directory of
+# the executable as the base path so the bundled exe is portable.
+if getattr(sys, 'frozen', False):
+    # Cuando está congelado por PyInstaller, sys.argv[0] apunta al ejecutable original
+    # (la ubicación del .exe). Usamos eso para que la .db se cree junto al .exe.
+    base_path = os.path.dirname(os.path.abspath(sys.argv[0]))
+else:
+    base_path = os.path.dirname(os.path.abspath(__file__))
+
+DATABASE_NAME = os.path.join(base_path, "empresa.db")
+CONFIG_FILE = os.path.join(base_path, "empresa.ini")
+
+# ----------------------------------------------------------------------
+# --- CONEXIONES ---
+# ----------------------------------------------------------------------
+
+# Sentencias preparadas que cada conexión conserva compiladas
+STATEMENT_CACHE_SIZE = 256
+
+_connections = {}  # id del hilo -> conexión abierta por ese hilo
+_connections_lock = threading.Lock()
+
+def get_connection():
+    """Devuelve la conexión de larga vida del hilo actual, abriéndola en el primer uso.
+
+    Cada hilo reutiliza siempre la misma conexión, así se conservan la caché de
+    páginas y la de sentencias de SQLite entre consultas. Las conexiones se
+    cierran al salir del programa.
+    """
+    thread_id = threading.get_ident()
+    conn = _connections.get(thread_id)
+    if conn is None:
+        # check_same_thread=False solo para poder cerrarla al salir; cada
+        # conexión se usa únicamente desde el hilo que la abrió
+        conn = sqlite3.connect(DATABASE_NAME, cached_statements=STATEMENT_CACHE_SIZE,
+                               check_same_thread=False)
+        apply_storage_profile(conn)
+        # SQLite no valida las llaves foráneas salvo que se active por conexión
+        conn.execute("PRAGMA foreign_keys = ON")
+        # Sin esto, las filas que borra un INSERT OR REPLACE no disparan los
+        # triggers de borrado y los contadores e índices quedarían desfasados
+        conn.execute("PRAGMA recursive_triggers = ON")
+        with _connections_lock:
+            _connections[thread_id] = conn
+    return conn
+
+@contextmanager
+def transaction():
+    """Ejecuta el bloque en una transacción: confirma al terminar o revierte si hay error.
+
+    Para migraciones y mantenimiento; los datos de la aplicación se escriben
+    con `submit_write`.
+    """
+    conn = get_connection()
+    try:
+        yield conn
+    except BaseException:
+        conn.rollback()
+        raise
+    else:
+        conn.commit()
+
+def close_thread_connection():
+    """Cierra la conexión del hilo actual; la usan los hilos que van a terminar."""
+    with _connections_lock:
+        conn = _connections.pop(threading.get_ident(), None)
+    if conn is not None:
+        conn.close()
+
+@atexit.register
+def close_all_connections():
+    with _connections_lock:
+        for conn in _connections.values():
+            conn.close()
+        _connections.clear()
+
+# ----------------------------------------------------------------------
+# --- ESCRITURAS (hilo escritor único) ---
+# ----------------------------------------------------------------------
+
+# Tiempo que el hilo escritor espera más escrituras para confirmarlas juntas
+WRITE_BATCH_WINDOW = 0.01  # segundos
+WRITE_BATCH_MAX = 200
+# Reintentos de un lote cuando otro proceso tiene la base bloqueada más
+# allá de busy_timeout; la espera se duplica en cada intento
+WRITE_BUSY_RETRIES = 5
+WRITE_BUSY_BACKOFF = 0.1  # segundos
+
+def is_busy_error(error):
+    """True si el error es de base ocupada o bloqueada por otra conexión."""
+    if not isinstance(error, sqlite3.OperationalError):
+        return False
+    code = getattr(error, "sqlite_errorcode", None)
+    if code is not None:
+        # Los códigos extendidos (SQLITE_BUSY_SNAPSHOT, ...) comparten el byte bajo
+        return code & 0xFF in (sqlite3.SQLITE_BUSY, sqlite3.SQLITE_LOCKED)
+    return "locked" in str(error) or "busy" in str(error)
+
+class WriteQueue:
+    """Hilo único que ejecuta todas las escrituras del proceso.
+
+    `submit(mutation)` encola `mutation(conn)` y devuelve un `Future` con su
+    resultado. Las escrituras que llegan dentro de `WRITE_BATCH_WINDOW` se
+    confirman en una sola transacción (un solo fsync). Si una falla, se
+    revierte la transacción y el lote se repite sin ella; si otro proceso
+    tiene la base bloqueada, se repite completo. Por eso una escritura solo
+    debe modificar la base de datos, sin otros efectos.
+
+    No se usan SAVEPOINTs por escritura: con uno abierto, FTS5 vacía sus
+    términos pendientes en cada sentencia y las cargas masivas van varias
+    veces más lentas.
+    """
+
+    def __init__(self, window=WRITE_BATCH_WINDOW, max_batch=WRITE_BATCH_MAX):
+        self.window = window
+        self.max_batch = max_batch
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="empresa-writer", daemon=True)
+        self._thread.start()
+
+    def submit(self, mutation):
+        """Encola `mutation(conn)` y devuelve un Future con su resultado."""
+        future = Future()
+        self._queue.put((mutation, future))
+        return future
+
+    def shutdown(self):
+        """Termina las escrituras pendientes y detiene el hilo."""
+        self._queue.put(None)
+        self._thread.join()
+
+    def _run(self):
+        try:
+            stopping = False
+            while not stopping:
+                item = self._queue.get()
+                if item is None:
+                    break
+                batch = [item]
+                deadline = time.monotonic() + self.window
+                while len(batch) < self.max_batch:
+                    try:
+                        item = self._queue.get(timeout=max(0, deadline - time.monotonic()))
+                    except queue.Empty:
+                        break
+                    if item is None:
+                        stopping = True
+                        break
+                    batch.append(item)
+                batch = [item for item in batch if item[1].set_running_or_notify_cancel()]
+                if batch:
+                    self._commit(batch)
+        finally:
+            close_thread_connection()
+
+    def _commit(self, batch):
+        conn = get_connection()
+        attempt = 0
+        while batch:
+            try:
+                results = self._apply(conn, batch)
+            except _WriteFailed as failed:
+                conn.rollback()
+                batch[failed.index][1].set_exception(failed.error)
+                del batch[failed.index]
+                continue
+            except BaseException as e:
+                if conn.in_transaction:
+                    conn.rollback()
+                if is_busy_error(e) and attempt < WRITE_BUSY_RETRIES:
+                    time.sleep(WRITE_BUSY_BACKOFF * 2 ** attempt * random.uniform(0.5, 1.5))
+                    attempt += 1
+                    continue
+                for _, future in batch:
+                    future.set_exception(e)
+                return
+            # Las versiones se leen antes de avisar, así quien espera el
+            # resultado ya ve sus tablas como modificadas
+            try:
+                _update_table_versions(read_change_counters(conn))
+            except sqlite3.Error:
+                pass  # ya está confirmado; ChangeDetector verá los cambios
+            for (_, future), value in zip(batch, results):
+                future.set_result(value)
+            return
+
+    @staticmethod
+    def _apply(conn, batch):
+        """Ejecuta el lote en una transacción y devuelve el resultado de cada escritura."""
+        # IMMEDIATE toma el bloqueo de escritura al inicio: si la base está
+        # ocupada falla aquí, antes de ejecutar nada
+        conn.execute("BEGIN IMMEDIATE")
+        results = []
+        for index, (mutation, _) in enumerate(batch):
+            try:
+                results.append(mutation(conn))
+            except Exception as e:
+                if is_busy_error(e):
+                    raise
+                raise _WriteFailed(index, e) from e
+        conn.commit()
+        return results
+
+
+class _WriteFailed(Exception):
+    """La escritura `index` del lote falló con `error`."""
+
+    def __init__(self, index, error):
+        super().__init__(index, error)
+        self.index = index
+        self.error = error
+
+_write_queue = None
+_write_queue_lock = threading.Lock()
+
+def write_queue():
+    """Devuelve el hilo escritor del proceso, creándolo en el primer uso."""
+    global _write_queue
+    with _write_queue_lock:
+        if _write_queue is None:
+            _write_queue = WriteQueue()
+            # Se registra después de close_all_connections, así corre antes
+            atexit.register(_write_queue.shutdown)
+    return _write_queue
+
+def submit_write(mutation):
+    """Encola `mutation(conn)` en el hilo escritor; devuelve un Future con su resultado."""
+    return write_queue().submit(mutation)
+
+# --- Versiones de tablas ---
+
+# Tablas con contador de cambios en `change_counters`
+CHANGE_TRACKED_TABLES = ("advisors", "vins", "ots", "parts", "ot_parts")
+
+# Último valor conocido de cada contador. Lo actualizan el hilo escritor al
+# confirmar y `ChangeDetector` al ver cambios de otros procesos.
+_table_versions = {}
+_table_versions_lock = threading.Lock()
+
+def table_versions(tables):
+    """Huella de los cambios en `tables`: es distinta cada vez que alguna se modifica.
+
+    Las vistas la guardan al cargar sus datos y solo vuelven a leer la base
+    de datos si cambió.
+    """
+    with _table_versions_lock:
+        return tuple(_table_versions.get(table, 0) for table in tables)
+
+def read_change_counters(conn=None):
+    """Contadores de `change_counters`: {tabla: versión}."""
+    conn = conn or get_connection()
+    return dict(conn.execute("SELECT table_name, version FROM change_counters"))
+
+def _update_table_versions(counters):
+    with _table_versions_lock:
+        for table, version in counters.items():
+            # Un hilo puede haber leído antes unos contadores más viejos
+            if version > _table_versions.get(table, -1):
+                _table_versions[table] = version
+
+class ChangeDetector:
+    """Detecta cambios en la base de datos hechos por cualquier conexión.
+
+    `poll()` cuesta un `PRAGMA data_version` mientras nadie escriba; solo
+    cuando ese valor cambia lee `change_counters`. Se usa siempre desde el
+    mismo hilo, porque `data_version` es propio de cada conexión.
+    """
+
+    def __init__(self, conn=None):
+        self.conn = conn or get_connection()
+        self._data_version = self._read_data_version()
+        self._counters = read_change_counters(self.conn)
+        _update_table_versions(self._counters)
+
+    def _read_data_version(self):
+        return self.conn.execute("PRAGMA data_version").fetchone()[0]
+
+    def poll(self):
+        """Devuelve el conjunto de tablas que cambiaron desde la llamada anterior."""
+        data_version = self._read_data_version()
+        if data_version == self._data_version:
+            return set()
+        self._data_version = data_version
+        counters = read_change_counters(self.conn)
+        changed = {table for table, version in counters.items() if self._counters.get(table) != version}
+        self._counters = counters
+        _update_table_versions(counters)
+        return changed
+
+# ----------------------------------------------------------------------
+# --- PERFILES DE ALMACENAMIENTO ---
+# ----------------------------------------------------------------------
+
+# PRAGMAs que aplica cada perfil, en el orden en que se ejecutan.
+# cache_size negativo está en KiB; mmap_size en bytes; busy_timeout en ms.
+STORAGE_PRAGMAS = ("busy_timeout", "journal_mode", "synchronous", "cache_size", "mmap_size", "temp_store")
+
+STORAGE_PROFILES = {
+    # Base de datos en el disco local del equipo
+    "desktop": {
+        "busy_timeout": 5000,
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "cache_size": -65536,
+        "mmap_size": 268435456,
+        "temp_store": "MEMORY",
+    },
+    # Base de datos en una carpeta compartida de red. WAL necesita memoria
+    # compartida entre procesos y no es seguro sobre SMB/NFS, así que se usa
+    # el diario clásico y no se mapea el archivo en memoria
+    "shared-drive": {
+        "busy_timeout": 15000,
+        "journal_mode": "DELETE",
+        "synchronous": "FULL",
+        "cache_size": -32768,
+        "mmap_size": 0,
+        "temp_store": "MEMORY",
+    },
+    # Cargas masivas puntuales: no espera al disco en cada confirmación. Un
+    # corte de energía puede perder o dañar datos; respaldar antes de usarlo
+    "bulk-load": {
+        "busy_timeout": 30000,
+        "journal_mode": "WAL",
+        "synchronous": "OFF",
+        "cache_size": -262144,
+        "mmap_size": 1073741824,
+        "temp_store": "MEMORY",
+    },
+}
+
+DEFAULT_STORAGE_PROFILE = "desktop"
+
+_PRAGMA_VALUE_RE = re.compile(r"-?\w+")
+# Nombres de los valores numéricos que devuelven algunos PRAGMAs
+_PRAGMA_VALUE_NAMES = {
+    "synchronous": {0: "OFF", 1: "NORMAL", 2: "FULL", 3: "EXTRA"},
+    "temp_store": {0: "DEFAULT", 1: "FILE", 2: "MEMORY"},
+}
+_storage_profile = None
+
+def load_storage_profile(path=None):
+    """Lee el perfil de la sección [almacenamiento] de `empresa.ini`.
+
+    La clave `perfil` elige uno de `STORAGE_PROFILES`; cualquier PRAGMA de
+    `STORAGE_PRAGMAS` escrito en la misma sección sobrescribe el del perfil.
+    Devuelve (nombre, pragmas).
+    """
+    path = path or CONFIG_FILE
+    parser = configparser.ConfigParser()
+    parser.read(path, encoding="utf-8")
+    section = parser["almacenamiento"] if parser.has_section("almacenamiento") else {}
+
+    name = section.get("perfil", DEFAULT_STORAGE_PROFILE).strip().lower()
+    if name not in STORAGE_PROFILES:
+        print(f"Perfil de almacenamiento desconocido '{name}', se usa '{DEFAULT_STORAGE_PROFILE}'.")
+        name = DEFAULT_STORAGE_PROFILE
+
+    pragmas = dict(STORAGE_PROFILES[name])
+    for pragma in STORAGE_PRAGMAS:
+        value = section.get(pragma, "").strip()
+        if not value:
+            continue
+        if not _PRAGMA_VALUE_RE.fullmatch(value):
+            print(f"Valor inválido para {pragma} en {path}: '{value}'")
+            continue
+        pragmas[pragma] = value
+    return name, pragmas
+
+def active_storage_profile():
+    """Perfil en uso (se lee de la configuración una sola vez)."""
+    global _storage_profile
+    if _storage_profile is None:
+        _storage_profile = load_storage_profile()
+    return _storage_profile
+
+def apply_storage_profile(conn, pragmas=None):
+    if pragmas is None:
+        pragmas = active_storage_profile()[1]
+    for pragma in STORAGE_PRAGMAS:
+        try:
+            conn.execute(f"PRAGMA {pragma} = {pragmas[pragma]}")
+        except sqlite3.OperationalError as e:
+            # journal_mode no puede cambiar mientras otro proceso tiene la base
+            # abierta; la conexión sigue en el modo actual
+            print(f"No se pudo aplicar PRAGMA {pragma}: {e}")
+
+def storage_diagnostics(samples=20):
+    """Mide el perfil activo: PRAGMAs efectivos y latencia media de lectura y escritura (ms)."""
+    name, _ = active_storage_profile()
+    conn = get_connection()
+    effective = {pragma: conn.execute(f"PRAGMA {pragma}").fetchone()[0] for pragma in STORAGE_PRAGMAS}
+
+    max_id = conn.execute("SELECT COALESCE(MAX(id), 0) FROM ots").fetchone()[0]
+    start = time.perf_counter()
+    for i in range(samples):
+        conn.execute("SELECT * FROM ots WHERE id = ?", (1 + (i * 7919) % max(max_id, 1),)).fetchone()
+    read_ms = (time.perf_counter() - start) * 1000 / samples
+
+    write_ms = _probe_write_latency(samples)
+
+    return {"profile": name, "pragmas": effective, "read_ms": read_ms, "write_ms": write_ms,
+            "plan_problems": check_query_plans(conn.cursor())}
+
+def _probe_write_latency(samples):
+    """Latencia media (ms) de una transacción de escritura con el perfil activo.
+
+    Se mide en una base desechable junto a la real (mismo disco y PRAGMAs),
+    así el diagnóstico no toca el esquema ni compite con el hilo escritor.
+    """
+    fd, path = tempfile.mkstemp(suffix=".db", prefix="storage-probe-",
+                                dir=os.path.dirname(os.path.abspath(DATABASE_NAME)))
+    os.close(fd)
+    conn = sqlite3.connect(path)
+    try:
+        apply_storage_profile(conn)
+        conn.execute("CREATE TABLE storage_probe (id INTEGER PRIMARY KEY, value TEXT)")
+        conn.commit()
+        # Cada escritura es una transacción completa, con su sincronización a disco
+        start = time.perf_counter()
+        for i in range(samples):
+            conn.execute("INSERT INTO storage_probe (value) VALUES (?)", (str(i),))
+            conn.commit()
+        return (time.perf_counter() - start) * 1000 / samples
+    finally:
+        conn.close()
+        for suffix in ("", "-wal", "-shm", "-journal"):
+            try:
+                os.remove(path + suffix)
+            except FileNotFoundError:
+                pass
+
+def format_storage_diagnostics(result):
+    lines = [f"Perfil activo: {result['profile']}", ""]
+    for pragma, value in result["pragmas"].items():
+        value = _PRAGMA_VALUE_NAMES.get(pragma, {}).get(value, value)
+        lines.append(f"{pragma}: {value}")
+    lines += [
+        "",
+        f"Lectura (consulta por id): {result['read_ms']:.2f} ms",
+        f"Escritura (transacción): {result['write_ms']:.2f} ms",
+        "",
+    ]
+    if result["plan_problems"]:
+        lines.append("Planes de consulta sin el índice esperado:")
+        lines += [f"• {problem}" for problem in result["plan_problems"]]
+    else:
+        lines.append("Planes de consulta: todos usan su índice.")
+    return "\n".join(lines)
+
+def setup_database():
+    """Lleva el esquema de la base de datos a la versión actual.
+
+    La versión aplicada se guarda en `PRAGMA user_version`; con la base al día
+    no se ejecuta ninguna sentencia de esquema ni de datos iniciales.
+    """
+    conn = get_connection()
+    cursor = conn.cursor()
+    version = cursor.execute("PRAGMA user_version").fetchone()[0]
+    if version >= SCHEMA_VERSION:
+        if version > SCHEMA_VERSION:
+            print(f"Advertencia: la base de datos tiene la versión de esquema {version}, "
+                  f"más nueva que la de esta aplicación ({SCHEMA_VERSION}).")
+        return
+
+    # Todos los pasos pendientes en una sola transacción: o se aplican todos o ninguno
+    cursor.execute("BEGIN")
+    try:
+        for step_version, migration in enumerate(MIGRATIONS, start=1):
+            if step_version > version:
+                migration(cursor)
+        cursor.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+    except BaseException:
+        conn.rollback()
+        raise
+    conn.commit()
+
+    violations = cursor.execute("PRAGMA foreign_key_check").fetchall()
+    if violations:
+        print(f"Advertencia: {len(violations)} registros con llaves foráneas inválidas "
+              f"(tablas: {', '.join(sorted({row[0] for row in violations}))}).")
+    for problem in check_query_plans(cursor):
+        print(f"Advertencia de plan de consulta: {problem}")
+
+def add_column_if_missing(cursor, table, column, definition):
+    columns = {row[1] for row in cursor.execute(f"PRAGMA table_info({table})")}
+    if column not in columns:
+        cursor.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+
+# ----------------------------------------------------------------------
+# --- MIGRACIONES ---
+# ----------------------------------------------------------------------
+# Cada migración recibe un cursor dentro de la transacción de setup_database.
+# Para cambiar el esquema se agrega una función al final de MIGRATIONS; las
+# existentes no se modifican, porque ya se aplicaron en bases en uso. Los
+# pasos usan IF NOT EXISTS para que también sirvan sobre bases anteriores a
+# este sistema de versiones (user_version = 0).
+
+def migration_001_base_schema(cursor):
+    """Tablas base y datos iniciales."""
+    # TABLA USERS con ROLE
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS users (
+            id INTEGER PRIMARY KEY,
+            username TEXT NOT NULL UNIQUE,
+            password TEXT NOT NULL,
+            full_name TEXT,
+            role TEXT DEFAULT 'user' 
+        )
+    """)
+    
+    # Bases creadas antes de que existieran estas columnas
+    add_column_if_missing(cursor, "users", "role", "TEXT DEFAULT 'user'")
+
+    # Tablas restantes
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS advisors (id INTEGER PRIMARY KEY, name TEXT NOT NULL UNIQUE)
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS ots (
+            id INTEGER PRIMARY KEY, ot_number TEXT NOT NULL UNIQUE, sales_advisor TEXT,
+            vin TEXT, status TEXT, request_date TEXT
+        )
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS parts (id INTEGER PRIMARY KEY, part_number TEXT NOT NULL UNIQUE, part_name TEXT)
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS ot_parts (
+            ot_id INTEGER, part_id INTEGER, quantity INTEGER, status TEXT,
+            FOREIGN KEY(ot_id) REFERENCES ots(id), FOREIGN KEY(part_id) REFERENCES parts(id),
+            PRIMARY KEY (ot_id, part_id)
+        )
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS vins (
+            vin TEXT PRIMARY KEY, model TEXT, year INTEGER, insurance TEXT, owner_name TEXT,
+            owner_email TEXT, owner_phone TEXT, sales_advisor TEXT
+        )
+    """)
+    add_column_if_missing(cursor, "vins", "sales_advisor", "TEXT")
+            
+    # --- Datos de prueba ---
+    cursor.execute("INSERT OR IGNORE INTO users (username, password, full_name, role) VALUES (?, ?, ?, ?)", 
+                    ('admin', 'password', 'Administrador', 'admin'))
+    cursor.execute("INSERT OR IGNORE INTO users (username, password, full_name, role) VALUES (?, ?, ?, ?)", 
+                    ('user1', 'pass', 'Usuario Estándar', 'user'))
+
+    cursor.execute("INSERT OR IGNORE INTO advisors (name) VALUES (?)", ('Laura Gómez',))
+    cursor.execute("INSERT OR IGNORE INTO advisors (name) VALUES (?)", ('Juan Pérez',))
+
+    cursor.execute("""
+        INSERT OR IGNORE INTO vins (vin, model, year, insurance, owner_name, owner_email, owner_phone, sales_advisor) 
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+    """, ('VIN1234567890', 'Tesla Model 3', 2023, 'Seguros Nacionales', 'Carlos Ruíz', 'carlos@email.com', '5512345678', 'Laura Gómez'))
+    cursor.execute("""
+        INSERT OR IGNORE INTO vins (vin, model, year, insurance, owner_name, owner_email, owner_phone, sales_advisor) 
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+    """, ('VIN0987654321', 'Honda Civic', 2022, 'GNP', 'Ana Torres', 'ana@email.com', '5598765432', 'Juan Pérez'))
+    
+    cursor.execute("INSERT OR IGNORE INTO ots (ot_number, sales_advisor, vin, status, request_date) VALUES (?, ?, ?, ?, ?)",
+                    ('OT-001', 'Laura Gómez', 'VIN1234567890', 'Pendiente', '2025-09-10'))
+    cursor.execute("INSERT OR IGNORE INTO ots (ot_number, sales_advisor, vin, status, request_date) VALUES (?, ?, ?, ?, ?)",
+                    ('OT-002', 'Juan Pérez', 'VIN0987654321', 'Pendiente', '2025-09-10'))
+    
+    cursor.execute("INSERT OR IGNORE INTO parts (part_number, part_name) VALUES (?, ?)",
+                    ('NP-010-F', 'Filtro de aire'))
+    cursor.execute("INSERT OR IGNORE INTO parts (part_number, part_name) VALUES (?, ?)",
+                    ('NP-011-B', 'Balatas delanteras'))
+    
+    ot_id_result = cursor.execute("SELECT id FROM ots WHERE ot_number = 'OT-001'").fetchone()
+    if ot_id_result:
+        ot_id = ot_id_result[0]
+        part_id_1_result = cursor.execute("SELECT id FROM parts WHERE part_number = 'NP-010-F'").fetchone()
+        part_id_2_result = cursor.execute("SELECT id FROM parts WHERE part_number = 'NP-011-B'").fetchone()
+
+        if part_id_1_result:
+            part_id_1 = part_id_1_result[0]
+            cursor.execute("INSERT OR IGNORE INTO ot_parts (ot_id, part_id, quantity, status) VALUES (?, ?, ?, ?)",
+                            (ot_id, part_id_1, 2, 'Pedida'))
+        if part_id_2_result:
+            part_id_2 = part_id_2_result[0]
+            cursor.execute("INSERT OR IGNORE INTO ot_parts (ot_id, part_id, quantity, status) VALUES (?, ?, ?, ?)",
+                            (ot_id, part_id_2, 1, 'Pendiente'))
+
+def migration_002_indexes(cursor):
+    setup_indexes(cursor)
+
+def migration_003_ot_search(cursor):
+    setup_ot_search_index(cursor)
+
+def migration_004_parts_search(cursor):
+    setup_parts_search_index(cursor)
+
+def migration_005_parts_counters(cursor):
+    # El trigger anterior reindexaba la OT con cualquier cambio, incluidos
+    # los contadores; se recrea limitado a las columnas indexadas
+    cursor.execute("DROP TRIGGER IF EXISTS ots_fts_au")
+    setup_ot_search_index(cursor)
+    setup_parts_counters(cursor)
+    cursor.execute("""
+        UPDATE ots SET
+            parts_count = (SELECT COUNT(*) FROM ot_parts WHERE ot_id = ots.id),
+            pending_parts_count = (SELECT COUNT(*) FROM ot_parts
+                                   WHERE ot_id = ots.id AND status IS NOT NULL
+                                         AND status <> 'Entregada')
+    """)
+    setup_indexes(cursor)
+
+def migration_006_change_counters(cursor):
+    setup_change_counters(cursor)
+
+def migration_007_pending_parts_index(cursor):
+    setup_indexes(cursor)
+
+def migration_008_part_usage_index(cursor):
+    setup_indexes(cursor)
+
+def migration_009_vehicle_lookup_indexes(cursor):
+    setup_indexes(cursor)
+
+def migration_010_advisor_sort_indexes(cursor):
+    setup_indexes(cursor)
+
+MIGRATIONS = (
+    migration_001_base_schema,
+    migration_002_indexes,
+    migration_003_ot_search,
+    migration_004_parts_search,
+    migration_005_parts_counters,
+    migration_006_change_counters,
+    migration_007_pending_parts_index,
+    migration_008_part_usage_index,
+    migration_009_vehicle_lookup_indexes,
+    migration_010_advisor_sort_indexes,
+)
+
+SCHEMA_VERSION = len(MIGRATIONS)
+
+# ----------------------------------------------------------------------
+# --- ÍNDICES ---
+# ----------------------------------------------------------------------
+
+# Índices secundarios que mantiene la aplicación: (nombre, tabla, columnas),
+# con una condición opcional al final para los índices parciales. Una columna
+# puede llevar su intercalación ("owner_name COLLATE NOCASE").
+MANAGED_INDEXES = (
+    # Filtro por asesor de la lista de OTs, combinado con el orden elegido
+    ("idx_ots_advisor_date", "ots", ("sales_advisor", "request_date")),
+    ("idx_ots_advisor_status", "ots", ("sales_advisor", "status")),
+    ("idx_ots_advisor_ot_number", "ots", ("sales_advisor", "ot_number")),
+    ("idx_ots_advisor_parts_count", "ots", ("sales_advisor", "parts_count")),
+    # Orden por asesor y filtro por asesor sin otro orden: las páginas van por
+    # (sales_advisor, id), y el id es el sufijo implícito (rowid) del índice
+    ("idx_ots_sales_advisor", "ots", ("sales_advisor",)),
+    # Orden de la lista de OTs sin filtro
+    ("idx_ots_request_date", "ots", ("request_date",)),
+    ("idx_ots_status", "ots", ("status",)),
+    ("idx_ots_parts_count", "ots", ("parts_count",)),
+    # Unión de OTs con vehículos y búsqueda por VIN
+    ("idx_ots_vin", "ots", ("vin",)),
+    # Dónde se usa una parte y cuánto falta entregar de ella, sin leer la
+    # tabla; también acelera la validación de la llave foránea al borrar partes
+    ("idx_ot_parts_part_status", "ot_parts", ("part_id", "status", "ot_id", "quantity")),
+    # Partes pendientes de entrega: solo indexa las filas no entregadas, que
+    # son una fracción pequeña del historial, e incluye la cantidad para no
+    # leer la tabla. Las consultas deben repetir la condición tal cual para
+    # que SQLite lo use.
+    ("idx_ot_parts_pending", "ot_parts", ("ot_id", "quantity"), "status <> 'Entregada'"),
+    # Búsqueda de vehículos por prefijo de propietario, teléfono o correo (el
+    # VIN usa la llave primaria). Sin distinguir mayúsculas: las consultas
+    # deben comparar con COLLATE NOCASE para que SQLite los use.
+    ("idx_vins_owner_name", "vins", ("owner_name COLLATE NOCASE",)),
+    ("idx_vins_owner_phone", "vins", ("owner_phone",)),
+    ("idx_vins_owner_email", "vins", ("owner_email COLLATE NOCASE",)),
+)
+
+# Índices de versiones anteriores que ya cubre otro índice
+RETIRED_INDEXES = (
+    "idx_ot_parts_part_id",  # prefijo de idx_ot_parts_part_status
+)
+
+# Consultas representativas y el índice que debe usar cada una
+EXPECTED_QUERY_PLANS = (
+    ("filtro por asesor", "SELECT id FROM ots WHERE sales_advisor = ? ORDER BY request_date",
+     ("",), "idx_ots_advisor_date"),
+    ("filtro por estatus", "SELECT id FROM ots WHERE status = ?", ("",), "idx_ots_status"),
+    ("orden por asesor", "SELECT id FROM ots WHERE (sales_advisor, id) > (?, ?) ORDER BY sales_advisor, id",
+     ("", 0), "idx_ots_sales_advisor"),
+    ("orden por asesor descendente",
+     "SELECT id FROM ots WHERE (sales_advisor, id) < (?, ?) ORDER BY sales_advisor DESC, id DESC",
+     ("", 0), "idx_ots_sales_advisor"),
+    ("filtro por asesor sin orden", "SELECT id FROM ots WHERE sales_advisor = ? AND id > ? ORDER BY id",
+     ("", 0), "idx_ots_sales_advisor"),
+    ("filtro por asesor y orden por OT",
+     "SELECT id FROM ots WHERE sales_advisor = ? AND (ot_number, id) > (?, ?) ORDER BY ot_number, id",
+     ("", "", 0), "idx_ots_advisor_ot_number"),
+    ("filtro por asesor y orden por piezas",
+     "SELECT id FROM ots WHERE sales_advisor = ? AND (parts_count, id) > (?, ?) ORDER BY parts_count, id",
+     ("", 0, 0), "idx_ots_advisor_parts_count"),
+    ("orden por fecha", "SELECT id FROM ots ORDER BY request_date", (), "idx_ots_request_date"),
+    ("OTs de un VIN", "SELECT o.id FROM vins AS v JOIN ots AS o ON o.vin = v.vin WHERE v.vin = ?",
+     ("",), "idx_ots_vin"),
+    ("dónde se usa una parte", "SELECT ot_id FROM ot_parts WHERE part_id = ?", (0,), "idx_ot_parts_part_status"),
+    ("cantidad pendiente de una parte",
+     "SELECT SUM(quantity) FROM ot_parts WHERE part_id = ? AND status <> 'Entregada'", (0,),
+     "idx_ot_parts_part_status"),
+    ("partes pendientes", "SELECT ot_id, COUNT(*) FROM ot_parts WHERE status <> 'Entregada' GROUP BY ot_id",
+     (), "idx_ot_parts_pending"),
+    ("vehículos por propietario",
+     "SELECT vin FROM vins WHERE owner_name COLLATE NOCASE >= ? AND owner_name COLLATE NOCASE < ? "
+     "ORDER BY owner_name COLLATE NOCASE", ("", ""), "idx_vins_owner_name"),
+    ("vehículos por teléfono",
+     "SELECT vin FROM vins WHERE owner_phone >= ? AND owner_phone < ? ORDER BY owner_phone",
+     ("", ""), "idx_vins_owner_phone"),
+    ("vehículos por correo",
+     "SELECT vin FROM vins WHERE owner_email COLLATE NOCASE >= ? AND owner_email COLLATE NOCASE < ? "
+     "ORDER BY owner_email COLLATE NOCASE", ("", ""), "idx_vins_owner_email"),
+)
+
+def _index_columns_exist(cursor, table, columns):
+    existing = {row[1] for row in cursor.execute(f"PRAGMA table_info({table})")}
+    return existing.issuperset(column.split()[0] for column in columns)
+
+def setup_indexes(cursor):
+    for name, table, columns, *where in MANAGED_INDEXES:
+        # Las migraciones viejas llaman a esta función antes de que existan
+        # columnas agregadas después; esos índices los crea la migración que
+        # agrega la columna
+        if not _index_columns_exist(cursor, table, columns):
+            continue
+        where_clause = f" WHERE {where[0]}" if where else ""
+        cursor.execute(f"CREATE INDEX IF NOT EXISTS {name} ON {table}({', '.join(columns)}){where_clause}")
+    for name in RETIRED_INDEXES:
+        cursor.execute(f"DROP INDEX IF EXISTS {name}")
+
+def check_query_plans(cursor):
+    """Devuelve la lista de consultas cuyo plan no usa el índice esperado.
+
+    Revisa `EXPECTED_QUERY_PLANS` y los reportes que declaran su índice.
+    """
+    problems = []
+    report_plans = [(f"reporte {name}", report["query"], (), report["index"])
+                    for name, report in REPORTS.items() if "index" in report]
+    # Índices cuya columna todavía no existe (esquema a medio migrar)
+    not_yet = {name for name, table, columns, *where in MANAGED_INDEXES
+               if not _index_columns_exist(cursor, table, columns)}
+    for description, query, params, index_name in (*EXPECTED_QUERY_PLANS, *report_plans):
+        if index_name in not_yet:
+            continue
+        plan = cursor.execute(f"EXPLAIN QUERY PLAN {query}", params).fetchall()
+        details = " | ".join(row[-1] for row in plan)
+        if index_name not in details:
+            problems.append(f"{description}: se esperaba {index_name}, plan: {details}")
+    return problems
+
+# Columnas del índice de texto completo de OTs (en el orden de la vista fuente)
+OT_SEARCH_COLUMNS = ("ot_number", "sales_advisor", "request_date", "status",
+                     "insurance", "vin", "owner_name", "model")
+
+def setup_ot_search_index(cursor):
+    """Crea el índice FTS5 de búsqueda de OTs y los triggers que lo mantienen.
+
+    Es un índice de contenido externo: el texto vive en `ots` y `vins` (a través
+    de la vista `ots_search_source`) y el índice solo guarda los términos. Los
+    triggers sobre `ots` y `vins` lo actualizan en cada cambio; para borrar una
+    entrada, FTS5 necesita los valores exactos que se indexaron.
+    """
+    columns = ", ".join(OT_SEARCH_COLUMNS)
+    exists = cursor.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'ots_fts'"
+    ).fetchone()
+
+    cursor.execute("""
+        CREATE VIEW IF NOT EXISTS ots_search_source AS
+        SELECT o.id AS id, o.ot_number, o.sales_advisor, o.request_date, o.status,
+               v.insurance, o.vin, v.owner_name, v.model
+        FROM ots AS o
+        LEFT JOIN vins AS v ON v.vin = o.vin
+    """)
+    cursor.execute(f"""
+        CREATE VIRTUAL TABLE IF NOT EXISTS ots_fts USING fts5(
+            {columns},
+            content='ots_search_source', content_rowid='id',
+            tokenize='unicode61 remove_diacritics 2'
+        )
+    """)
+
+    # Borra la entrada de la OT `old` con los valores que se indexaron
+    delete_old = f"""
+        INSERT INTO ots_fts(ots_fts, rowid, {columns})
+        SELECT 'delete', old.id, old.ot_number, old.sales_advisor, old.request_date, old.status,
+               v.insurance, old.vin, v.owner_name, v.model
+        FROM (SELECT 1) LEFT JOIN vins AS v ON v.vin = old.vin
+    """
+    insert_from_source = f"INSERT INTO ots_fts(rowid, {columns}) SELECT id, {columns} FROM ots_search_source"
+
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS ots_fts_ai AFTER INSERT ON ots BEGIN
+            {insert_from_source} WHERE id = new.id;
+        END
+    """)
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS ots_fts_ad AFTER DELETE ON ots BEGIN
+            {delete_old};
+        END
+    """)
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS ots_fts_au
+        AFTER UPDATE OF ot_number, sales_advisor, request_date, status, vin ON ots BEGIN
+            {delete_old};
+            {insert_from_source} WHERE id = new.id;
+        END
+    """)
+
+    # Cambios en vins: se reindexan las OTs del vehículo afectado
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS vins_fts_ai AFTER INSERT ON vins BEGIN
+            INSERT INTO ots_fts(ots_fts, rowid, {columns})
+            SELECT 'delete', o.id, o.ot_number, o.sales_advisor, o.request_date, o.status,
+                   NULL, o.vin, NULL, NULL
+            FROM ots AS o WHERE o.vin = new.vin;
+            {insert_from_source} WHERE vin = new.vin;
+        END
+    """)
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS vins_fts_au AFTER UPDATE ON vins BEGIN
+            INSERT INTO ots_fts(ots_fts, rowid, {columns})
+            SELECT 'delete', o.id, o.ot_number, o.sales_advisor, o.request_date, o.status,
+                   old.insurance, o.vin, old.owner_name, old.model
+            FROM ots AS o WHERE o.vin = old.vin;
+            INSERT INTO ots_fts(ots_fts, rowid, {columns})
+            SELECT 'delete', o.id, o.ot_number, o.sales_advisor, o.request_date, o.status,
+                   NULL, o.vin, NULL, NULL
+            FROM ots AS o WHERE o.vin = new.vin AND new.vin IS NOT old.vin;
+            {insert_from_source} WHERE vin = old.vin OR vin = new.vin;
+        END
+    """)
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS vins_fts_ad AFTER DELETE ON vins BEGIN
+            INSERT INTO ots_fts(ots_fts, rowid, {columns})
+            SELECT 'delete', o.id, o.ot_number, o.sales_advisor, o.request_date, o.status,
+                   old.insurance, o.vin, old.owner_name, old.model
+            FROM ots AS o WHERE o.vin = old.vin;
+            {insert_from_source} WHERE vin = old.vin;
+        END
+    """)
+
+    if not exists:
+        # Índice nuevo sobre una base con datos: se llena desde la vista fuente
+        cursor.execute("INSERT INTO ots_fts(ots_fts) VALUES('rebuild')")
+
+def setup_parts_counters(cursor):
+    """Agrega a `ots` el número de partes y de partes pendientes de la OT.
+
+    Los triggers sobre `ot_parts` mantienen ambos contadores exactos, así la
+    lista de OTs no necesita contar partes en cada consulta. Una parte está
+    pendiente si `status IS NOT NULL AND status <> 'Entregada'`; una parte
+    sin estatus no cuenta.
+    """
+    add_column_if_missing(cursor, "ots", "parts_count", "INTEGER NOT NULL DEFAULT 0")
+    add_column_if_missing(cursor, "ots", "pending_parts_count", "INTEGER NOT NULL DEFAULT 0")
+
+    add_new = """
+        UPDATE ots SET parts_count = parts_count + 1,
+                       pending_parts_count = pending_parts_count
+                           + (new.status IS NOT NULL AND new.status <> 'Entregada')
+        WHERE id = new.ot_id
+    """
+    remove_old = """
+        UPDATE ots SET parts_count = parts_count - 1,
+                       pending_parts_count = pending_parts_count
+                           - (old.status IS NOT NULL AND old.status <> 'Entregada')
+        WHERE id = old.ot_id
+    """
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS ot_parts_count_ai AFTER INSERT ON ot_parts BEGIN
+            {add_new};
+        END
+    """)
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS ot_parts_count_ad AFTER DELETE ON ot_parts BEGIN
+            {remove_old};
+        END
+    """)
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS ot_parts_count_au AFTER UPDATE OF ot_id, status ON ot_parts BEGIN
+            {remove_old};
+            {add_new};
+        END
+    """)
+
+def setup_change_counters(cursor):
+    """Crea `change_counters`: un contador por tabla que sube con cada cambio.
+
+    Los mantienen triggers, así cuentan también lo que escriben otros
+    equipos, empresa-cli o cualquier otro programa. Junto con
+    `PRAGMA data_version` permiten saber qué tablas cambiaron sin consultarlas
+    (ver `ChangeDetector`). Los cambios en `ot_parts` suben también el de
+    `ots` a través de los triggers de contadores de partes.
+    """
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS change_counters (
+            table_name TEXT PRIMARY KEY,
+            version INTEGER NOT NULL DEFAULT 0
+        ) WITHOUT ROWID
+    """)
+    for table in CHANGE_TRACKED_TABLES:
+        cursor.execute("INSERT OR IGNORE INTO change_counters (table_name) VALUES (?)", (table,))
+        for suffix, event in (("ai", "INSERT"), ("au", "UPDATE"), ("ad", "DELETE")):
+            cursor.execute(f"""
+                CREATE TRIGGER IF NOT EXISTS {table}_changes_{suffix} AFTER {event} ON {table} BEGIN
+                    UPDATE change_counters SET version = version + 1 WHERE table_name = '{table}';
+                END
+            """)
+
+def setup_parts_search_index(cursor):
+    """Crea el índice de trigramas del catálogo de partes y sus triggers.
+
+    Con `tokenize='trigram'`, FTS5 encuentra cualquier subcadena de 3 o más
+    caracteres de `part_number`/`part_name` sin recorrer la tabla `parts`.
+    """
+    exists = cursor.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'parts_trgm'"
+    ).fetchone()
+
+    cursor.execute("""
+        CREATE VIRTUAL TABLE IF NOT EXISTS parts_trgm USING fts5(
+            part_number, part_name,
+            content='parts', content_rowid='id', tokenize='trigram'
+        )
+    """)
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS parts_trgm_ai AFTER INSERT ON parts BEGIN
+            INSERT INTO parts_trgm(rowid, part_number, part_name)
+            VALUES (new.id, new.part_number, new.part_name);
+        END
+    """)
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS parts_trgm_ad AFTER DELETE ON parts BEGIN
+            INSERT INTO parts_trgm(parts_trgm, rowid, part_number, part_name)
+            VALUES ('delete', old.id, old.part_number, old.part_name);
+        END
+    """)
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS parts_trgm_au AFTER UPDATE ON parts BEGIN
+            INSERT INTO parts_trgm(parts_trgm, rowid, part_number, part_name)
+            VALUES ('delete', old.id, old.part_number, old.part_name);
+            INSERT INTO parts_trgm(rowid, part_number, part_name)
+            VALUES (new.id, new.part_number, new.part_name);
+        END
+    """)
+
+    if not exists:
+        cursor.execute("INSERT INTO parts_trgm(parts_trgm) VALUES('rebuild')")
+
+# Mínimo de caracteres que el índice de trigramas puede buscar como subcadena
+TRIGRAM_MIN_CHARS = 3
+
+def parts_search_query(search_term, limit, order_by="p.part_number",
+                       columns="p.id, p.part_number, p.part_name"):
+    """Consulta (sql, params) de partes que coinciden con `search_term`.
+
+    Desde 3 caracteres se usa el índice de trigramas (subcadena en número o
+    nombre); con menos, solo se busca por prefijo del número de parte sobre su
+    índice único. `order_by` puede ser "rank" para ordenar por relevancia y
+    `limit` -1 para no limitar.
+    """
+    if len(search_term) >= TRIGRAM_MIN_CHARS:
+        phrase = '"' + search_term.replace('"', '""') + '"'
+        return f"""
+            SELECT {columns}
+            FROM parts_trgm JOIN parts AS p ON p.id = parts_trgm.rowid
+            WHERE parts_trgm MATCH ?
+            ORDER BY {order_by}
+            LIMIT ?
+        """, (phrase, limit)
+    prefix = search_term.upper()
+    return f"""
+        SELECT {columns}
+        FROM parts AS p
+        WHERE p.part_number >= ? AND p.part_number < ?
+        ORDER BY p.part_number
+        LIMIT ?
+    """, (prefix, prefix + "\U0010ffff", limit)
+
+# ----------------------------------------------------------------------
+# --- BÚSQUEDA ---
+# ----------------------------------------------------------------------
+
+def text_contains(value, term):
+    """Equivalente en memoria de la búsqueda por trigramas (sin distinguir mayúsculas)."""
+    return value is not None and term.lower() in str(value).lower()
+
+def parts_is_refinement(previous_term, new_term):
+    """True si todo lo que coincide con `new_term` ya coincidía con `previous_term`.
+
+    Es el caso en que el término nuevo contiene al anterior (el usuario siguió
+    escribiendo) y el anterior ya se buscó como subcadena por trigramas; entonces
+    basta filtrar en memoria el resultado ya cargado.
+    """
+    if not previous_term or not new_term or len(previous_term) < TRIGRAM_MIN_CHARS:
+        return False
+    return previous_term.lower() in new_term.lower()
+
+_SEARCH_TOKEN_RE = re.compile(r"[^\W_]+")
+
+def fold_search_text(text):
+    """Minúsculas y sin acentos, como el tokenizador `unicode61 remove_diacritics 2`."""
+    decomposed = unicodedata.normalize("NFKD", str(text))
+    return "".join(c for c in decomposed if not unicodedata.combining(c)).lower()
+
+def search_tokens(text):
+    return _SEARCH_TOKEN_RE.findall(fold_search_text(text))
+
+def fts_prefix_query(search_term):
+    """Convierte 'lau pend' en la consulta FTS5 '"lau"* "pend"*'.
+
+    Cada palabra se busca por prefijo y todas deben aparecer (en cualquier
+    columna). Devuelve None si el término no tiene palabras.
+    """
+    return " ".join(f'"{token}"*' for token in search_tokens(search_term)) or None
+
+def fts_matches(values, search_term):
+    """Equivalente en memoria de `fts_prefix_query` sobre los valores de una fila."""
+    row_tokens = [token for value in values if value is not None for token in search_tokens(value)]
+    return all(any(row_token.startswith(token) for row_token in row_tokens)
+               for token in search_tokens(search_term))
+
+def fts_is_refinement(previous_term, new_term):
+    """True si cada palabra anterior es prefijo de alguna palabra del término nuevo."""
+    previous_tokens = search_tokens(previous_term or "")
+    new_tokens = search_tokens(new_term or "")
+    if not previous_tokens or not new_tokens:
+        return False
+    return all(any(new.startswith(previous) for new in new_tokens) for previous in previous_tokens)
+
+# ----------------------------------------------------------------------
+# --- LISTA DE OTs ---
+# ----------------------------------------------------------------------
+
+class OTListQuery:
+    """Consultas de la lista de OTs con filtro por asesor, búsqueda y orden.
+
+    Las páginas se leen por clave: cada una continúa desde la clave (valor de
+    orden, id) de la última fila de la anterior, de modo que leer la página
+    1000 cuesta lo mismo que leer la primera.
+    """
+
+    # Expresiones de orden permitidas (cada una tiene índice)
+    SORT_EXPRESSIONS = {
+        "ot_number": "o.ot_number",
+        "sales_advisor": "o.sales_advisor",
+        "parts_count": "o.parts_count",
+        "request_date": "o.request_date",
+        "status": "o.status",
+    }
+
+    SELECT_CLAUSE = """
+        SELECT o.ot_number, o.sales_advisor, o.parts_count,
+               o.request_date, v.insurance, o.status, o.id, {sort_key} AS sort_key,
+               o.vin, v.owner_name, v.model, o.pending_parts_count
+    """
+    FROM_CLAUSE = """
+        FROM ots AS o
+        LEFT JOIN vins AS v ON o.vin = v.vin
+    """
+    # Con búsqueda: aciertos del índice FTS5 con su relevancia (menor = mejor)
+    SEARCH_FROM_CLAUSE = """
+        FROM (SELECT rowid AS id, rank AS score FROM ots_fts WHERE ots_fts MATCH ?) AS hits
+        JOIN ots AS o ON o.id = hits.id
+        LEFT JOIN vins AS v ON o.vin = v.vin
+    """
+    # Posiciones en las filas de SELECT_CLAUSE
+    ID_COLUMN = 6
+    KEY_COLUMN = 7
+    PENDING_PARTS_COLUMN = 11
+    # Columnas indexadas por la búsqueda (OT, asesor, fecha, estado, seguro, VIN, propietario, modelo)
+    SEARCH_COLUMNS = (0, 1, 3, 5, 4, 8, 9, 10)
+
+    # Columnas exportadas: (clave JSON, encabezado CSV)
+    EXPORT_COLUMNS = (
+        ("ot_number", "OT"), ("sales_advisor", "Asesor de Ventas"), ("parts_count", "No. de Piezas"),
+        ("pending_parts_count", "Piezas Pendientes"), ("request_date", "Fecha de Pedido"),
+        ("insurance", "Seguro"), ("status", "Estado"), ("vin", "VIN"),
+        ("owner_name", "Propietario"), ("model", "Modelo"),
+    )
+    EXPORT_SELECT_CLAUSE = """
+        SELECT o.ot_number, o.sales_advisor, o.parts_count, o.pending_parts_count,
+               o.request_date, v.insurance, o.status, o.vin, v.owner_name, v.model
+    """
+
+    def __init__(self, filter_advisor=None, search_term=None, sort_key=None, descending=False,
+                 selected_only=False):
+        self.filter_advisor = filter_advisor
+        self.search_term = search_term
+        self.sort_key = sort_key
+        self.descending = descending
+        # Solo las OTs cargadas con `load_selected_ots` en la misma conexión
+        self.selected_only = selected_only
+
+    def row_key(self, row):
+        return row[self.KEY_COLUMN], row[self.ID_COLUMN]
+
+    def matches(self, row, search_term):
+        """Equivalente en memoria de la búsqueda, para refinar un resultado ya leído."""
+        return fts_matches([row[column] for column in self.SEARCH_COLUMNS], search_term)
+
+    def page_queries(self, after=None):
+        """Consultas (sql, params) que leen la página siguiente a la clave `after`.
+
+        Cada consulta termina en "LIMIT ?": el límite se agrega al ejecutarlas
+        con `run_page_queries`.
+        """
+        from_clause, from_params = self._from_clause()
+        where_clauses, where_params = self._where_clause()
+        sort_expression = self._sort_expression()
+        select_clause = self.SELECT_CLAUSE.format(sort_key=sort_expression or "NULL")
+
+        queries = []
+        for condition, keyset_params in self._keyset_segments(sort_expression, after):
+            clauses = where_clauses + ([condition] if condition else [])
+            query = select_clause + from_clause
+            if clauses:
+                query += " WHERE " + " AND ".join(clauses)
+            query += self._order_by(sort_expression) + " LIMIT ?"
+            queries.append((query, from_params + where_params + keyset_params))
+        return queries
+
+    @staticmethod
+    def run_page_queries(conn, queries, page_size):
+        """Ejecuta los segmentos de `page_queries` hasta completar una página."""
+        cursor = conn.cursor()
+        rows = []
+        for query, params in queries:
+            cursor.execute(query, params + [page_size - len(rows)])
+            rows.extend(cursor.fetchall())
+            if len(rows) >= page_size:
+                break
+        return rows
+
+    def export_query(self):
+        """Consulta completa, sin paginar, con el filtro, la búsqueda y el orden actuales."""
+        from_clause, from_params = self._from_clause()
+        where_clauses, where_params = self._where_clause()
+        query = self.EXPORT_SELECT_CLAUSE + from_clause
+        if where_clauses:
+            query += " WHERE " + " AND ".join(where_clauses)
+        # ORDER BY deja los NULL en el mismo lugar que la paginación por segmentos
+        query += self._order_by(self._sort_expression())
+        return query, from_params + where_params
+
+    def _where_clause(self):
+        where_clauses = []
+        params = []
+
+        # Filtro por asesor
+        if self.filter_advisor:
+            where_clauses.append("o.sales_advisor = ?")
+            params.append(self.filter_advisor)
+
+        if self.selected_only:
+            where_clauses.append("o.id IN (SELECT id FROM temp.selected_ots)")
+
+        return where_clauses, params
+
+    def _from_clause(self):
+        """Origen de la consulta. Con búsqueda, se parte de los aciertos del índice FTS5."""
+        match_query = fts_prefix_query(self.search_term) if self.search_term else None
+        if match_query is None:
+            return self.FROM_CLAUSE, []
+        return self.SEARCH_FROM_CLAUSE, [match_query]
+
+    def _sort_expression(self):
+        """Expresión de orden: la columna elegida, la relevancia al buscar, o None (por id)."""
+        if self.sort_key is not None:
+            return self.SORT_EXPRESSIONS[self.sort_key]
+        if self.search_term and fts_prefix_query(self.search_term):
+            return "hits.score"
+        return None
+
+    def _descending(self):
+        return self.sort_key is not None and self.descending
+
+    def _order_by(self, sort_expression):
+        if sort_expression is None:
+            return " ORDER BY o.id"
+        direction = "DESC" if self._descending() else "ASC"
+        return f" ORDER BY {sort_expression} {direction}, o.id {direction}"
+
+    def _keyset_segments(self, sort_expression, after):
+        """Condiciones, en orden, que cubren las filas posteriores a la clave `after`.
+
+        Las comparaciones de fila `(col, id) > (?, ?)` usan el índice de la
+        columna, pero descartan los NULL; por eso los NULL (primeros en orden
+        ascendente, últimos en descendente) se leen en un segmento aparte.
+        """
+        if after is None:
+            return [(None, [])]
+        value, last_id = after
+        if sort_expression is None:
+            return [("o.id > ?", [last_id])]
+
+        column = sort_expression
+        if self._descending():
+            if value is None:
+                return [(f"{column} IS NULL AND o.id < ?", [last_id])]
+            return [(f"({column}, o.id) < (?, ?)", [value, last_id]),
+                    (f"{column} IS NULL", [])]
+        if value is None:
+            return [(f"{column} IS NULL AND o.id > ?", [last_id]),
+                    (f"{column} IS NOT NULL", [])]
+        return [(f"({column}, o.id) > (?, ?)", [value, last_id])]
+
+# ----------------------------------------------------------------------
+# --- OPERACIONES ---
+# ----------------------------------------------------------------------
+# Las funciones de lectura aceptan `conn` para correr en la conexión que
+# indique quien llama (p. ej. la de un hilo de consultas en segundo plano).
+# Las de escritura se ejecutan en el hilo escritor y devuelven un Future.
+
+# Estatus de OTs y de partes asignadas, en el orden en que avanzan. Una
+# parte está pendiente mientras no esté entregada (ver los triggers de
+# contadores, que comparan contra el mismo texto).
+STATUS_PENDING = "Pendiente"
+STATUS_ORDERED = "Pedida"
+STATUS_DELIVERED = "Entregada"
+STATUSES = (STATUS_PENDING, STATUS_ORDERED, STATUS_DELIVERED)
+
+class ValidationError(ValueError):
+    """Datos rechazados por una regla de la aplicación (no por la base de datos)."""
+
+def authenticate(username, password):
+    """Devuelve (nombre completo, rol) del usuario, o None si las credenciales no coinciden."""
+    return get_connection().execute(
+        "SELECT full_name, role FROM users WHERE username = ? AND password = ?", (username, password)
+    ).fetchone()
+
+def create_user(username, password, full_name, role):
+    return submit_write(lambda conn: conn.execute("""
+        INSERT INTO users (username, password, full_name, role)
+        VALUES (?, ?, ?, ?)
+    """, (username, password, full_name, role)).lastrowid)
+
+def list_advisors(conn=None):
+    conn = conn or get_connection()
+    return [row[0] for row in conn.execute("SELECT name FROM advisors ORDER BY name")]
+
+def create_advisor(name):
+    return submit_write(lambda conn: conn.execute("INSERT INTO advisors (name) VALUES (?)", (name,)).lastrowid)
+
+def create_vehicle(vin, model, year, insurance, owner_name, owner_email, owner_phone, sales_advisor):
+    return submit_write(lambda conn: conn.execute("""
+        INSERT INTO vins (vin, model, year, insurance, owner_name, owner_email, owner_phone, sales_advisor)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+    """, (vin, model, year, insurance, owner_name, owner_email, owner_phone, sales_advisor)).lastrowid)
+
+def create_ot(ot_number, sales_advisor, vin, status, request_date):
+    """Registra una OT. El vehículo debe existir; si no, el Future termina con ValidationError."""
+    def insert(conn):
+        if not conn.execute("SELECT 1 FROM vins WHERE vin = ?", (vin,)).fetchone():
+            raise ValidationError("El VIN ingresado no existe en la base de datos de vehículos. "
+                                  "Por favor, regístrelo primero.")
+        return conn.execute("""
+            INSERT INTO ots (ot_number, sales_advisor, vin, status, request_date)
+            VALUES (?, ?, ?, ?, ?)
+        """, (ot_number, sales_advisor, vin, status, request_date)).lastrowid
+    return submit_write(insert)
+
+def get_ot_id(ot_number):
+    result = get_connection().execute("SELECT id FROM ots WHERE ot_number = ?", (ot_number,)).fetchone()
+    return result[0] if result else None
+
+def list_ot_parts(ot_number, conn=None):
+    """Partes de una OT: (número, nombre, cantidad, estatus, id de parte)."""
+    conn = conn or get_connection()
+    return conn.execute("""
+        SELECT p.part_number, p.part_name, op.quantity, op.status, p.id
+        FROM ot_parts AS op
+        JOIN ots AS o ON o.id = op.ot_id
+        JOIN parts AS p ON p.id = op.part_id
+        WHERE o.ot_number = ?
+    """, (ot_number,)).fetchall()
+
+def assign_part(ot_id, part_id, quantity, status):
+    """Asigna una parte a una OT; si ya estaba asignada, reemplaza cantidad y estatus."""
+    return submit_write(lambda conn: conn.execute("""
+        INSERT OR REPLACE INTO ot_parts (ot_id, part_id, quantity, status)
+        VALUES (?, ?, ?, ?)
+    """, (ot_id, part_id, quantity, status)).lastrowid)
+
+def update_ot_part_statuses(ot_id, changes):
+    """Cambia el estatus de varias partes de una OT en una sola transacción.
+
+    `changes` son pares (id de parte, estatus nuevo); el Future da las filas cambiadas.
+    """
+    params = [(status, ot_id, part_id) for part_id, status in changes]
+    return submit_write(lambda conn: conn.executemany("""
+        UPDATE ot_parts
+        SET status = ?
+        WHERE ot_id = ? AND part_id = ?
+    """, params).rowcount)
+
+# --- Historial de vehículos ---
+
+_PHONE_TERM_RE = re.compile(r"[\d\s()+.-]+")
+
+def vehicle_lookup_conditions(search_term):
+    """Búsquedas (sql, params) de VINs que coinciden con `search_term`.
+
+    Cada una recorre un solo índice por rango de prefijo: con "@" se busca el
+    correo; si solo hay dígitos y separadores, el teléfono (sin separadores)
+    y el VIN; si no, el VIN, el propietario y el número de OT exacto.
+    """
+    term = search_term.strip()
+    if not term:
+        return []
+    if "@" in term:
+        return [("SELECT vin FROM vins WHERE owner_email COLLATE NOCASE >= ? AND owner_email COLLATE NOCASE < ? "
+                 "ORDER BY owner_email COLLATE NOCASE", (term, term + "\U0010ffff"))]
+    vin_prefix = term.upper()
+    conditions = [("SELECT vin FROM vins WHERE vin >= ? AND vin < ? ORDER BY vin",
+                   (vin_prefix, vin_prefix + "\U0010ffff"))]
+    if _PHONE_TERM_RE.fullmatch(term):
+        digits = re.sub(r"\D", "", term)
+        conditions.append(("SELECT vin FROM vins WHERE owner_phone >= ? AND owner_phone < ? ORDER BY owner_phone",
+                           (digits, digits + "\U0010ffff")))
+    else:
+        conditions.append(("SELECT vin FROM vins WHERE owner_name COLLATE NOCASE >= ? "
+                           "AND owner_name COLLATE NOCASE < ? ORDER BY owner_name COLLATE NOCASE",
+                           (term, term + "\U0010ffff")))
+        conditions.append(("SELECT vin FROM ots WHERE ot_number = ?", (term,)))
+    return conditions
+
+def find_vehicles(search_term, limit, conn=None):
+    """Vehículos que coinciden con `search_term`, con todo su historial.
+
+    Lee en una sola consulta hasta `limit` vehículos (ordenados por VIN) con
+    sus OTs y las partes de cada una. Devuelve una lista de diccionarios con
+    los datos del vehículo y en "orders" sus OTs, de la más reciente a la más
+    antigua, cada una con sus partes en "parts" como tuplas (número, nombre,
+    cantidad, estatus).
+    """
+    conn = conn or get_connection()
+    conditions = vehicle_lookup_conditions(search_term)
+    if not conditions:
+        return []
+    # Cada búsqueda toma sus primeros `limit` vehículos en el orden de su
+    # índice; así un prefijo corto no junta miles para quedarse con unos pocos
+    matches = " UNION ".join(f"SELECT vin FROM ({sql} LIMIT ?)" for sql, _ in conditions)
+    params = [param for _, condition_params in conditions for param in (*condition_params, limit)]
+    rows = conn.execute(f"""
+        WITH matches(vin) AS (
+            SELECT vin FROM ({matches}) ORDER BY vin LIMIT ?
+        )
+        SELECT v.vin, v.model, v.year, v.insurance, v.owner_name, v.owner_email, v.owner_phone, v.sales_advisor,
+               o.id, o.ot_number, o.sales_advisor, o.status, o.request_date,
+               p.part_number, p.part_name, op.quantity, op.status
+        FROM matches AS m
+        JOIN vins AS v ON v.vin = m.vin
+        LEFT JOIN ots AS o ON o.vin = v.vin
+        LEFT JOIN ot_parts AS op ON op.ot_id = o.id
+        LEFT JOIN parts AS p ON p.id = op.part_id
+        ORDER BY v.vin, o.request_date DESC, o.ot_number, p.part_number
+    """, (*params, limit))
+    vehicle_keys = ("vin", "model", "year", "insurance", "owner_name", "owner_email", "owner_phone",
+                    "sales_advisor")
+    order_keys = ("ot_number", "sales_advisor", "status", "request_date")
+    vehicles = {}
+    orders = {}
+    for row in rows:
+        vehicle = vehicles.get(row[0])
+        if vehicle is None:
+            vehicle = vehicles[row[0]] = dict(zip(vehicle_keys, row[:8]), orders=[])
+        if row[8] is None:
+            continue
+        order = orders.get(row[8])
+        if order is None:
+            order = orders[row[8]] = dict(zip(order_keys, row[9:13]), parts=[])
+            vehicle["orders"].append(order)
+        if row[13] is not None:
+            order["parts"].append(row[13:17])
+    return list(vehicles.values())
+
+# --- Partes pendientes ---
+
+# Antigüedad de las OTs con partes pendientes: (días como máximo, etiqueta)
+PENDING_AGE_BUCKETS = (
+    (7, "Hasta 7 días"),
+    (30, "De 8 a 30 días"),
+    (90, "De 31 a 90 días"),
+    (None, "Más de 90 días"),
+)
+
+PENDING_UNDATED = "Sin fecha válida"
+
+def pending_age_bucket(age_days):
+    """Etiqueta de PENDING_AGE_BUCKETS para una antigüedad en días (None: PENDING_UNDATED)."""
+    if age_days is None:
+        return PENDING_UNDATED
+    for limit, label in PENDING_AGE_BUCKETS:
+        if limit is None or age_days <= limit:
+            return label
+
+# Grupo de las OTs sin asesor en la vista de partes pendientes
+NO_ADVISOR = "(sin asesor)"
+
+def list_pending_parts(conn=None):
+    """OTs con partes sin entregar, agrupables por asesor y antigüedad.
+
+    Filas (asesor, OT, fecha de pedido, días de antigüedad, partes pendientes,
+    cantidad pendiente), por asesor y de la más antigua a la más reciente.
+    Solo recorre `idx_ot_parts_pending`, así que el costo depende de lo
+    pendiente y no del historial entregado. Las OTs sin asesor aparecen como
+    `NO_ADVISOR`.
+    """
+    conn = conn or get_connection()
+    return conn.execute("""
+        SELECT COALESCE(o.sales_advisor, ?), o.ot_number, o.request_date,
+               CAST(julianday('now', 'localtime') - julianday(o.request_date) AS INTEGER),
+               pending.parts, pending.quantity
+        FROM (SELECT ot_id, COUNT(*) AS parts, SUM(quantity) AS quantity
+              FROM ot_parts
+              WHERE status <> 'Entregada'
+              GROUP BY ot_id) AS pending
+        JOIN ots AS o ON o.id = pending.ot_id
+        ORDER BY o.sales_advisor, o.request_date, o.ot_number
+    """, (NO_ADVISOR,)).fetchall()
+
+# --- Operaciones sobre varias OTs ---
+# Las OTs elegidas se cargan en una tabla temporal de la conexión y cada
+# operación es una sola sentencia sobre ella, sin importar cuántas sean.
+
+def load_selected_ots(conn, ot_ids):
+    """Deja `ot_ids` en la tabla temporal `selected_ots` de `conn`."""
+    conn.execute("CREATE TEMP TABLE IF NOT EXISTS selected_ots (id INTEGER PRIMARY KEY)")
+    in_transaction = conn.in_transaction
+    conn.execute("DELETE FROM temp.selected_ots")
+    conn.executemany("INSERT OR IGNORE INTO temp.selected_ots (id) VALUES (?)",
+                     ((ot_id,) for ot_id in ot_ids))
+    if not in_transaction:
+        # Solo cambió la base temporal, pero en una conexión de lectura no
+        # debe quedar abierta la transacción implícita
+        conn.commit()
+
+def update_ots_status(ot_ids, status):
+    """Cambia el estatus de varias OTs; el Future da las filas cambiadas."""
+    ot_ids = list(ot_ids)
+    def update(conn):
+        if status not in STATUSES:
+            raise ValidationError(f"Estatus desconocido: {status}")
+        load_selected_ots(conn, ot_ids)
+        return conn.execute("UPDATE ots SET status = ? WHERE id IN (SELECT id FROM temp.selected_ots)",
+                            (status,)).rowcount
+    return submit_write(update)
+
+def reassign_ots(ot_ids, sales_advisor):
+    """Asigna varias OTs a otro asesor; el Future da las filas cambiadas."""
+    ot_ids = list(ot_ids)
+    def update(conn):
+        if not conn.execute("SELECT 1 FROM advisors WHERE name = ?", (sales_advisor,)).fetchone():
+            raise ValidationError(f"El asesor '{sales_advisor}' no está registrado.")
+        load_selected_ots(conn, ot_ids)
+        return conn.execute("UPDATE ots SET sales_advisor = ? WHERE id IN (SELECT id FROM temp.selected_ots)",
+                            (sales_advisor,)).rowcount
+    return submit_write(update)
+
+def list_work_orders(ot_ids, conn=None):
+    """Datos para imprimir órdenes de trabajo, leídos con una sola consulta.
+
+    Devuelve una lista de diccionarios (uno por OT, ordenados por número) con
+    los datos de la OT y del vehículo, y en "parts" las tuplas (número,
+    nombre, cantidad, estatus) de sus partes.
+    """
+    conn = conn or get_connection()
+    load_selected_ots(conn, ot_ids)
+    rows = conn.execute("""
+        SELECT o.id, o.ot_number, o.sales_advisor, o.status, o.request_date, o.vin,
+               v.model, v.year, v.insurance, v.owner_name, v.owner_phone, v.owner_email,
+               p.part_number, p.part_name, op.quantity, op.status
+        FROM temp.selected_ots AS s
+        JOIN ots AS o ON o.id = s.id
+        LEFT JOIN vins AS v ON v.vin = o.vin
+        LEFT JOIN ot_parts AS op ON op.ot_id = o.id
+        LEFT JOIN parts AS p ON p.id = op.part_id
+        ORDER BY o.ot_number, p.part_number
+    """)
+    keys = ("ot_number", "sales_advisor", "status", "request_date", "vin", "model", "year",
+            "insurance", "owner_name", "owner_phone", "owner_email")
+    orders = {}
+    for row in rows:
+        order = orders.get(row[0])
+        if order is None:
+            order = orders[row[0]] = dict(zip(keys, row[1:12]), parts=[])
+        if row[12] is not None:
+            order["parts"].append(row[12:16])
+    return list(orders.values())
+
+def create_part(part_number, part_name):
+    return submit_write(lambda conn: conn.execute(
+        "INSERT INTO parts (part_number, part_name) VALUES (?, ?)", (part_number, part_name)
+    ).lastrowid)
+
+def find_part_id(part_number):
+    result = get_connection().execute(
+        "SELECT id FROM parts WHERE part_number = ?", (part_number.upper(),)
+    ).fetchone()
+    return result[0] if result else None
+
+# Cantidad de una parte (p) que falta entregar en todas las OTs; se resuelve
+# dentro de idx_ot_parts_part_status
+PART_OUTSTANDING_QUANTITY = """
+    (SELECT COALESCE(SUM(op.quantity), 0) FROM ot_parts AS op
+     WHERE op.part_id = p.id AND op.status <> 'Entregada')
+"""
+
+def list_parts(search_term=None, limit=-1, order_by="p.part_number", conn=None, with_outstanding=False):
+    """Partes (id, número, nombre) que coinciden con `search_term`, o todo el catálogo.
+
+    Con `with_outstanding`, cada fila lleva al final la cantidad pendiente de entregar.
+    """
+    conn = conn or get_connection()
+    columns = "p.id, p.part_number, p.part_name"
+    if with_outstanding:
+        columns += ", " + PART_OUTSTANDING_QUANTITY
+    if search_term:
+        query, params = parts_search_query(search_term, limit, order_by=order_by, columns=columns)
+    else:
+        query = f"SELECT {columns} FROM parts AS p ORDER BY p.part_number LIMIT ?"
+        params = (limit,)
+    return conn.execute(query, params).fetchall()
+
+def list_part_usage(part_id, conn=None):
+    """OTs que usan una parte: (OT, asesor, fecha de pedido, cantidad, estatus).
+
+    Primero las pendientes de entrega, de la más antigua a la más reciente.
+    """
+    conn = conn or get_connection()
+    return conn.execute("""
+        SELECT o.ot_number, o.sales_advisor, o.request_date, op.quantity, op.status
+        FROM ot_parts AS op
+        JOIN ots AS o ON o.id = op.ot_id
+        WHERE op.part_id = ?
+        ORDER BY IFNULL(op.status <> 'Entregada', 0) DESC, o.request_date, o.ot_number
+    """, (part_id,)).fetchall()
+
+# --- Datos de referencia ---
+
+class ReferenceCache:
+    """Datos de consulta frecuente guardados en memoria mientras no cambien sus tablas.
+
+    Cada entrada recuerda `table_versions` de sus tablas al cargarse; si
+    alguna cambió (escritura de este proceso o cambio visto por
+    `ChangeDetector`), se vuelve a leer en el siguiente uso.
+    """
+
+    def __init__(self):
+        self._entries = {}  # nombre -> (versiones, valor)
+        self._lock = threading.Lock()
+
+    def get(self, name, tables, load):
+        """Valor de `name`; si sus tablas cambiaron, lo vuelve a obtener con `load()`."""
+        versions = table_versions(tables)
+        with self._lock:
+            entry = self._entries.get(name)
+            if entry is not None and entry[0] == versions:
+                return entry[1]
+        # Las versiones se leyeron antes de cargar: si alguien escribe
+        # mientras tanto, la siguiente llamada vuelve a leer
+        value = load()
+        with self._lock:
+            self._entries[name] = (versions, value)
+        return value
+
+    def get_or_load(self, name, tables, key, load):
+        """Valor de `key` en la entrada `name`, un dict que se llena por clave.
+
+        Si la clave falta (o las tablas cambiaron), lo obtiene con `load(key)`
+        fuera del candado y lo guarda dentro. Un resultado None no se guarda:
+        lo que no existía se vuelve a buscar en la siguiente llamada.
+        """
+        versions = table_versions(tables)
+        with self._lock:
+            entry = self._entries.get(name)
+            if entry is not None and entry[0] == versions and key in entry[1]:
+                return entry[1][key]
+        value = load(key)
+        if value is None:
+            return value
+        with self._lock:
+            entry = self._entries.get(name)
+            if entry is None or entry[0] != versions:
+                # Si las tablas cambiaron mientras se leía, el valor ya no se guarda
+                if table_versions(tables) != versions:
+                    return value
+                entry = self._entries[name] = (versions, {})
+            entry[1][key] = value
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+reference_cache = ReferenceCache()
+
+def cached_advisors():
+    """Nombres de los asesores, ordenados (tupla en memoria; ver `ReferenceCache`)."""
+    return reference_cache.get("advisors", ("advisors",), lambda: tuple(list_advisors()))
+
+def cached_part_id(part_number):
+    """Como `find_part_id`, pero recuerda cada número encontrado hasta que cambie `parts`."""
+    return reference_cache.get_or_load("part_ids", ("parts",), part_number.upper(), find_part_id)
+
+# ----------------------------------------------------------------------
+# --- IMPORTACIÓN MASIVA ---
+# ----------------------------------------------------------------------
+
+# Filas por transacción al importar
+IMPORT_CHUNK_SIZE = 5000
+
+# Tablas que se pueden importar. Los encabezados del archivo deben coincidir
+# con `columns` (sin distinguir mayúsculas); `key` decide qué es un duplicado
+# y `references` qué valores deben existir ya en otra tabla.
+IMPORT_TARGETS = {
+    "vins": {
+        "label": "Vehículos",
+        "columns": ("vin", "model", "year", "insurance", "owner_name", "owner_email",
+                    "owner_phone", "sales_advisor"),
+        "required": ("vin", "model", "year", "owner_name", "sales_advisor"),
+        "key": "vin",
+        "upper": ("vin",),
+    },
+    "ots": {
+        "label": "Órdenes de Trabajo",
+        "columns": ("ot_number", "sales_advisor", "vin", "status", "request_date"),
+        "required": ("ot_number", "sales_advisor", "vin", "request_date"),
+        "key": "ot_number",
+        "upper": ("vin",),
+        "defaults": {"status": STATUS_PENDING},
+        "choices": {"status": STATUSES},
+        "references": {"vin": ("vins", "vin")},
+    },
+    "parts": {
+        "label": "Partes (Inventario)",
+        "columns": ("part_number", "part_name"),
+        "required": ("part_number", "part_name"),
+        "key": "part_number",
+        "upper": ("part_number",),
+    },
+}
+
+# Cómo tratar registros cuya llave ya existe
+IMPORT_MODES = {
+    "skip": "Omitir los que ya existen",
+    "upsert": "Actualizar los existentes",
+}
+
+def import_statement(target, mode):
+    spec = IMPORT_TARGETS[target]
+    columns = spec["columns"]
+    insert = f"INSERT INTO {target} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})"
+    if mode == "upsert":
+        # UPSERT en lugar de REPLACE: conserva el id de la fila existente, del
+        # que dependen ot_parts y los índices de búsqueda
+        updates = ", ".join(f"{column} = excluded.{column}" for column in columns if column != spec["key"])
+        return f"{insert} ON CONFLICT({spec['key']}) DO UPDATE SET {updates}"
+    return f"{insert} ON CONFLICT({spec['key']}) DO NOTHING"
+
+def _normalize_header(header):
+    return str(header or "").strip().lower()
+
+@contextmanager
+def _read_csv_rows(path):
+    with open(path, "r", encoding="utf-8-sig", newline="") as f:
+        sample = f.read(4096)
+        f.seek(0)
+        try:
+            dialect = csv.Sniffer().sniff(sample, delimiters=",;\t|")
+        except csv.Error:
+            dialect = csv.excel
+        reader = csv.reader(f, dialect)
+        headers = [_normalize_header(h) for h in next(reader, [])]
+
+        def records():
+            for row in reader:
+                if not any(value.strip() for value in row):
+                    continue
+                yield reader.line_num, dict(zip(headers, row))
+        yield headers, records()
+
+@contextmanager
+def _read_xlsx_rows(path):
+    # Importación diferida: openpyxl es opcional y tarda en cargar
+    try:
+        import openpyxl
+    except ImportError:
+        raise ValueError("Para importar archivos .xlsx instale openpyxl (pip install openpyxl).")
+    workbook = openpyxl.load_workbook(path, read_only=True, data_only=True)
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        headers = [_normalize_header(h) for h in next(rows, ())]
+
+        def records():
+            for row_no, row in enumerate(rows, start=2):
+                if all(value is None for value in row):
+                    continue
+                yield row_no, dict(zip(headers, row))
+        yield headers, records()
+    finally:
+        workbook.close()
+
+def read_import_rows(path):
+    """Abre un CSV o XLSX para leerlo con `with`: da (encabezados, iterador de (número de fila, registro)).
+
+    El archivo se cierra al salir del bloque, aunque no se haya recorrido
+    completo (por ejemplo, si faltan columnas).
+    """
+    if path.lower().endswith((".xlsx", ".xlsm")):
+        return _read_xlsx_rows(path)
+    return _read_csv_rows(path)
+
+def _clean_import_value(value):
+    if value is None:
+        return None
+    if isinstance(value, datetime):
+        return value.date().isoformat()
+    if isinstance(value, date):
+        return value.isoformat()
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return str(value).strip() or None
+
+def validate_import_row(target, record):
+    """Devuelve (valores en el orden de `columns`, None) o (None, motivo del rechazo)."""
+    spec = IMPORT_TARGETS[target]
+    values = {}
+    for column in spec["columns"]:
+        value = _clean_import_value(record.get(column))
+        if value is None:
+            value = spec.get("defaults", {}).get(column)
+        if value is not None and column in spec.get("upper", ()):
+            value = value.upper()
+        values[column] = value
+
+    missing = [column for column in spec["required"] if values[column] is None]
+    if missing:
+        return None, f"Faltan datos obligatorios: {', '.join(missing)}"
+    for column, choices in spec.get("choices", {}).items():
+        if values[column] not in choices:
+            return None, f"Valor no válido para {column}: '{values[column]}'"
+    if values.get("year") is not None:
+        try:
+            values["year"] = int(values["year"])
+        except ValueError:
+            return None, f"Año inválido: '{values['year']}'"
+    if values.get("request_date") is not None:
+        try:
+            date.fromisoformat(values["request_date"])
+        except ValueError:
+            return None, f"Fecha inválida (use AAAA-MM-DD): '{values['request_date']}'"
+    return tuple(values[column] for column in spec["columns"]), None
+
+def _write_import_chunk(conn, target, statement, chunk, row_by_row=False):
+    """Escribe un bloque de filas válidas (en el hilo escritor).
+
+    Devuelve (filas cambiadas, rechazos como (fila, registro, motivo)). No
+    escribe los rechazos aquí: si la base está ocupada el bloque se reintenta.
+    Sin `row_by_row`, una fila que viola una restricción hace fallar todo el
+    bloque con IntegrityError (y el hilo escritor lo revierte).
+    """
+    spec = IMPORT_TARGETS[target]
+    columns = spec["columns"]
+    rejected = []
+    for column, (table, ref_column) in spec.get("references", {}).items():
+        position = columns.index(column)
+        wanted = sorted({values[position] for _, _, values in chunk})
+        found = {row[0] for row in conn.execute(
+            f"SELECT {ref_column} FROM {table} WHERE {ref_column} IN (SELECT value FROM json_each(?))",
+            (json.dumps(wanted),))}
+        kept = []
+        for item in chunk:
+            if item[2][position] in found:
+                kept.append(item)
+            else:
+                rejected.append((item[0], item[1], f"{column} '{item[2][position]}' no existe en {table}"))
+        chunk = kept
+
+    if not row_by_row:
+        return conn.executemany(statement, [values for _, _, values in chunk]).rowcount, rejected
+    # Cada sentencia fallida se revierte sola; las demás filas se conservan
+    changed = 0
+    for row_no, record, values in chunk:
+        try:
+            changed += conn.execute(statement, values).rowcount
+        except sqlite3.IntegrityError as e:
+            rejected.append((row_no, record, str(e)))
+    return changed, rejected
+
+def import_file(path, target, mode="skip", progress=None, is_cancelled=None, chunk_size=IMPORT_CHUNK_SIZE):
+    """Importa un CSV o XLSX a la tabla `target` en transacciones de `chunk_size` filas.
+
+    Las filas inválidas se guardan en `<archivo>.rechazos.csv` con el motivo.
+    `progress(filas_leídas)` se llama después de cada bloque; si
+    `is_cancelled()` devuelve True, la importación se detiene y los bloques ya
+    confirmados se conservan. Devuelve un dict con el resumen.
+    """
+    spec = IMPORT_TARGETS[target]
+    with read_import_rows(path) as (headers, records):
+        missing = [column for column in spec["required"]
+                   if column not in headers and column not in spec.get("defaults", {})]
+        if missing:
+            raise ValueError(f"Faltan columnas en el archivo: {', '.join(missing)}")
+
+        statement = import_statement(target, mode)
+        summary = {"read": 0, "written": 0, "duplicates": 0, "rejected": 0,
+                   "rejects_path": None, "cancelled": False}
+        rejects_file = None
+        rejects_writer = None
+
+        def reject(row_no, record, reason):
+            nonlocal rejects_file, rejects_writer
+            if rejects_writer is None:
+                summary["rejects_path"] = os.path.splitext(path)[0] + ".rechazos.csv"
+                rejects_file = open(summary["rejects_path"], "w", encoding="utf-8-sig", newline="")
+                rejects_writer = csv.writer(rejects_file)
+                rejects_writer.writerow(["fila", "motivo", *spec["columns"]])
+            rejects_writer.writerow([row_no, reason, *(record.get(column) for column in spec["columns"])])
+            summary["rejected"] += 1
+
+        def flush(chunk):
+            try:
+                changed, rejected = submit_write(
+                    lambda conn: _write_import_chunk(conn, target, statement, chunk)).result()
+            except sqlite3.IntegrityError:
+                # Alguna fila viola una restricción: se repite el bloque fila por
+                # fila para rechazar solo las que fallan
+                changed, rejected = submit_write(
+                    lambda conn: _write_import_chunk(conn, target, statement, chunk, row_by_row=True)).result()
+            for row_no, record, reason in rejected:
+                reject(row_no, record, reason)
+            summary["written"] += changed
+            if mode == "skip":
+                summary["duplicates"] += len(chunk) - len(rejected) - changed
+            if progress:
+                progress(summary["read"])
+
+        chunk = []
+        try:
+            for row_no, record in records:
+                if is_cancelled and is_cancelled():
+                    summary["cancelled"] = True
+                    break
+                summary["read"] += 1
+                values, error = validate_import_row(target, record)
+                if error:
+                    reject(row_no, record, error)
+                    continue
+                chunk.append((row_no, record, values))
+                if len(chunk) >= chunk_size:
+                    flush(chunk)
+                    chunk = []
+            if chunk and not summary["cancelled"]:
+                flush(chunk)
+        finally:
+            if rejects_file:
+                rejects_file.close()
+        return summary
+
+def format_import_summary(summary):
+    lines = [f"Filas leídas: {summary['read']}", f"Registros escritos: {summary['written']}"]
+    if summary["duplicates"]:
+        lines.append(f"Duplicados omitidos: {summary['duplicates']}")
+    if summary["rejected"]:
+        lines.append(f"Filas rechazadas: {summary['rejected']}")
+        lines.append(f"Detalle en: {summary['rejects_path']}")
+    if summary["cancelled"]:
+        lines.append("")
+        lines.append("Importación cancelada; los bloques ya guardados se conservan.")
+    return "\n".join(lines)
+
+
+# ----------------------------------------------------------------------
+# --- EXPORTACIÓN ---
+# ----------------------------------------------------------------------
+
+# Filas que se leen del cursor en cada lote al exportar
+EXPORT_BATCH_SIZE = 1000
+
+EXPORT_FORMATS = {
+    "csv": "CSV (*.csv)",
+    "jsonl": "JSON Lines (*.jsonl)",
+}
+
+def export_query(query, params, columns, path, fmt="csv", progress=None, is_cancelled=None,
+                 prepare=None):
+    """Escribe el resultado de `query` en un CSV o JSONL leyendo el cursor por lotes.
+
+    `columns` es una lista de (clave JSON, encabezado CSV) en el orden de las
+    columnas de la consulta. En memoria solo hay un lote de
+    `EXPORT_BATCH_SIZE` filas, sin importar el tamaño del resultado. Si se
+    cancela, se borra el archivo incompleto. `prepare(conn)`, si se indica,
+    corre antes en la misma conexión (p. ej. `load_selected_ots`).
+    """
+    conn = get_connection()
+    if prepare:
+        prepare(conn)
+    cursor = conn.execute(query, params)
+    summary = {"rows": 0, "path": path, "cancelled": False}
+    try:
+        # utf-8-sig para que Excel reconozca los acentos del CSV
+        with open(path, "w", encoding="utf-8-sig" if fmt == "csv" else "utf-8", newline="") as f:
+            if fmt == "jsonl":
+                keys = [key for key, _ in columns]
+                encode = json.JSONEncoder(ensure_ascii=False).encode
+                def write_rows(rows):
+                    f.writelines(encode(dict(zip(keys, row))) + "\n" for row in rows)
+            else:
+                writer = csv.writer(f)
+                writer.writerow([header for _, header in columns])
+                write_rows = writer.writerows
+
+            while True:
+                if is_cancelled and is_cancelled():
+                    summary["cancelled"] = True
+                    break
+                rows = cursor.fetchmany(EXPORT_BATCH_SIZE)
+                if not rows:
+                    break
+                write_rows(rows)
+                summary["rows"] += len(rows)
+                if progress:
+                    progress(summary["rows"])
+    finally:
+        cursor.close()
+    if summary["cancelled"]:
+        os.remove(path)
+    return summary
+
+# Exportación de los catálogos: (clave JSON, encabezado CSV)
+PARTS_EXPORT_COLUMNS = (("part_number", "No. de Parte"), ("part_name", "Nombre"),
+                        ("outstanding_quantity", "Cantidad Pendiente"))
+ADVISORS_EXPORT_COLUMNS = (("name", "Nombre del Asesor"),)
+
+def parts_export_query(search_term=None):
+    """Consulta (sql, params) de todas las partes que coinciden con `search_term`, sin límite."""
+    columns = "p.part_number, p.part_name, " + PART_OUTSTANDING_QUANTITY
+    if search_term:
+        return parts_search_query(search_term, -1, columns=columns)
+    return f"SELECT {columns} FROM parts AS p ORDER BY p.part_number", ()
+
+def advisors_export_query():
+    return "SELECT name FROM advisors ORDER BY name", ()
+
+
+# ----------------------------------------------------------------------
+# --- REPORTES ---
+# ----------------------------------------------------------------------
+
+# Reportes que se pueden generar con `export_query`: consulta y columnas
+# (clave JSON, encabezado CSV) en el orden de la consulta, y opcionalmente el
+# índice que debe usar su plan
+REPORTS = {
+    "ots-por-asesor": {
+        "label": "OTs por asesor y estado",
+        "query": """
+            SELECT sales_advisor, status, COUNT(*), SUM(parts_count), SUM(pending_parts_count)
+            FROM ots
+            GROUP BY sales_advisor, status
+            ORDER BY sales_advisor, status
+        """,
+        "columns": (("sales_advisor", "Asesor de Ventas"), ("status", "Estado"), ("ots", "OTs"),
+                    ("parts", "Piezas"), ("pending_parts", "Piezas Pendientes")),
+    },
+    "partes-pendientes": {
+        "label": "Partes pendientes de entrega por OT",
+        "query": """
+            SELECT o.ot_number, o.sales_advisor, o.request_date, p.part_number, p.part_name,
+                   op.quantity, op.status
+            FROM (SELECT ot_id, part_id, quantity, status
+                  FROM ot_parts
+                  WHERE status <> 'Entregada') AS op
+            JOIN ots AS o ON o.id = op.ot_id
+            JOIN parts AS p ON p.id = op.part_id
+            ORDER BY o.request_date, o.ot_number
+        """,
+        # Índice parcial que debe recorrer (ver check_query_plans)
+        "index": "idx_ot_parts_pending",
+        "columns": (("ot_number", "OT"), ("sales_advisor", "Asesor de Ventas"),
+                    ("request_date", "Fecha de Pedido"), ("part_number", "No. de Parte"),
+                    ("part_name", "Nombre"), ("quantity", "Cantidad"), ("status", "Estatus")),
+    },
+    "consumo-partes": {
+        "label": "Uso de cada parte en OTs",
+        "query": """
+            SELECT p.part_number, p.part_name, COUNT(op.ot_id),
+                   COALESCE(SUM(op.quantity), 0),
+                   COALESCE(SUM(CASE WHEN op.status <> 'Entregada' THEN op.quantity END), 0)
+            FROM parts AS p
+            LEFT JOIN ot_parts AS op ON op.part_id = p.id
+            GROUP BY p.id
+            ORDER BY p.part_number
+        """,
+        "columns": (("part_number", "No. de Parte"), ("part_name", "Nombre"), ("ots", "OTs"),
+                    ("quantity", "Cantidad Total"), ("pending_quantity", "Cantidad Pendiente")),
+    },
+}
+
+
+# ----------------------------------------------------------------------
+# --- MANTENIMIENTO ---
+# ----------------------------------------------------------------------
+
+# Pasos de `rebuild_indexes`, en orden: (descripción, sentencia)
+MAINTENANCE_STEPS = (
+    ("Reconstruir índices", "REINDEX"),
+    ("Reconstruir búsqueda de OTs", "INSERT INTO ots_fts(ots_fts) VALUES('rebuild')"),
+    ("Compactar búsqueda de OTs", "INSERT INTO ots_fts(ots_fts) VALUES('optimize')"),
+    ("Reconstruir búsqueda de partes", "INSERT INTO parts_trgm(parts_trgm) VALUES('rebuild')"),
+    ("Compactar búsqueda de partes", "INSERT INTO parts_trgm(parts_trgm) VALUES('optimize')"),
+    ("Actualizar estadísticas (ANALYZE)", "ANALYZE"),
+)
+
+def rebuild_indexes(progress=None, vacuum=False):
+    """Reconstruye índices, índices de búsqueda y estadísticas del planificador.
+
+    Cada paso es una transacción; `progress(descripción)` se llama antes de
+    cada uno. Con `vacuum`, al final se compacta el archivo (necesita espacio
+    libre en disco igual al tamaño de la base). Devuelve (pasos con su
+    duración en segundos, problemas de planes de consulta).
+    """
+    steps = list(MAINTENANCE_STEPS)
+    if vacuum:
+        steps.append(("Compactar archivo (VACUUM)", "VACUUM"))
+    timings = []
+    for description, statement in steps:
+        if progress:
+            progress(description)
+        start = time.perf_counter()
+        if statement == "VACUUM":
+            # VACUUM no puede ejecutarse dentro de una transacción
+            get_connection().execute(statement)
+        else:
+            with transaction() as conn:
+                conn.execute(statement)
+        timings.append((description, time.perf_counter() - start))
+    return timings, check_query_plans(get_connection().cursor())
+
+def backup_database(path):
+    """Copia la base de datos en `path` con la API de respaldo de SQLite.
+
+    La copia es consistente aunque otros procesos estén usando la base (en
+    WAL no los bloquea) y, si `path` ya existe, se reemplaza. Después se
+    revisa la copia con `PRAGMA quick_check`; si falla, lanza DatabaseError.
+    """
+    if os.path.exists(path) and os.path.samefile(path, DATABASE_NAME):
+        raise ValueError("El respaldo no puede escribirse sobre la base de datos en uso.")
+    target = sqlite3.connect(path)
+    try:
+        get_connection().backup(target)
+        result = target.execute("PRAGMA quick_check").fetchone()[0]
+    finally:
+        target.close()
+    if result != "ok":
+        raise sqlite3.DatabaseError(f"La copia en {path} no pasó la verificación: {result}")
+    return os.path.getsize(path)
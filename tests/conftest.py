@@ -0,0 +1,37 @@
+"""Fixtures comunes: cada prueba trabaja sobre su propia base de datos temporal."""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import empresa_core as core
+
+
+def _reset_core_state():
+    """Cierra el hilo escritor y las conexiones, y olvida versiones y cachés."""
+    if core._write_queue is not None:
+        core._write_queue.shutdown()
+        core._write_queue = None
+    core.close_all_connections()
+    core.reference_cache.clear()
+    with core._table_versions_lock:
+        core._table_versions.clear()
+
+
+@pytest.fixture
+def database(tmp_path, monkeypatch):
+    """Ruta de una base de datos nueva (vacía) que usan todas las funciones del núcleo."""
+    _reset_core_state()
+    path = str(tmp_path / "empresa.db")
+    monkeypatch.setattr(core, "DATABASE_NAME", path)
+    yield path
+    _reset_core_state()
+
+
+@pytest.fixture
+def migrated_database(database):
+    """Base de datos temporal con el esquema actual y los datos iniciales."""
+    core.setup_database()
+    return database
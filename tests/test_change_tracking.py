@@ -0,0 +1,54 @@
+"""Contadores de cambios por tabla (change_counters) y su detección desde otras conexiones."""
+import sqlite3
+
+import pytest
+
+import empresa_core as core
+
+
+@pytest.fixture
+def other(migrated_database):
+    """Conexión aparte, como la de otro equipo o de empresa-cli."""
+    conn = sqlite3.connect(migrated_database, isolation_level=None)
+    yield conn
+    conn.close()
+
+
+def test_every_change_bumps_its_table_counter(migrated_database, other):
+    before = core.read_change_counters(other)
+    other.execute("INSERT INTO advisors (name) VALUES ('Asesor Nuevo')")
+    other.execute("UPDATE advisors SET name = 'Asesor Renombrado' WHERE name = 'Asesor Nuevo'")
+    other.execute("DELETE FROM advisors WHERE name = 'Asesor Renombrado'")
+    after = core.read_change_counters(other)
+    assert after["advisors"] == before["advisors"] + 3
+    assert {table: after[table] for table in after if table != "advisors"} == {
+        table: before[table] for table in before if table != "advisors"}
+
+
+def test_part_changes_also_bump_ots(migrated_database, other):
+    """Los triggers de contadores de partes actualizan la OT, así que la lista de OTs se entera."""
+    before = core.read_change_counters(other)
+    other.execute("UPDATE ot_parts SET status = 'Entregada' WHERE status = 'Pedida'")
+    after = core.read_change_counters(other)
+    assert after["ot_parts"] > before["ot_parts"]
+    assert after["ots"] > before["ots"]
+    assert after["parts"] == before["parts"]
+
+
+def test_detector_reports_changes_from_other_connections(migrated_database, other):
+    detector = core.ChangeDetector()
+    assert detector.poll() == set()
+    versions = core.table_versions(("vins", "parts"))
+
+    other.execute("INSERT INTO parts (part_number, part_name) VALUES ('DT-1', 'Desde otro equipo')")
+    assert detector.poll() == {"parts"}
+    assert detector.poll() == set()
+    new_versions = core.table_versions(("vins", "parts"))
+    assert new_versions[0] == versions[0]
+    assert new_versions[1] != versions[1]
+
+
+def test_detector_ignores_transactions_without_tracked_changes(migrated_database, other):
+    detector = core.ChangeDetector()
+    other.execute("UPDATE users SET full_name = 'Otro Nombre' WHERE username = 'admin'")
+    assert detector.poll() == set()
@@ -0,0 +1,41 @@
+"""Espera configurable de la búsqueda incremental (DebouncedSearch)."""
+import os
+
+import pytest
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PyQt6.QtWidgets import QApplication, QLineEdit
+
+import empresa
+
+
+@pytest.fixture(scope="module")
+def app():
+    return QApplication.instance() or QApplication([])
+
+
+def write_config(tmp_path, text):
+    path = tmp_path / "empresa.ini"
+    path.write_text(text, encoding="utf-8")
+    return str(path)
+
+
+def test_delay_is_read_from_the_config_file(tmp_path):
+    path = write_config(tmp_path, "[busqueda]\nespera_ms = 750\n")
+    assert empresa.load_search_delay(path) == 750
+
+
+@pytest.mark.parametrize("text", ["", "[busqueda]\n", "[busqueda]\nespera_ms = rápido\n",
+                                  "[busqueda]\nespera_ms = -5\n"])
+def test_missing_or_invalid_delay_falls_back_to_the_default(tmp_path, text):
+    path = write_config(tmp_path, text)
+    assert empresa.load_search_delay(path) == empresa.SEARCH_DEBOUNCE_MS
+
+
+def test_debounced_search_uses_the_configured_delay(app, monkeypatch):
+    monkeypatch.setattr(empresa, "_search_delay_ms", 450)
+    line_edit = QLineEdit()
+    assert empresa.DebouncedSearch(line_edit)._timer.interval() == 450
+    # Un valor explícito (p. ej. el selector de partes) no usa la configuración
+    assert empresa.DebouncedSearch(line_edit, 150)._timer.interval() == 150
@@ -0,0 +1,54 @@
+"""Exportación por lotes a CSV y JSONL (export_query)."""
+import csv
+import json
+
+import empresa_core as core
+
+QUERY = "SELECT part_number, part_name FROM parts ORDER BY part_number"
+COLUMNS = (("part_number", "No. de Parte"), ("part_name", "Nombre"))
+
+
+def add_parts(count):
+    conn = core.get_connection()
+    conn.executemany("INSERT INTO parts (part_number, part_name) VALUES (?, ?)",
+                     [(f"EX-{i:03d}", f"Pieza ñ {i}") for i in range(count)])
+    conn.commit()
+
+
+def test_csv_export_reads_in_batches(migrated_database, tmp_path, monkeypatch):
+    monkeypatch.setattr(core, "EXPORT_BATCH_SIZE", 4)
+    add_parts(10)
+    progress = []
+    path = str(tmp_path / "partes.csv")
+    summary = core.export_query(QUERY, (), COLUMNS, path, progress=progress.append)
+    assert summary == {"rows": 12, "path": path, "cancelled": False}
+    assert progress == [4, 8, 12]
+    # Con BOM, para que Excel reconozca los acentos
+    with open(path, "rb") as f:
+        assert f.read(3) == b"\xef\xbb\xbf"
+    with open(path, encoding="utf-8-sig", newline="") as f:
+        rows = list(csv.reader(f))
+    assert rows[0] == ["No. de Parte", "Nombre"]
+    assert rows[1:4] == [["EX-000", "Pieza ñ 0"], ["EX-001", "Pieza ñ 1"], ["EX-002", "Pieza ñ 2"]]
+    assert len(rows) == 13
+
+
+def test_jsonl_export_uses_the_column_keys(migrated_database, tmp_path):
+    add_parts(2)
+    path = str(tmp_path / "partes.jsonl")
+    assert core.export_query(QUERY, (), COLUMNS, path, fmt="jsonl")["rows"] == 4
+    with open(path, encoding="utf-8") as f:
+        records = [json.loads(line) for line in f]
+    assert records[0] == {"part_number": "EX-000", "part_name": "Pieza ñ 0"}
+    assert [record["part_number"] for record in records] == ["EX-000", "EX-001", "NP-010-F", "NP-011-B"]
+
+
+def test_cancelled_export_removes_the_partial_file(migrated_database, tmp_path, monkeypatch):
+    monkeypatch.setattr(core, "EXPORT_BATCH_SIZE", 2)
+    add_parts(10)
+    batches = []
+    path = tmp_path / "partes.csv"
+    summary = core.export_query(QUERY, (), COLUMNS, str(path), progress=batches.append,
+                                   is_cancelled=lambda: len(batches) == 2)
+    assert summary["cancelled"] and summary["rows"] == 4
+    assert not path.exists()
@@ -0,0 +1,82 @@
+"""Importación masiva desde CSV (import_file)."""
+import csv
+
+import pytest
+
+import empresa_core as core
+
+OTS_HEADER = "ot_number,sales_advisor,vin,status,request_date\n"
+VINS_HEADER = "vin,model,year,insurance,owner_name,owner_email,owner_phone,sales_advisor\n"
+
+
+def write_csv(path, text):
+    path.write_text(text, encoding="utf-8")
+    return str(path)
+
+
+def read_rejects(path):
+    with open(path, encoding="utf-8-sig", newline="") as f:
+        return list(csv.reader(f))
+
+
+def test_skip_mode_keeps_existing_rows_and_counts_duplicates(migrated_database, tmp_path):
+    path = write_csv(tmp_path / "vehiculos.csv", VINS_HEADER
+                     # Ya existe: el VIN se compara en mayúsculas
+                     + "vin1234567890,Tesla Model Y,2024,,Otro Dueño,,,Laura Gómez\n"
+                     + "NUEVOVIN00001,Kia Rio,2021,GNP,Eva Luna,eva@correo.mx,5511112222,Juan Pérez\n"
+                     # Repetido dentro del mismo archivo
+                     + "NUEVOVIN00001,Kia Rio,2021,GNP,Eva Repetida,,,Juan Pérez\n")
+    summary = core.import_file(path, "vins", chunk_size=2)
+    assert (summary["read"], summary["written"], summary["duplicates"], summary["rejected"]) == (3, 1, 2, 0)
+    assert summary["rejects_path"] is None
+    rows = core.get_connection().execute(
+        "SELECT vin, model, owner_name FROM vins WHERE vin IN ('VIN1234567890', 'NUEVOVIN00001') ORDER BY vin"
+    ).fetchall()
+    assert rows == [("NUEVOVIN00001", "Kia Rio", "Eva Luna"), ("VIN1234567890", "Tesla Model 3", "Carlos Ruíz")]
+
+
+def test_upsert_mode_updates_rows_in_place(migrated_database, tmp_path):
+    conn = core.get_connection()
+    ot_id = conn.execute("SELECT id FROM ots WHERE ot_number = 'OT-001'").fetchone()[0]
+    path = write_csv(tmp_path / "ordenes.csv", OTS_HEADER
+                     + "OT-001,Juan Pérez,VIN1234567890,Entregada,2025-09-12\n"
+                     + "OT-300,Juan Pérez,VIN0987654321,,2025-09-12\n")
+    summary = core.import_file(path, "ots", mode="upsert")
+    assert (summary["written"], summary["rejected"]) == (2, 0)
+    # Conserva el id, del que dependen las partes de la OT
+    assert conn.execute("SELECT id, sales_advisor, status FROM ots WHERE ot_number = 'OT-001'").fetchone() == (
+        ot_id, "Juan Pérez", "Entregada")
+    assert conn.execute("SELECT COUNT(*) FROM ot_parts WHERE ot_id = ?", (ot_id,)).fetchone() == (2,)
+    # Estatus vacío: se usa el valor por omisión
+    assert conn.execute("SELECT status FROM ots WHERE ot_number = 'OT-300'").fetchone() == ("Pendiente",)
+
+
+def test_invalid_rows_are_written_to_the_rejects_file(migrated_database, tmp_path):
+    path = write_csv(tmp_path / "ordenes.csv", OTS_HEADER
+                     + "OT-500,Laura Gómez,VIN1234567890,Pedida,2024-02-10\n"
+                     + "OT-501,Laura Gómez,VIN1234567890,Perdida,2024-02-10\n"
+                     + "OT-502,,VIN1234567890,Pedida,2024-02-10\n"
+                     + "OT-503,Juan Pérez,NOEXISTE00000,Pedida,2024-02-10\n"
+                     + "OT-504,Juan Pérez,VIN0987654321,Pedida,10/02/2024\n")
+    summary = core.import_file(path, "ots")
+    assert (summary["read"], summary["written"], summary["rejected"]) == (5, 1, 4)
+    assert summary["rejects_path"] == str(tmp_path / "ordenes.rechazos.csv")
+
+    header, *rows = read_rejects(summary["rejects_path"])
+    assert header == ["fila", "motivo", *core.IMPORT_TARGETS["ots"]["columns"]]
+    # Las filas conservan su número en el archivo y los valores tal como venían
+    assert sorted((row[0], row[2]) for row in rows) == [
+        ("3", "OT-501"), ("4", "OT-502"), ("5", "OT-503"), ("6", "OT-504")]
+    reasons = {row[2]: row[1] for row in rows}
+    assert "status" in reasons["OT-501"]
+    assert "sales_advisor" in reasons["OT-502"]
+    assert "NOEXISTE00000" in reasons["OT-503"]
+    assert "Fecha" in reasons["OT-504"]
+    assert core.get_connection().execute(
+        "SELECT ot_number FROM ots WHERE ot_number LIKE 'OT-5%'").fetchall() == [("OT-500",)]
+
+
+def test_missing_required_column_is_an_error(migrated_database, tmp_path):
+    path = write_csv(tmp_path / "partes.csv", "part_number\nXX-1\n")
+    with pytest.raises(ValueError, match="part_name"):
+        core.import_file(path, "parts")
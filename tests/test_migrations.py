@@ -0,0 +1,140 @@
+"""Migraciones del esquema (setup_database y MIGRATIONS)."""
+import sqlite3
+
+import pytest
+
+import empresa_core as core
+
+# Esquema de las bases anteriores a PRAGMA user_version (users sin `role`,
+# vins sin `sales_advisor`), con datos ya capturados
+LEGACY_SCHEMA = """
+    CREATE TABLE users (id INTEGER PRIMARY KEY, username TEXT NOT NULL UNIQUE,
+                        password TEXT NOT NULL, full_name TEXT);
+    CREATE TABLE advisors (id INTEGER PRIMARY KEY, name TEXT NOT NULL UNIQUE);
+    CREATE TABLE ots (id INTEGER PRIMARY KEY, ot_number TEXT NOT NULL UNIQUE, sales_advisor TEXT,
+                      vin TEXT, status TEXT, request_date TEXT);
+    CREATE TABLE parts (id INTEGER PRIMARY KEY, part_number TEXT NOT NULL UNIQUE, part_name TEXT);
+    CREATE TABLE ot_parts (ot_id INTEGER, part_id INTEGER, quantity INTEGER, status TEXT,
+                           FOREIGN KEY(ot_id) REFERENCES ots(id), FOREIGN KEY(part_id) REFERENCES parts(id),
+                           PRIMARY KEY (ot_id, part_id));
+    CREATE TABLE vins (vin TEXT PRIMARY KEY, model TEXT, year INTEGER, insurance TEXT, owner_name TEXT,
+                       owner_email TEXT, owner_phone TEXT);
+    CREATE INDEX idx_ots_sales_advisor ON ots(sales_advisor);
+
+    INSERT INTO users (username, password, full_name) VALUES ('admin', 'password', 'Administrador');
+    INSERT INTO advisors (name) VALUES ('Laura Gómez');
+    INSERT INTO vins (vin, model, year, owner_name) VALUES ('LEGACYVIN0001', 'Nissan Versa', 2019, 'Rosa Díaz');
+    INSERT INTO ots (ot_number, sales_advisor, vin, status, request_date)
+        VALUES ('OT-L1', 'Laura Gómez', 'LEGACYVIN0001', 'Pendiente', '2023-05-02'),
+               ('OT-L2', 'Laura Gómez', 'LEGACYVIN0001', 'Entregada', '2023-06-11');
+    INSERT INTO parts (part_number, part_name) VALUES ('LP-1', 'Bujía'), ('LP-2', 'Aceite'), ('LP-3', 'Filtro');
+    INSERT INTO ot_parts (ot_id, part_id, quantity, status) VALUES
+        (1, 1, 4, 'Pedida'), (1, 2, 1, 'Entregada'), (1, 3, 1, NULL), (2, 2, 1, 'Entregada');
+"""
+
+
+def schema_objects(path):
+    """Objetos del esquema (tipo, nombre, sql) sin las tablas internas de SQLite."""
+    conn = sqlite3.connect(path)
+    try:
+        return sorted(conn.execute(
+            "SELECT type, name, sql FROM sqlite_master WHERE name NOT LIKE 'sqlite_%'"))
+    finally:
+        conn.close()
+
+
+def user_version(path):
+    conn = sqlite3.connect(path)
+    try:
+        return conn.execute("PRAGMA user_version").fetchone()[0]
+    finally:
+        conn.close()
+
+
+def test_empty_database_reaches_current_version(database):
+    core.setup_database()
+    conn = core.get_connection()
+    assert user_version(database) == core.SCHEMA_VERSION
+    assert core.check_query_plans(conn.cursor()) == []
+    assert conn.execute("PRAGMA foreign_key_check").fetchall() == []
+    indexes = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+    assert {index[0] for index in core.MANAGED_INDEXES} <= indexes
+    assert not indexes & set(core.RETIRED_INDEXES)
+    assert set(core.read_change_counters(conn)) == set(core.CHANGE_TRACKED_TABLES)
+
+
+def test_setup_is_a_no_op_when_up_to_date(migrated_database):
+    before = schema_objects(migrated_database)
+    schema_version = core.get_connection().execute("PRAGMA schema_version").fetchone()[0]
+    core.setup_database()
+    assert schema_objects(migrated_database) == before
+    assert core.get_connection().execute("PRAGMA schema_version").fetchone()[0] == schema_version
+
+
+def test_legacy_database_is_upgraded_keeping_its_data(database):
+    conn = sqlite3.connect(database)
+    conn.executescript(LEGACY_SCHEMA)
+    conn.close()
+
+    core.setup_database()
+    conn = core.get_connection()
+    assert user_version(database) == core.SCHEMA_VERSION
+    assert "sales_advisor" in {row[1] for row in conn.execute("PRAGMA table_info(vins)")}
+    assert conn.execute("SELECT role FROM users WHERE username = 'admin'").fetchone() == ("user",)
+    assert conn.execute("SELECT owner_name FROM vins WHERE vin = 'LEGACYVIN0001'").fetchone() == ("Rosa Díaz",)
+    # Contadores calculados desde ot_parts; una parte sin estatus no está pendiente
+    assert conn.execute("SELECT ot_number, parts_count, pending_parts_count FROM ots "
+                        "WHERE ot_number LIKE 'OT-L%' ORDER BY ot_number").fetchall() == [
+        ("OT-L1", 3, 1), ("OT-L2", 1, 0)]
+    # Índices de búsqueda reconstruidos sobre los datos existentes
+    assert conn.execute("SELECT rowid FROM ots_fts WHERE ots_fts MATCH ?",
+                        (core.fts_prefix_query("rosa versa"),)).fetchall() == [(1,), (2,)]
+    assert core.find_part_id("LP-2") == 2
+    assert core.check_query_plans(conn.cursor()) == []
+
+
+@pytest.mark.parametrize("version", range(1, len(core.MIGRATIONS)))
+def test_upgrade_from_each_version_matches_a_fresh_schema(tmp_path, monkeypatch, database, version):
+    """Aplicar las migraciones en dos tandas deja el mismo esquema que aplicarlas de una vez."""
+    core.setup_database()
+    fresh = schema_objects(database)
+    core.close_all_connections()
+
+    monkeypatch.setattr(core, "DATABASE_NAME", str(tmp_path / "por-pasos.db"))
+    monkeypatch.setattr(core, "MIGRATIONS", core.MIGRATIONS[:version])
+    monkeypatch.setattr(core, "SCHEMA_VERSION", version)
+    core.setup_database()
+    assert user_version(core.DATABASE_NAME) == version
+    core.close_all_connections()
+
+    monkeypatch.undo()
+    monkeypatch.setattr(core, "DATABASE_NAME", str(tmp_path / "por-pasos.db"))
+    core.setup_database()
+    assert user_version(core.DATABASE_NAME) == core.SCHEMA_VERSION
+    assert schema_objects(core.DATABASE_NAME) == fresh
+
+
+def test_failed_migration_rolls_back_every_step(migrated_database, monkeypatch):
+    before = schema_objects(migrated_database)
+
+    def migration_new_table(cursor):
+        cursor.execute("CREATE TABLE migration_probe (id INTEGER PRIMARY KEY)")
+
+    def migration_broken(cursor):
+        cursor.execute("ALTER TABLE ots ADD COLUMN half_done TEXT")
+        raise sqlite3.OperationalError("falla a propósito")
+
+    monkeypatch.setattr(core, "MIGRATIONS", core.MIGRATIONS + (migration_new_table, migration_broken))
+    monkeypatch.setattr(core, "SCHEMA_VERSION", len(core.MIGRATIONS))
+    with pytest.raises(sqlite3.OperationalError):
+        core.setup_database()
+    assert user_version(migrated_database) == core.SCHEMA_VERSION - 2
+    assert schema_objects(migrated_database) == before
+
+
+def test_newer_database_is_left_untouched(migrated_database, capsys):
+    core.get_connection().execute(f"PRAGMA user_version = {core.SCHEMA_VERSION + 1}")
+    before = schema_objects(migrated_database)
+    core.setup_database()
+    assert "más nueva" in capsys.readouterr().out
+    assert schema_objects(migrated_database) == before
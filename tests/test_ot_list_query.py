@@ -0,0 +1,116 @@
+"""Paginación por clave de la lista de OTs (OTListQuery)."""
+import pytest
+
+import empresa_core as core
+
+ADVISORS = ("Ana", "Beto", None, "Ana", "Ana", None, "Carla")
+STATUSES = ("Pendiente", None, "Pedida", "Pendiente", "Entregada")
+DATES = ("2024-01-05", None, "2024-01-05", "2023-12-31", None, "2024-02-01")
+
+
+@pytest.fixture
+def ots(migrated_database):
+    """60 OTs con valores de orden repetidos y NULL; devuelve {id: fila}."""
+    conn = core.get_connection()
+    conn.execute("DELETE FROM ot_parts")
+    conn.execute("DELETE FROM ots")
+    conn.executemany(
+        "INSERT INTO ots (ot_number, sales_advisor, vin, status, request_date) VALUES (?, ?, ?, ?, ?)",
+        [(f"OT-{i:03d}", ADVISORS[i % len(ADVISORS)], "VIN1234567890",
+          STATUSES[i % len(STATUSES)], DATES[i % len(DATES)]) for i in range(60)],
+    )
+    # Los contadores los mantienen triggers; aquí solo interesan valores repetidos
+    conn.execute("UPDATE ots SET parts_count = id % 3")
+    conn.commit()
+    columns = ("id", "ot_number", "sales_advisor", "status", "request_date", "parts_count")
+    return {row[0]: dict(zip(columns, row))
+            for row in conn.execute(f"SELECT {', '.join(columns)} FROM ots")}
+
+
+def read_all_pages(list_query, page_size):
+    """Ids de todas las páginas, leídas como la lista: cada una desde la clave de la anterior."""
+    conn = core.get_connection()
+    ids = []
+    after = None
+    while True:
+        rows = core.OTListQuery.run_page_queries(conn, list_query.page_queries(after), page_size)
+        ids += [row[core.OTListQuery.ID_COLUMN] for row in rows]
+        if len(rows) < page_size:
+            return ids
+        after = list_query.row_key(rows[-1])
+
+
+def expected_ids(ots, sort_key, descending, advisor=None):
+    """Orden de SQLite calculado en Python: NULL primero en ascendente, (valor, id) como desempate."""
+    rows = [row for row in ots.values() if advisor is None or row["sales_advisor"] == advisor]
+    if sort_key is None:
+        return sorted(row["id"] for row in rows)
+    def key(row):
+        value = row[sort_key]
+        return (value is not None, "" if value is None else value, row["id"])
+    ids = [row["id"] for row in sorted(rows, key=key)]
+    return ids[::-1] if descending else ids
+
+
+SORT_KEYS = [None, *core.OTListQuery.SORT_EXPRESSIONS]
+
+
+@pytest.mark.parametrize("page_size", [1, 4, 7, 100])
+@pytest.mark.parametrize("descending", [False, True])
+@pytest.mark.parametrize("sort_key", SORT_KEYS)
+def test_pages_cover_every_row_once_in_order(ots, sort_key, descending, page_size):
+    list_query = core.OTListQuery(sort_key=sort_key, descending=descending)
+    assert read_all_pages(list_query, page_size) == expected_ids(ots, sort_key, descending)
+
+
+@pytest.mark.parametrize("descending", [False, True])
+@pytest.mark.parametrize("sort_key", SORT_KEYS)
+def test_pages_with_advisor_filter(ots, sort_key, descending):
+    list_query = core.OTListQuery("Ana", sort_key=sort_key, descending=descending)
+    assert read_all_pages(list_query, 3) == expected_ids(ots, sort_key, descending, advisor="Ana")
+
+
+@pytest.mark.parametrize("descending", [False, True])
+@pytest.mark.parametrize("sort_key", ["sales_advisor", "request_date", "status"])
+def test_export_order_matches_pages(ots, sort_key, descending):
+    """La exportación deja los NULL en el mismo lugar que la paginación por segmentos."""
+    list_query = core.OTListQuery(sort_key=sort_key, descending=descending)
+    query, params = list_query.export_query()
+    exported = [row[0] for row in core.get_connection().execute(query, params)]
+    assert exported == [ots[ot_id]["ot_number"] for ot_id in read_all_pages(list_query, 5)]
+
+
+def test_search_pages_by_relevance_without_gaps(ots):
+    list_query = core.OTListQuery(search_term="carla")
+    ids = read_all_pages(list_query, 2)
+    assert len(ids) == len(set(ids))
+    assert set(ids) == {row["id"] for row in ots.values() if row["sales_advisor"] == "Carla"}
+
+
+def test_page_continues_after_rows_added_before_the_key(ots):
+    """Una fila nueva antes de la clave no repite ni salta filas de las páginas siguientes."""
+    list_query = core.OTListQuery(sort_key="sales_advisor")
+    conn = core.get_connection()
+    # 20 filas: la clave queda pasado el grupo NULL, donde irá la fila nueva
+    first_page = core.OTListQuery.run_page_queries(conn, list_query.page_queries(), 20)
+    assert list_query.row_key(first_page[-1])[0] is not None
+    conn.execute("INSERT INTO ots (ot_number, sales_advisor, vin, status, request_date) "
+                 "VALUES ('OT-NEW', NULL, 'VIN1234567890', 'Pendiente', '2024-01-01')")
+    conn.commit()
+    rest = core.OTListQuery.run_page_queries(
+        conn, list_query.page_queries(list_query.row_key(first_page[-1])), 1000)
+    ids = [row[core.OTListQuery.ID_COLUMN] for row in first_page + rest]
+    assert ids == expected_ids(ots, "sales_advisor", False)
+
+
+@pytest.mark.parametrize("sort_key, index_name", [("ot_number", "idx_ots_advisor_ot_number"),
+                                                  ("parts_count", "idx_ots_advisor_parts_count")])
+def test_advisor_filter_pages_use_composite_index(ots, sort_key, index_name):
+    """Con filtro por asesor, cada página sigue el índice (asesor, orden) sin ordenar en memoria."""
+    list_query = core.OTListQuery("Ana", sort_key=sort_key)
+    conn = core.get_connection()
+    first_page = core.OTListQuery.run_page_queries(conn, list_query.page_queries(), 3)
+    query, params = list_query.page_queries(list_query.row_key(first_page[-1]))[0]
+    plan = " | ".join(row[-1] for row in conn.execute(f"EXPLAIN QUERY PLAN {query}", params + [3]))
+    assert index_name in plan
+    assert "TEMP B-TREE" not in plan
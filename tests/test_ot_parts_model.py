@@ -0,0 +1,52 @@
+"""Modelo de partes de una OT (OTPartsModel): orden con valores NULL."""
+import os
+
+import pytest
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PyQt6.QtCore import Qt
+from PyQt6.QtWidgets import QApplication
+
+import empresa
+
+
+@pytest.fixture(scope="module")
+def app():
+    return QApplication.instance() or QApplication([])
+
+
+@pytest.fixture
+def model(app):
+    model = empresa.OTPartsModel()
+    # [número, nombre, cantidad, estatus, id de parte]
+    model.set_rows([
+        ("NP-1", "Filtro", 3, "Entregada", 1),
+        ("NP-2", "Balata", None, None, 2),
+        ("NP-3", "Bujía", 1, "Pedida", 3),
+    ])
+    return model
+
+
+def part_ids(model):
+    return [model.index(row, 0).data() for row in range(model.rowCount())]
+
+
+@pytest.mark.parametrize("column", [2, 3, 4])
+def test_sort_puts_null_cells_last(model, column):
+    model.sort(column, Qt.SortOrder.AscendingOrder)
+    assert part_ids(model)[-1] == "NP-2"
+    model.sort(column, Qt.SortOrder.DescendingOrder)
+    assert part_ids(model)[0] == "NP-2"
+
+
+def test_sort_by_quantity_orders_known_values(model):
+    model.sort(2, Qt.SortOrder.AscendingOrder)
+    assert part_ids(model) == ["NP-3", "NP-1", "NP-2"]
+
+
+def test_sort_by_edit_column_uses_pending_status(model):
+    # La parte sin estatus toma uno pendiente de guardar y deja de ir al final
+    model.request_status([1], "Entregada")
+    model.sort(model.EDIT_COLUMN, Qt.SortOrder.AscendingOrder)
+    assert part_ids(model) == ["NP-1", "NP-2", "NP-3"]
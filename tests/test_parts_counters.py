@@ -0,0 +1,95 @@
+"""Contadores de partes de cada OT (parts_count, pending_parts_count) mantenidos por triggers."""
+import pytest
+
+import empresa_core as core
+
+
+@pytest.fixture
+def conn(migrated_database):
+    # La conexión de la aplicación activa recursive_triggers, que necesita INSERT OR REPLACE
+    conn = core.get_connection()
+    for part_number in ("TP-1", "TP-2", "TP-3"):
+        conn.execute("INSERT INTO parts (part_number, part_name) VALUES (?, 'Parte de prueba')", (part_number,))
+    conn.commit()
+    return conn
+
+
+def ot_id(conn, ot_number):
+    return conn.execute("SELECT id FROM ots WHERE ot_number = ?", (ot_number,)).fetchone()[0]
+
+
+def part_id(conn, part_number):
+    return conn.execute("SELECT id FROM parts WHERE part_number = ?", (part_number,)).fetchone()[0]
+
+
+def counters(conn, ot_number):
+    return conn.execute("SELECT parts_count, pending_parts_count FROM ots WHERE ot_number = ?",
+                        (ot_number,)).fetchone()
+
+
+def assert_counters_match_ot_parts(conn):
+    rows = conn.execute("""
+        SELECT o.parts_count, o.pending_parts_count,
+               (SELECT COUNT(*) FROM ot_parts WHERE ot_id = o.id),
+               (SELECT COUNT(*) FROM ot_parts WHERE ot_id = o.id AND status <> 'Entregada')
+        FROM ots AS o
+    """).fetchall()
+    assert [row[:2] for row in rows] == [row[2:] for row in rows]
+
+
+def test_seed_data_is_counted(conn):
+    assert counters(conn, "OT-001") == (2, 2)
+    assert counters(conn, "OT-002") == (0, 0)
+
+
+def test_status_changes_move_the_pending_count(conn):
+    ot, part = ot_id(conn, "OT-002"), part_id(conn, "TP-1")
+    conn.execute("INSERT INTO ot_parts (ot_id, part_id, quantity, status) VALUES (?, ?, 1, 'Pedida')", (ot, part))
+    assert counters(conn, "OT-002") == (1, 1)
+    for status, expected in (("Entregada", (1, 0)), (None, (1, 0)), ("Pendiente", (1, 1)), (None, (1, 0))):
+        conn.execute("UPDATE ot_parts SET status = ? WHERE ot_id = ? AND part_id = ?", (status, ot, part))
+        assert counters(conn, "OT-002") == expected, status
+    assert_counters_match_ot_parts(conn)
+
+
+def test_part_without_status_is_counted_but_not_pending(conn):
+    ot = ot_id(conn, "OT-002")
+    conn.execute("INSERT INTO ot_parts (ot_id, part_id, quantity, status) VALUES (?, ?, 1, NULL)",
+                 (ot, part_id(conn, "TP-1")))
+    conn.execute("INSERT INTO ot_parts (ot_id, part_id, quantity, status) VALUES (?, ?, 1, 'Pedida')",
+                 (ot, part_id(conn, "TP-2")))
+    assert counters(conn, "OT-002") == (2, 1)
+    conn.execute("DELETE FROM ot_parts WHERE ot_id = ? AND status IS NULL", (ot,))
+    assert counters(conn, "OT-002") == (1, 1)
+    assert_counters_match_ot_parts(conn)
+
+
+def test_moving_a_part_updates_both_ots(conn):
+    source, target = ot_id(conn, "OT-001"), ot_id(conn, "OT-002")
+    conn.execute("UPDATE ot_parts SET ot_id = ? WHERE ot_id = ? AND part_id = ?",
+                 (target, source, part_id(conn, "NP-010-F")))
+    assert counters(conn, "OT-001") == (1, 1)
+    assert counters(conn, "OT-002") == (1, 1)
+    assert_counters_match_ot_parts(conn)
+
+
+def test_insert_or_replace_counts_the_replaced_row_once(conn):
+    ot, part = ot_id(conn, "OT-001"), part_id(conn, "NP-010-F")
+    conn.execute("INSERT OR REPLACE INTO ot_parts (ot_id, part_id, quantity, status) VALUES (?, ?, 5, 'Entregada')",
+                 (ot, part))
+    assert counters(conn, "OT-001") == (2, 1)
+    assert_counters_match_ot_parts(conn)
+
+
+def test_deleting_every_part_resets_the_counters(conn):
+    conn.execute("DELETE FROM ot_parts")
+    assert counters(conn, "OT-001") == (0, 0)
+    assert_counters_match_ot_parts(conn)
+
+
+def test_saved_status_edits_update_the_counters(conn):
+    ot = ot_id(conn, "OT-001")
+    changes = [(part_id(conn, "NP-010-F"), "Entregada"), (part_id(conn, "NP-011-B"), None)]
+    assert core.update_ot_part_statuses(ot, changes).result(timeout=5) == 2
+    assert counters(conn, "OT-001") == (2, 0)
+    assert_counters_match_ot_parts(conn)
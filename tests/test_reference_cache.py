@@ -0,0 +1,63 @@
+"""Caché de datos de referencia (ReferenceCache) y su invalidación por versiones de tablas."""
+import sqlite3
+
+import pytest
+
+import empresa_core as core
+
+
+@pytest.fixture
+def other(migrated_database):
+    """Conexión aparte, como la de otro equipo o de empresa-cli."""
+    conn = sqlite3.connect(migrated_database, isolation_level=None)
+    yield conn
+    conn.close()
+
+
+def counting_loader(values):
+    """Cargador que entrega `values` en orden y cuenta cuántas veces se llamó."""
+    def load():
+        load.calls += 1
+        return values[load.calls - 1]
+    load.calls = 0
+    return load
+
+
+def test_value_is_loaded_once_while_its_tables_do_not_change(migrated_database):
+    cache = core.ReferenceCache()
+    load = counting_loader(["primero", "segundo"])
+    assert cache.get("prueba", ("advisors",), load) == "primero"
+    assert cache.get("prueba", ("advisors",), load) == "primero"
+    assert load.calls == 1
+
+
+def test_own_write_invalidates_the_entry(migrated_database):
+    cache = core.ReferenceCache()
+    load = counting_loader(["antes", "después"])
+    assert cache.get("prueba", ("advisors",), load) == "antes"
+    # Una escritura en otra tabla no la invalida
+    core.create_part("RC-1", "Parte de prueba").result(timeout=5)
+    assert cache.get("prueba", ("advisors",), load) == "antes"
+    core.create_advisor("Asesor Nuevo").result(timeout=5)
+    assert cache.get("prueba", ("advisors",), load) == "después"
+    assert load.calls == 2
+
+
+def test_cached_advisors_sees_changes_from_other_connections_after_a_poll(migrated_database, other):
+    detector = core.ChangeDetector()
+    assert "Asesor Remoto" not in core.cached_advisors()
+    other.execute("INSERT INTO advisors (name) VALUES ('Asesor Remoto')")
+    # Hasta que el detector ve el cambio se sirve la copia en memoria
+    assert "Asesor Remoto" not in core.cached_advisors()
+    assert detector.poll() == {"advisors"}
+    assert "Asesor Remoto" in core.cached_advisors()
+
+
+def test_cached_part_id_follows_renamed_parts(migrated_database, other):
+    detector = core.ChangeDetector()
+    part_id = core.cached_part_id("np-010-f")
+    assert part_id == core.find_part_id("NP-010-F")
+    other.execute("UPDATE parts SET part_number = 'NP-010-G' WHERE id = ?", (part_id,))
+    detector.poll()
+    assert core.cached_part_id("NP-010-F") is None
+    assert core.cached_part_id("NP-010-G") == part_id
@@ -0,0 +1,102 @@
+"""Índices de búsqueda mantenidos por triggers: OTs (FTS5) y catálogo de partes (trigramas)."""
+import sqlite3
+
+import pytest
+
+import empresa_core as core
+
+
+@pytest.fixture
+def conn(migrated_database):
+    conn = sqlite3.connect(migrated_database)
+    yield conn
+    conn.close()
+
+
+def add_ot(conn, ot_number, vin="VIN1234567890", advisor="Laura Gómez", status="Pendiente"):
+    return conn.execute(
+        "INSERT INTO ots (ot_number, sales_advisor, vin, status, request_date) VALUES (?, ?, ?, ?, '2024-03-01')",
+        (ot_number, advisor, vin, status),
+    ).lastrowid
+
+
+def search_ots(conn, term):
+    return [row[0] for row in conn.execute(
+        "SELECT rowid FROM ots_fts WHERE ots_fts MATCH ? ORDER BY rowid", (core.fts_prefix_query(term),))]
+
+
+def assert_index_matches_source(conn, index):
+    """'integrity-check' con rank 1 compara el índice con su tabla o vista de contenido."""
+    conn.execute(f"INSERT INTO {index}({index}, rank) VALUES ('integrity-check', 1)")
+
+
+def test_new_ot_is_found_by_its_own_and_its_vehicle_columns(conn):
+    ot_id = add_ot(conn, "OT-900")
+    assert search_ots(conn, "900") == [ot_id]
+    assert ot_id in search_ots(conn, "carlos tesla laura")
+    assert_index_matches_source(conn, "ots_fts")
+
+
+def test_updated_ot_is_found_only_by_its_new_values(conn):
+    ot_id = add_ot(conn, "OT-901")
+    conn.execute("UPDATE ots SET sales_advisor = 'Juan Pérez', status = 'Entregada' WHERE id = ?", (ot_id,))
+    assert search_ots(conn, "901 laura") == []
+    assert search_ots(conn, "901 perez entregada") == [ot_id]
+    assert_index_matches_source(conn, "ots_fts")
+
+
+def test_vehicle_changes_reindex_its_ots(conn):
+    ot_id = add_ot(conn, "OT-902", vin="VIN0987654321")
+    conn.execute("UPDATE vins SET owner_name = 'Ana Beltrán' WHERE vin = 'VIN0987654321'")
+    assert search_ots(conn, "902 torres") == []
+    assert search_ots(conn, "902 beltran") == [ot_id]
+
+    # Una OT cuyo vehículo aún no existe se indexa sin él, y con él al darlo de alta
+    orphan_id = add_ot(conn, "OT-903", vin="VINNUEVO00001")
+    assert search_ots(conn, "rita") == []
+    conn.execute("INSERT INTO vins (vin, model, owner_name) VALUES ('VINNUEVO00001', 'Mazda 3', 'Rita Solís')")
+    assert search_ots(conn, "rita mazda") == [orphan_id]
+    conn.execute("DELETE FROM vins WHERE vin = 'VINNUEVO00001'")
+    assert search_ots(conn, "rita") == []
+    assert search_ots(conn, "903") == [orphan_id]
+    assert_index_matches_source(conn, "ots_fts")
+
+
+def test_deleted_ot_leaves_the_index(conn):
+    ot_id = add_ot(conn, "OT-904")
+    conn.execute("DELETE FROM ots WHERE id = ?", (ot_id,))
+    assert search_ots(conn, "904") == []
+    assert_index_matches_source(conn, "ots_fts")
+
+
+def search_parts(conn, term):
+    query, params = core.parts_search_query(term, 50)
+    return [row[1] for row in conn.execute(query, params)]
+
+
+def add_part(conn, part_number, part_name):
+    return conn.execute("INSERT INTO parts (part_number, part_name) VALUES (?, ?)",
+                        (part_number, part_name)).lastrowid
+
+
+def test_part_is_found_by_any_substring_of_number_or_name(conn):
+    add_part(conn, "AB-1234-X", "Amortiguador trasero")
+    assert search_parts(conn, "1234") == ["AB-1234-X"]
+    assert search_parts(conn, "TIGUADOR") == ["AB-1234-X"]
+    assert search_parts(conn, "sero") == ["AB-1234-X"]
+    assert_index_matches_source(conn, "parts_trgm")
+
+
+def test_renamed_and_deleted_parts_update_the_index(conn):
+    part_id = add_part(conn, "ZX-777", "Bomba de agua")
+    conn.execute("UPDATE parts SET part_name = 'Bomba de gasolina' WHERE id = ?", (part_id,))
+    assert search_parts(conn, "agua") == []
+    assert search_parts(conn, "gasolina") == ["ZX-777"]
+    conn.execute("DELETE FROM parts WHERE id = ?", (part_id,))
+    assert search_parts(conn, "ZX-7") == []
+    assert_index_matches_source(conn, "parts_trgm")
+
+
+def test_short_term_matches_part_number_prefix(conn):
+    add_part(conn, "NQ-500", "Tapón")
+    assert search_parts(conn, "np") == ["NP-010-F", "NP-011-B"]
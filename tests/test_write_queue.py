@@ -0,0 +1,104 @@
+"""Hilo escritor único (WriteQueue): confirmación agrupada y aislamiento de fallas."""
+import sqlite3
+import threading
+
+import pytest
+
+import empresa_core as core
+
+
+@pytest.fixture
+def writes(migrated_database):
+    """Tabla de prueba y una cola con ventana amplia, para que las escrituras caigan en un lote."""
+    conn = core.get_connection()
+    conn.execute("CREATE TABLE write_probe (id INTEGER PRIMARY KEY, value TEXT NOT NULL)")
+    conn.commit()
+    write_queue = core.WriteQueue(window=0.3)
+    yield write_queue
+    write_queue.shutdown()
+
+
+def insert(value, row_id=None):
+    def mutation(conn):
+        return conn.execute("INSERT INTO write_probe (id, value) VALUES (?, ?)", (row_id, value)).lastrowid
+    return mutation
+
+
+def probe_values():
+    conn = core.get_connection()
+    return [row[0] for row in conn.execute("SELECT value FROM write_probe ORDER BY id")]
+
+
+def traced_statements(write_queue):
+    """Sentencias que ejecuta la conexión del hilo escritor desde este momento."""
+    statements = []
+    write_queue.submit(lambda conn: conn.set_trace_callback(statements.append)).result()
+    return statements
+
+
+def test_writes_in_the_window_share_one_transaction(writes):
+    statements = traced_statements(writes)
+    futures = [writes.submit(insert(f"v{i}")) for i in range(20)]
+    assert [future.result(timeout=5) for future in futures] == list(range(1, 21))
+    assert statements.count("BEGIN IMMEDIATE") == 1
+    assert probe_values() == [f"v{i}" for i in range(20)]
+
+
+def test_failed_write_is_isolated_from_its_batch(writes):
+    def insert_then_fail(conn):
+        conn.execute("INSERT INTO write_probe (value) VALUES ('a medias')")
+        raise ValueError("falla a propósito")
+
+    futures = [
+        writes.submit(insert("primero", row_id=1)),
+        writes.submit(insert_then_fail),
+        writes.submit(insert("segundo", row_id=2)),
+        writes.submit(insert("duplicado", row_id=1)),
+        writes.submit(insert(None)),
+        writes.submit(insert("tercero", row_id=3)),
+    ]
+    assert futures[0].result(timeout=5) == 1
+    with pytest.raises(ValueError):
+        futures[1].result(timeout=5)
+    assert futures[2].result(timeout=5) == 2
+    with pytest.raises(sqlite3.IntegrityError):
+        futures[3].result(timeout=5)
+    with pytest.raises(sqlite3.IntegrityError):
+        futures[4].result(timeout=5)
+    assert futures[5].result(timeout=5) == 3
+    # Lo que escribió la escritura fallida antes de fallar se revirtió
+    assert probe_values() == ["primero", "segundo", "tercero"]
+
+
+def test_shutdown_finishes_pending_writes(migrated_database):
+    core.get_connection().execute("CREATE TABLE write_probe (id INTEGER PRIMARY KEY, value TEXT NOT NULL)")
+    core.get_connection().commit()
+    write_queue = core.WriteQueue()
+    futures = [write_queue.submit(insert(str(i))) for i in range(500)]
+    write_queue.shutdown()
+    assert all(future.done() and future.exception() is None for future in futures)
+    assert len(probe_values()) == 500
+
+
+def test_table_versions_change_before_the_future_resolves(migrated_database):
+    before = core.table_versions(("advisors", "parts"))
+    core.create_advisor("Asesor de Prueba").result(timeout=5)
+    after = core.table_versions(("advisors", "parts"))
+    assert after[0] != before[0]
+    assert after[1] == before[1]
+
+
+def test_batch_is_retried_while_another_connection_holds_the_lock(writes, monkeypatch):
+    # Sin espera de SQLite, el bloqueo llega al reintento de la cola
+    writes.submit(lambda conn: conn.execute("PRAGMA busy_timeout = 0")).result()
+    monkeypatch.setattr(core, "WRITE_BUSY_BACKOFF", 0.02)
+    other = sqlite3.connect(core.DATABASE_NAME, isolation_level=None, check_same_thread=False)
+    other.execute("BEGIN IMMEDIATE")
+    release = threading.Timer(0.2, other.execute, ("COMMIT",))
+    release.start()
+    try:
+        assert writes.submit(insert("después del bloqueo")).result(timeout=10) == 1
+    finally:
+        release.join()
+        other.close()
+    assert probe_values() == ["después del bloqueo"]